@@ -0,0 +1,96 @@
+import os
+from file_cache import source_cache_path
+from scene_detect import read_thumbnails
+from lazy_import import lazy_module
+
+cv2 = lazy_module('cv2')
+np = lazy_module('numpy')
+
+PIXEL_DELTA = 10  # Grey-level change that counts a pixel as moving
+
+
+def scan_activity(source, stride=2, progress=None):
+    """Per-frame motion score: fraction of downscaled pixels that changed noticeably.
+
+    Counting changed pixels (rather than averaging the change) keeps small
+    moving objects visible against a static scene. Frames between two samples
+    share the score of the sample before them.
+    """
+    samples = []
+    numbers = []
+    prev_thumb = None
+    for chunk_numbers, thumbs in read_thumbnails(source, stride, progress=progress):
+        # Light blur so sensor noise does not count as motion
+        frames = np.stack([cv2.GaussianBlur(thumb, (3, 3), 0) for thumb in thumbs]).astype(np.int16)
+        if prev_thumb is not None:
+            frames = np.concatenate((prev_thumb[None], frames))
+        diffs = (np.abs(frames[1:] - frames[:-1]) > PIXEL_DELTA).mean(axis=(1, 2))
+        samples.append(diffs if prev_thumb is not None else np.concatenate(([0.0], diffs)))
+        numbers.append(chunk_numbers)
+        prev_thumb = frames[-1]
+    if not samples:
+        return np.zeros(0, dtype=np.float32)
+    samples = np.concatenate(samples).astype(np.float32)
+    numbers = np.concatenate(numbers)
+    # Spread every sample over the stride frames it stands for
+    frame_count = int(numbers[-1]) + stride
+    return samples[np.minimum(np.arange(frame_count) // stride, len(samples) - 1)]
+
+
+def load_activity(source, stride=2, progress=None):
+    """Motion scores of a file, scanned once and cached"""
+    path = source_cache_path('activity', source, stride, suffix='.npy')
+    if os.path.exists(path):
+        return np.load(path)
+    scores = scan_activity(source, stride, progress)
+    np.save(path, scores)
+    return scores
+
+
+def active_mask(scores, threshold=0.005, pad=15, min_idle=30):
+    """True for frames worth keeping.
+
+    Frames above threshold are active, as are the pad frames around them;
+    idle runs shorter than min_idle frames are kept as well.
+    """
+    active = scores > threshold
+    if pad and len(active):
+        # Dilate with a running window sum; 'same' would return 2 * pad + 1
+        # values for shorter inputs, so the centred part of 'full' is taken
+        counts = np.convolve(active.astype(np.int32), np.ones(2 * pad + 1, dtype=np.int32), 'full')
+        active = counts[pad:pad + len(active)] > 0
+    # Find idle runs and re-activate the short ones
+    edges = np.diff(np.concatenate(([1], active.astype(np.int8), [1])))
+    for start, stop in zip(np.flatnonzero(edges == -1), np.flatnonzero(edges == 1)):
+        if stop - start < min_idle:
+            active[start:stop] = True
+    return active
+
+
+def keep_mask(scores, begin, end, mode='drop', keep_every=10, threshold=0.005, pad=15, min_idle=30):
+    """Frames of [begin, end) to export: idle frames are dropped, or only every
+    keep_every-th of them is kept when mode is 'compress'.
+
+    Idle runs are found over the whole file and then sliced, so activity next
+    to the range pads into it just as it does for playback.
+    """
+    if len(scores) < end:
+        # Frames past the scanned range count as active
+        scores = np.concatenate((scores, np.full(end - len(scores), np.inf, dtype=scores.dtype)))
+    keep = active_mask(scores, threshold, pad, min_idle)[begin:end]
+    if mode == 'compress':
+        idle = np.flatnonzero(~keep)
+        keep[idle[::keep_every]] = True
+    return keep
+
+
+def activity_strip(scores, width=1000, height=8, scale=0.1):
+    """Heatmap image (BGR) of the scores, one column per bin of frames"""
+    if len(scores) == 0:
+        return np.zeros((height, width, 3), dtype=np.uint8)
+    # Busiest frame of every bin decides its colour
+    starts = np.arange(width) * len(scores) // width
+    peaks = np.maximum.reduceat(scores, starts)
+    levels = np.clip(peaks / scale * 255, 0, 255).astype(np.uint8)
+    strip = cv2.applyColorMap(levels[None, :], cv2.COLORMAP_INFERNO)
+    return np.repeat(strip, height, axis=0)
@@ -0,0 +1,411 @@
+'''
+python animated_preview.py video.mp4 preview.gif --begin 300 --end 600
+python animated_preview.py video.mp4 preview.webp --crop 0,0,1280,720 --width 640 --fps 15 --speed 2
+'''
+import os
+import sys
+import math
+import struct
+import argparse
+from extract import iter_frames_at, parse_rect
+from timestamps import load_keyframes, load_pts_table
+from file_cache import source_cache_path
+from lazy_import import lazy_module
+
+cv2 = lazy_module('cv2')
+np = lazy_module('numpy')
+
+PREVIEW_FORMATS = ('.gif', '.webp')
+TRANSPARENT = 255  # GIF palette index kept free for pixels that did not change
+
+
+def preview_size(width, height, max_width):
+    """Frame size of a preview at most max_width wide, keeping the aspect ratio"""
+    if width <= max_width:
+        return width, height
+    return max_width, max(1, round(height * max_width / width))
+
+
+def preview_step(fps, max_fps):
+    """Take every step-th frame so a preview of a fps stream runs at most at max_fps"""
+    return max(1, math.ceil(fps / max_fps))
+
+
+def frame_delays(count, seconds_per_frame, unit):
+    """Display time of each frame in units per second (100 for GIF, 1000 for WebP).
+
+    Times are rounded cumulatively, so the total duration does not drift.
+    """
+    times = [round(i * seconds_per_frame * unit) for i in range(count + 1)]
+    return [max(b - a, 1) for a, b in zip(times, times[1:])]
+
+
+def iter_preview_batches(frames, clip_rect=None, size=None, batch_size=32):
+    """Crop and downscale frames into (K, h, w, 3) batches.
+
+    Every batch is written into one reused array, so consumers copy what they keep.
+    """
+    batch = None
+    n = 0
+    for frame in frames:
+        if clip_rect:
+            x1, y1, x2, y2 = clip_rect
+            frame = frame[y1:y2, x1:x2]
+        if batch is None:
+            width, height = size or (frame.shape[1], frame.shape[0])
+            batch = np.empty((batch_size, height, width, 3), dtype=np.uint8)
+        if frame.shape[:2] == batch.shape[1:3]:
+            batch[n] = frame
+        else:
+            cv2.resize(frame, (batch.shape[2], batch.shape[1]), dst=batch[n], interpolation=cv2.INTER_AREA)
+        n += 1
+        if n == batch_size:
+            yield batch
+            n = 0
+    if n:
+        yield batch[:n]
+
+
+def palette_samples(frame_numbers, count=16):
+    """Evenly spread frames of a preview to fit its palette to"""
+    return frame_numbers[::max(1, len(frame_numbers) // count)][:count]
+
+
+def sample_palette(frames, colors=255, samples=20000, seed=0):
+    """Up to colors (max 255) BGR entries fitted by k-means to pixels sampled
+    from a (K, h, w, 3) batch of frames"""
+    colors = min(colors, TRANSPARENT)
+    pixels = frames.reshape(-1, 3)
+    if len(pixels) > samples:
+        pixels = pixels[np.random.default_rng(seed).choice(len(pixels), samples, replace=False)]
+    unique = np.unique(pixels, axis=0)
+    if len(unique) <= colors:
+        return unique
+    cv2.setRNGSeed(seed)
+    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 10, 1.0)
+    _, _, centers = cv2.kmeans(pixels.astype(np.float32), colors, None, criteria, 1, cv2.KMEANS_PP_CENTERS)
+    return np.clip(np.round(centers), 0, 255).astype(np.uint8)
+
+
+def palette_lut(palette):
+    """Nearest palette index of every colour at 5 bits per channel, indexed b << 10 | g << 5 | r"""
+    levels = np.arange(32, dtype=np.float32) * 8 + 4
+    grid = np.stack(np.meshgrid(levels, levels, levels, indexing='ij'), -1).reshape(-1, 3)
+    entries = palette.astype(np.float32)
+    # |c - p|^2 without the |c|^2 term, which is the same for every entry
+    distance = (entries * entries).sum(1) - 2 * grid @ entries.T
+    return distance.argmin(1).astype(np.uint8)
+
+
+def quantize(frames, lut):
+    """Palette indices of a (K, h, w, 3) BGR batch in one lookup"""
+    b = (frames[..., 0] >> 3).astype(np.uint16)
+    g = (frames[..., 1] >> 3).astype(np.uint16)
+    r = frames[..., 2] >> 3
+    return lut[(b << 10) | (g << 5) | r]
+
+
+def palette_cache_path(source, samples, clip_rect, size, colors):
+    # The palette only depends on the frames it is fitted to and how they are scaled
+    return source_cache_path('palette', source, samples, clip_rect, size, colors, suffix='.npz')
+
+
+def load_palette(path, sample_frames, colors=255):
+    """(palette, lut) cached at path; sample_frames() returns the (K, h, w, 3)
+    frames to fit the palette to and is only called on a miss"""
+    if os.path.exists(path):
+        with np.load(path) as data:
+            return data['palette'], data['lut']
+    palette = sample_palette(sample_frames(), colors)
+    lut = palette_lut(palette)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, palette=palette, lut=lut)
+    os.replace(tmp_path, path)
+    return palette, lut
+
+
+def lzw_codes_per_symbol(symbols):
+    """GIF LZW codes (8-bit symbols, clear code first) of a byte string"""
+    clear, end = 256, 257
+    codes = [clear]
+    append = codes.append
+    table = {}
+    next_code = end + 1
+    symbols = iter(symbols)
+    prefix = next(symbols)
+    for symbol in symbols:
+        key = (prefix << 8) | symbol
+        if key in table:
+            prefix = table[key]
+            continue
+        append(prefix)
+        if next_code < 4096:
+            table[key] = next_code
+            next_code += 1
+        else:
+            append(clear)
+            table.clear()
+            next_code = end + 1
+        prefix = symbol
+    append(prefix)
+    append(end)
+    return codes
+
+
+def lzw_codes_per_run(values, lengths):
+    """The codes of lzw_codes_per_symbol from a run-length encoded byte string.
+
+    The table holds symbol * k for every k up to the longest run of a symbol
+    seen so far, so the middle of a run is matched with one lookup instead of
+    one per byte. Transparent areas and flat colours are long runs.
+    """
+    clear, end = 256, 257
+    codes = [clear]
+    append = codes.append
+    table = {}
+    chains = {}  # symbol -> codes of symbol * 1, symbol * 2, ... in the table
+    next_code = end + 1
+    prefix = None
+    run = 0  # the prefix is symbol * run, or 0 when it is not a run of one symbol
+    run_symbol = None
+    for symbol, length in zip(values, lengths):
+        if prefix is None:
+            prefix, run, run_symbol = symbol, 1, symbol
+            length -= 1
+        # Byte by byte until the prefix is a run of this symbol
+        while length and not (run and run_symbol == symbol):
+            key = (prefix << 8) | symbol
+            length -= 1
+            if key in table:
+                prefix = table[key]
+                run = 0
+                continue
+            append(prefix)
+            if next_code < 4096:
+                table[key] = next_code
+                next_code += 1
+            else:
+                append(clear)
+                table.clear()
+                chains.clear()
+                next_code = end + 1
+            prefix, run, run_symbol = symbol, 1, symbol
+        if not length:
+            continue
+        chain = chains.get(symbol)
+        if chain is None:
+            chain = chains[symbol] = [symbol]
+        while length:
+            longest = len(chain)
+            if run + length <= longest:
+                run += length
+                prefix = chain[run - 1]
+                break
+            # Emit the longest run string; the byte after it starts the next one
+            length -= longest - run + 1
+            append(chain[-1])
+            if next_code < 4096:
+                table[(chain[-1] << 8) | symbol] = next_code
+                chain.append(next_code)
+                next_code += 1
+            else:
+                append(clear)
+                table.clear()
+                chains.clear()
+                next_code = end + 1
+                chain = chains[symbol] = [symbol]
+            prefix, run = symbol, 1
+    append(prefix)
+    append(end)
+    return codes
+
+
+def lzw_encode(indices):
+    """GIF LZW data (8-bit symbols) of a byte string, split into sub-blocks"""
+    data = np.frombuffer(indices, dtype=np.uint8)
+    starts = np.flatnonzero(np.diff(data)) + 1
+    if len(starts) > len(data) // 2:
+        # Mostly single bytes (noise): run bookkeeping would only cost time
+        codes = lzw_codes_per_symbol(indices)
+    else:
+        lengths = np.diff(np.concatenate(([0], starts, [len(data)])))
+        values = data[np.concatenate(([0], starts))]
+        codes = lzw_codes_per_run(values.tolist(), lengths.tolist())
+
+    # The width of a code only depends on how many codes were emitted since the
+    # last clear code: decoders widen codes after the 255th, 767th and 1791st
+    codes = np.array(codes, dtype=np.uint32)
+    positions = np.arange(len(codes))
+    clears = np.where(codes == 256, positions, 0)  # clear code
+    since_clear = positions - np.maximum.accumulate(np.concatenate(([0], clears[:-1])))
+    widths = (9 + (since_clear >= 256) + (since_clear >= 768) + (since_clear >= 1792)).astype(np.uint8)
+
+    # Pack the variable-width codes LSB first
+    starts = np.cumsum(widths) - widths
+    bits = np.zeros(int(starts[-1]) + int(widths[-1]), dtype=np.uint8)
+    for bit in range(12):
+        mask = widths > bit
+        bits[starts[mask] + bit] = (codes[mask] >> bit) & 1
+    data = np.packbits(bits, bitorder='little').tobytes()
+    blocks = [bytes([len(data[i:i + 255])]) + data[i:i + 255] for i in range(0, len(data), 255)]
+    return b''.join(blocks) + b'\x00'
+
+
+class GifWriter:
+    """Animated GIF with one global palette.
+
+    Only the rectangle that changed since the previous frame is encoded, with
+    unchanged pixels transparent; repeated frames extend the previous delay.
+    Pixels whose palette colour moves by at most tolerance (RGB distance) keep
+    the colour on screen, which removes most sensor noise from the changes.
+    """
+    def __init__(self, path, size, palette, tolerance=0, loop=0):
+        width, height = size
+        self.path = path
+        self.file = open(path, 'wb')
+        table = np.zeros((256, 3), dtype=np.uint8)
+        table[:len(palette)] = palette[:, ::-1]  # BGR to RGB
+        self.file.write(b'GIF89a' + struct.pack('<HHBBB', width, height, 0xF7, 0, 0) + table.tobytes())
+        self.file.write(b'\x21\xFF\x0BNETSCAPE2.0\x03\x01' + struct.pack('<H', loop) + b'\x00')
+        entries = palette.astype(np.float32)
+        distance = np.sqrt(((entries[:, None] - entries[None]) ** 2).sum(-1))
+        self.similar = distance <= tolerance
+        self.previous = None  # Palette indices on screen
+        self.pending = None  # [x, y, indices, delay] of the frame not written yet
+
+    def write(self, indices, delay):
+        """Add a frame of palette indices shown for delay centiseconds"""
+        if self.previous is None:
+            x, y, image = 0, 0, indices
+        else:
+            changed = ~self.similar[self.previous, indices]
+            rows = np.flatnonzero(changed.any(1))
+            if not len(rows):
+                self.pending[3] += delay
+                return
+            cols = np.flatnonzero(changed.any(0))
+            y, y2, x, x2 = rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+            image = np.where(changed[y:y2, x:x2], indices[y:y2, x:x2], TRANSPARENT).astype(np.uint8)
+            self.previous[changed] = indices[changed]
+        self.flush()
+        self.pending = [int(x), int(y), image, delay]
+        if self.previous is None:
+            self.previous = indices.copy()
+
+    def flush(self):
+        if self.pending is None:
+            return
+        x, y, image, delay = self.pending
+        height, width = image.shape
+        # Graphic control: keep the previous frame (disposal 1), TRANSPARENT is see-through
+        self.file.write(b'\x21\xF9\x04\x05' + struct.pack('<HBB', min(delay, 0xFFFF), TRANSPARENT, 0))
+        self.file.write(b'\x2C' + struct.pack('<HHHHB', x, y, width, height, 0) + b'\x08')
+        self.file.write(lzw_encode(np.ascontiguousarray(image).tobytes()))
+        self.pending = None
+
+    def close(self):
+        self.flush()
+        self.file.write(b'\x3B')
+        self.file.close()
+
+
+class WebpWriter:
+    """Animated WebP through OpenCV's animation encoder (OpenCV 4.11+)"""
+    def __init__(self, path, quality=80, loop=0):
+        if not hasattr(cv2, 'imwriteanimation'):
+            raise Exception("Animated WebP needs OpenCV 4.11 or newer")
+        self.path = path
+        self.quality = quality
+        self.animation = cv2.Animation()
+        self.animation.loop_count = loop
+        self.frames = []
+        self.delays = []
+
+    def write(self, frame, delay):
+        self.frames.append(frame.copy())
+        self.delays.append(delay)
+
+    def close(self):
+        self.animation.frames = self.frames
+        self.animation.durations = self.delays
+        if not cv2.imwriteanimation(self.path, self.animation, [cv2.IMWRITE_WEBP_QUALITY, self.quality]):
+            raise Exception(f"Failed to write {self.path}")
+
+
+def write_preview(path, batches, count, seconds_per_frame, palette=None, lut=None, tolerance=0, quality=80,
+                  progress=None):
+    """Write (K, h, w, 3) batches as an animated GIF (palette and lut needed) or WebP.
+
+    Returns the number of frames written.
+    """
+    gif = path.lower().endswith('.gif')
+    delays = iter(frame_delays(count, seconds_per_frame, 100 if gif else 1000))
+    writer = None
+    written = 0
+    try:
+        for batch in batches:
+            if writer is None:
+                size = (batch.shape[2], batch.shape[1])
+                writer = GifWriter(path, size, palette, tolerance) if gif else WebpWriter(path, quality)
+            for frame in quantize(batch, lut) if gif else batch:
+                writer.write(frame, next(delays))
+                written += 1
+            if progress:
+                progress(written / max(count, 1) * 100)
+    finally:
+        if writer is not None:
+            writer.close()
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write an animated GIF or WebP preview of a segment")
+    parser.add_argument('source')
+    parser.add_argument('output', help=".gif or .webp")
+    parser.add_argument('--begin', type=int, default=0)
+    parser.add_argument('--end', type=int)
+    parser.add_argument('--crop', type=parse_rect, help="x1,y1,x2,y2")
+    parser.add_argument('--width', type=int, default=480, help="max preview width")
+    parser.add_argument('--fps', type=float, default=12, help="max preview frame rate")
+    parser.add_argument('--speed', type=float, default=1.0)
+    parser.add_argument('--colors', type=int, default=255, help="GIF palette size (max 255)")
+    parser.add_argument('--tolerance', type=float, default=16, help="GIF colour change treated as noise")
+    parser.add_argument('--quality', type=int, default=80, help="WebP quality")
+    args = parser.parse_args()
+
+    cap = cv2.VideoCapture(args.source)
+    if not cap.isOpened():
+        raise Exception("Failed to open video file")
+    end = args.end or int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    if args.crop:
+        width, height = args.crop[2] - args.crop[0], args.crop[3] - args.crop[1]
+    size = preview_size(width, height, args.width)
+    pts_table = load_pts_table(args.source, build=False)
+    fps = (pts_table.average_fps(args.begin, end) if pts_table is not None else cap.get(cv2.CAP_PROP_FPS)) * args.speed
+    step = preview_step(fps, args.fps)
+    frame_numbers = list(range(args.begin, end, step))
+    keyframes = load_keyframes(args.source)
+
+    def read(numbers):
+        return (frame for _, frame in iter_frames_at(cap, numbers, keyframes, pts_table))
+
+    palette = lut = None
+    if args.output.lower().endswith('.gif'):
+        samples = palette_samples(frame_numbers)
+        path = palette_cache_path(args.source, samples, args.crop, size, args.colors)
+        palette, lut = load_palette(
+            path, lambda: next(iter_preview_batches(read(samples), args.crop, size, len(samples))), args.colors)
+    try:
+        written = write_preview(args.output, iter_preview_batches(read(frame_numbers), args.crop, size),
+                                len(frame_numbers), step / fps, palette, lut, args.tolerance, args.quality,
+                                progress=lambda p: print(f"\rWriting preview: {p:.1f}%", end=""))
+    finally:
+        cap.release()
+    print(f"\n{written} frames written to {args.output}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
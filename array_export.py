@@ -0,0 +1,280 @@
+'''
+python array_export.py video.mp4 --format npy --dtype float16 --layout CHW
+python array_export.py video.mp4 --begin 300 --end 900 --stride 2 --format shards --size 224x224
+'''
+import os
+import sys
+import abc
+import json
+import zipfile
+import argparse
+from frame_blocks import transform_frame
+from lazy_import import lazy_module
+
+np = lazy_module('numpy')
+cv2 = lazy_module('cv2')
+
+ARRAY_FORMATS = ('npy', 'npz', 'shards')
+
+
+def output_shape(frame_shape, layout):
+    height, width, channels = frame_shape
+    return (channels, height, width) if layout == 'CHW' else (height, width, channels)
+
+
+def store_frame(dst, frame, channels='RGB', layout='HWC'):
+    """Write a BGR uint8 frame into dst with channel order, layout and dtype applied in one pass"""
+    if channels == 'RGB':
+        frame = frame[..., ::-1]
+    if layout == 'CHW':
+        frame = frame.transpose(2, 0, 1)
+    if dst.dtype.kind == 'f':
+        # Float outputs are scaled to [0, 1]
+        np.multiply(frame, 1 / 255, out=dst, casting='unsafe')
+    else:
+        dst[...] = frame
+
+
+def truncate_npy(path, count):
+    """Shrink the first dimension of a .npy file to count in place.
+
+    The header is rewritten with the same length, so the data offset stays
+    put, and the data after the first count rows is cut off; nothing is read.
+    """
+    with open(path, 'r+b') as f:
+        version = np.lib.format.read_magic(f)
+        length_size = 2 if version == (1, 0) else 4
+        read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+        shape, fortran_order, dtype = read_header(f)
+        offset = f.tell()
+        shape = (count,) + tuple(shape[1:])
+        header = repr({'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': fortran_order,
+                       'shape': shape})
+        header_length = offset - 8 - length_size  # Magic string, version, header length field
+        f.seek(8 + length_size)
+        f.write((header.ljust(header_length - 1) + '\n').encode('latin1'))
+        f.truncate(offset + int(np.prod(shape)) * dtype.itemsize)
+
+
+class ArrayWriter(abc.ABC):
+    """Stream frames into a numpy array container; the array is created on the first frame"""
+    suffix = ''
+
+    def __init__(self, path, count, dtype='uint8', channels='RGB', layout='HWC'):
+        self.path = path + self.suffix
+        self.count = count
+        self.dtype = np.dtype(dtype)
+        self.channels = channels
+        self.layout = layout
+        self.shape = None
+        self.frame_numbers = []
+
+    def write(self, frame_number, frame):
+        if self.shape is None:
+            self.shape = output_shape(frame.shape, self.layout)
+            self.create()
+        self.store(len(self.frame_numbers), frame)
+        self.frame_numbers.append(frame_number)
+
+    def metadata(self):
+        return {
+            'shape': [len(self.frame_numbers)] + list(self.shape or ()),
+            'dtype': self.dtype.str,
+            'channels': self.channels,
+            'layout': self.layout,
+            'frame_numbers': self.frame_numbers,
+        }
+
+    @abc.abstractmethod
+    def create(self):
+        pass
+
+    @abc.abstractmethod
+    def store(self, index, frame):
+        pass
+
+    @abc.abstractmethod
+    def close(self):
+        pass
+
+
+class NpyArrayWriter(ArrayWriter):
+    """One (N, ...) .npy file filled in place through a memmap"""
+    suffix = '.npy'
+
+    def create(self):
+        self.array = np.lib.format.open_memmap(self.path, mode='w+', dtype=self.dtype,
+                                               shape=(self.count,) + self.shape)
+
+    def store(self, index, frame):
+        store_frame(self.array[index], frame, self.channels, self.layout)
+
+    def close(self):
+        if self.shape is None:
+            return
+        written = len(self.frame_numbers)
+        self.array.flush()
+        del self.array
+        if written < self.count:
+            # Source ended early: record the real frame count
+            truncate_npy(self.path, written)
+        with open(self.path + '.json', 'w') as f:
+            json.dump(self.metadata(), f)
+
+
+class ChunkedArrayWriter(ArrayWriter):
+    """Collect frames into fixed-size chunks and hand each full chunk to write_chunk"""
+    def __init__(self, path, count, dtype='uint8', channels='RGB', layout='HWC', chunk_frames=256):
+        super().__init__(path, count, dtype, channels, layout)
+        self.chunk_frames = chunk_frames
+        self.chunk_index = 0
+
+    def create(self):
+        self.chunk = np.empty((min(self.chunk_frames, self.count),) + self.shape, dtype=self.dtype)
+        self.filled = 0
+
+    def store(self, index, frame):
+        store_frame(self.chunk[self.filled], frame, self.channels, self.layout)
+        self.filled += 1
+        if self.filled == len(self.chunk):
+            self.flush_chunk()
+
+    def flush_chunk(self):
+        if self.filled:
+            self.write_chunk(self.chunk_index, self.chunk[:self.filled])
+            self.chunk_index += 1
+            self.filled = 0
+
+    @abc.abstractmethod
+    def write_chunk(self, chunk_index, chunk):
+        pass
+
+
+class NpzArrayWriter(ChunkedArrayWriter):
+    """Chunks stored as frames_00000.npy, ... members of one uncompressed .npz"""
+    suffix = '.npz'
+
+    def create(self):
+        super().create()
+        self.zip = zipfile.ZipFile(self.path, 'w', zipfile.ZIP_STORED, allowZip64=True)
+
+    def write_chunk(self, chunk_index, chunk):
+        with self.zip.open(f"frames_{chunk_index:05d}.npy", 'w', force_zip64=True) as f:
+            np.lib.format.write_array(f, chunk)
+
+    def close(self):
+        if self.shape is None:
+            return
+        self.flush_chunk()
+        with self.zip.open('frame_numbers.npy', 'w') as f:
+            np.lib.format.write_array(f, np.array(self.frame_numbers, dtype=np.int64))
+        self.zip.close()
+
+
+class ShardedArrayWriter(ChunkedArrayWriter):
+    """Directory of shard_00000.npy files plus index.json; every shard can be memory-mapped"""
+    suffix = '_shards'
+
+    def create(self):
+        super().create()
+        os.makedirs(self.path, exist_ok=True)
+        self.shards = []
+
+    def write_chunk(self, chunk_index, chunk):
+        name = f"shard_{chunk_index:05d}.npy"
+        np.save(os.path.join(self.path, name), chunk)
+        self.shards.append({'file': name, 'count': len(chunk)})
+
+    def close(self):
+        if self.shape is None:
+            return
+        self.flush_chunk()
+        metadata = self.metadata()
+        metadata['shards'] = self.shards
+        with open(os.path.join(self.path, 'index.json'), 'w') as f:
+            json.dump(metadata, f)
+
+
+ARRAY_WRITERS = {
+    'npy': NpyArrayWriter,
+    'npz': NpzArrayWriter,
+    'shards': ShardedArrayWriter,
+}
+
+
+def open_array_writer(kind, path, count, dtype='uint8', channels='RGB', layout='HWC'):
+    return ARRAY_WRITERS[kind](path, count, dtype, channels, layout)
+
+
+class ShardedArray:
+    """Read-only view over a sharded export; frames are memory-mapped, never decoded"""
+    def __init__(self, path):
+        with open(os.path.join(path, 'index.json')) as f:
+            self.metadata = json.load(f)
+        self.shards = [np.load(os.path.join(path, shard['file']), mmap_mode='r')
+                       for shard in self.metadata['shards']]
+        self.offsets = np.cumsum([0] + [len(shard) for shard in self.shards])
+        self.frame_numbers = self.metadata['frame_numbers']
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        shard = int(np.searchsorted(self.offsets, index, side='right')) - 1
+        return self.shards[shard][index - self.offsets[shard]]
+
+
+def export_array(source, output, kind='npy', begin=0, end=None, stride=1, clip_rect=None,
+                 size=None, dtype='uint8', channels='RGB', layout='HWC', progress=None):
+    """Decode [begin, end) of a file and stream every stride-th frame into an array export"""
+    from extract import iter_frames_at
+    from timestamps import load_keyframes, load_pts_table
+
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        raise Exception("Failed to open video file")
+    if end is None:
+        end = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    indices = list(range(begin, end, stride))
+    writer = open_array_writer(kind, output, len(indices), dtype, channels, layout)
+    try:
+        frames = iter_frames_at(cap, indices, load_keyframes(source),
+                                load_pts_table(source, build=False))
+        for done, (frame_number, frame) in enumerate(frames, 1):
+            writer.write(frame_number, transform_frame(frame, clip_rect, size))
+            if progress:
+                progress(done / len(indices) * 100)
+    finally:
+        cap.release()
+        writer.close()
+    return writer.path
+
+
+def main():
+    from extract import parse_rect, parse_size
+
+    parser = argparse.ArgumentParser(description="Export a video segment as numpy arrays")
+    parser.add_argument('source')
+    parser.add_argument('-o', '--output', help="output path without suffix")
+    parser.add_argument('--format', default='npy', choices=ARRAY_FORMATS)
+    parser.add_argument('--begin', type=int, default=0)
+    parser.add_argument('--end', type=int)
+    parser.add_argument('--stride', type=int, default=1)
+    parser.add_argument('--crop', type=parse_rect, help="x1,y1,x2,y2")
+    parser.add_argument('--size', type=parse_size, help="WIDTHxHEIGHT")
+    parser.add_argument('--dtype', default='uint8', choices=['uint8', 'float16', 'float32'])
+    parser.add_argument('--channels', default='RGB', choices=['RGB', 'BGR'])
+    parser.add_argument('--layout', default='HWC', choices=['HWC', 'CHW'])
+    args = parser.parse_args()
+
+    output = args.output or os.path.splitext(args.source)[0] + '_frames'
+    path = export_array(args.source, output, args.format, args.begin, args.end, args.stride,
+                        args.crop, args.size, args.dtype, args.channels, args.layout,
+                        progress=lambda p: print(f"\rExporting frames: {p:.1f}%", end=""))
+    print(f"\nSaved to {path}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,100 @@
+'''
+python bench.py blocks
+python bench.py startup
+'''
+import os
+import sys
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+
+
+def bench_blocks(args):
+    """Per-frame vs block crop/resize/colour conversion throughput"""
+    import cv2
+    import numpy as np
+    from frame_blocks import BlockTransformer, transform_frame
+
+    src_w, src_h = args.source
+    rng = np.random.default_rng(0)
+    frames = rng.integers(0, 256, (args.block_size, src_h, src_w, 3), dtype=np.uint8)
+    clip_rect = (src_w // 8, src_h // 8, src_w - src_w // 8, src_h - src_h // 8)
+
+    for size in args.sizes:
+        transformer = BlockTransformer(clip_rect, size, cv2.COLOR_BGR2RGB)
+        transformer(frames)  # Allocate scratch buffers outside the timed loop
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for frame in frames:
+                transform_frame(frame, clip_rect, size, cv2.COLOR_BGR2RGB)
+        per_frame = args.repeat * len(frames) / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            transformer(frames)
+        block = args.repeat * len(frames) / (time.perf_counter() - start)
+
+        print(f"{src_w}x{src_h} -> {size[0]}x{size[1]}: per-frame {per_frame:8.1f} fps, "
+              f"block {block:8.1f} fps ({block / per_frame:.2f}x)")
+
+
+def startup_targets():
+    here = os.path.dirname(os.path.abspath(__file__))
+    script = [sys.executable, os.path.join(here, 'main.py')]
+    targets = [
+        ('script, eager imports', script, {'VIDEOPROCESSOR_EAGER_IMPORTS': '1'}),
+        ('script, lazy imports', script, {}),
+    ]
+    exe = 'VideoProcessor.exe' if platform.system() == 'Windows' else 'VideoProcessor'
+    onefile = os.path.join(here, 'dist', exe)
+    onedir = os.path.join(here, 'dist', 'onedir', 'VideoProcessor', exe)
+    if os.path.isfile(onefile):
+        targets.append(('onefile bundle', [onefile], {}))
+    if os.path.isfile(onedir):
+        targets.append(('onedir bundle', [onedir], {}))
+    return targets
+
+
+def bench_startup(args):
+    """Time from process start until the main window has been shown"""
+    for name, command, extra_env in startup_targets():
+        env = dict(os.environ, VIDEOPROCESSOR_STARTUP_PROBE='1', **extra_env)
+        times = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            subprocess.run(command, env=env, check=True,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            times.append(time.perf_counter() - start)
+        print(f"{name:24s} min {min(times):6.3f}s  median {statistics.median(times):6.3f}s")
+
+
+def parse_size(text):
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Video Processing Tool benchmarks")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    blocks = subparsers.add_parser('blocks', help=bench_blocks.__doc__)
+    blocks.add_argument('--source', type=parse_size, default=(1920, 1080))
+    blocks.add_argument('--sizes', type=parse_size, nargs='+',
+                        default=[(64, 36), (160, 90), (320, 180), (640, 360), (1280, 720)])
+    blocks.add_argument('--block-size', type=int, default=32)
+    blocks.add_argument('--repeat', type=int, default=10)
+    blocks.set_defaults(func=bench_blocks)
+
+    startup = subparsers.add_parser('startup', help=bench_startup.__doc__)
+    startup.add_argument('--repeat', type=int, default=5)
+    startup.set_defaults(func=bench_startup)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
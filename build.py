@@ -1,9 +1,11 @@
 '''
 pip install pyinstaller opencv-python numpy PyQt5
-python build.py
+python build.py            # single-file executable in dist/
+python build.py --onedir   # faster-starting folder bundle in dist/onedir/
 '''
 import os
 import sys
+import argparse
 import platform
 import subprocess
 
@@ -28,14 +30,70 @@ def install_requirements():
     subprocess.check_call([sys.executable, '-m', 'pip', 'install', '--upgrade', 'pip'])
     subprocess.check_call([sys.executable, '-m', 'pip', 'install', *requirements])
 
-def build_executable():
+# Modules the application never imports; dropped from the onedir bundle
+EXCLUDED_MODULES = [
+    'matplotlib',
+    'scipy',
+    'PIL',
+    'tkinter',
+    'PyQt5.QtWebEngineWidgets',
+    'PyQt5.QtWebEngine',
+    'PyQt5.QtWebEngineCore',
+    'PyQt5.QtWebSockets',
+    'PyQt5.QtNetwork',
+    'PyQt5.QtSql',
+    'PyQt5.QtTest',
+    'PyQt5.QtXml',
+    'PyQt5.QtXmlPatterns',
+    'PyQt5.QtDesigner',
+    'PyQt5.QtHelp',
+    'PyQt5.QtOpenGL',
+    'PyQt5.QtPrintSupport',
+    'PyQt5.QtQml',
+    'PyQt5.QtQuick',
+    'PyQt5.QtQuickWidgets',
+    'PyQt5.QtSvg',
+    'PyQt5.QtWebChannel',
+    'PyQt5.QtMultimedia',
+    'PyQt5.QtBluetooth',
+    'PyQt5.QtDBus',
+    'PyQt5.QtLocation',
+    'PyQt5.QtPositioning',
+    'PyQt5.QtSensors',
+    'PyQt5.QtSerialPort',
+    'cv2.cuda',
+    'cv2.gapi',
+    'cv2.ml',
+    'cv2.ocl',
+    'numpy.random._examples',
+    'numpy.doc',
+    'numpy.f2py',
+    'numpy.distutils',
+    'numpy.tests',
+    'numpy.core.tests',
+    'numpy.lib.tests',
+    'numpy.linalg.tests',
+    'numpy.ma.tests',
+    'numpy.matrixlib.tests',
+    'numpy.polynomial.tests',
+    'numpy.random.tests',
+]
+
+def build_executable(onedir=False):
     """Build executable based on platform"""
     system = platform.system().lower()
     
-    # Common PyInstaller options for single file
+    if onedir:
+        # A folder bundle starts without unpacking itself to a temp dir first
+        bundle_options = ['--onedir', '--distpath=dist/onedir']
+        bundle_options += [f'--exclude-module={module}' for module in EXCLUDED_MODULES]
+    else:
+        bundle_options = ['--onefile']  # Create a single file
+    
+    # Common PyInstaller options
     options = [
         '--name=VideoProcessor',
-        '--onefile',  # Create a single file
+        *bundle_options,
         '--noconsole',  # No console window
         '--clean',  # Clean PyInstaller cache
         '--add-data=README.md:.',  # Include README
@@ -44,54 +102,9 @@ def build_executable():
         # '--hidden-import=PyQt5.QtCore',
         # '--hidden-import=PyQt5.QtGui',
         # '--hidden-import=PyQt5.QtWidgets',
-        # '--hidden-import=cv2',
-        # '--hidden-import=numpy',
-        # Exclude unnecessary modules
-        # '--exclude-module=matplotlib',
-        # '--exclude-module=scipy',
-        # '--exclude-module=PIL',
-        # '--exclude-module=tkinter',
-        # '--exclude-module=PyQt5.QtWebEngineWidgets',
-        # '--exclude-module=PyQt5.QtWebEngine',
-        # '--exclude-module=PyQt5.QtWebEngineCore',
-        # '--exclude-module=PyQt5.QtWebEngineQuick',
-        # '--exclude-module=PyQt5.QtWebSockets',
-        # '--exclude-module=PyQt5.QtNetwork',
-        # '--exclude-module=PyQt5.QtSql',
-        # '--exclude-module=PyQt5.QtTest',
-        # '--exclude-module=PyQt5.QtXml',
-        # '--exclude-module=PyQt5.QtXmlPatterns',
-        # '--exclude-module=PyQt5.QtDesigner',
-        # '--exclude-module=PyQt5.QtHelp',
-        # '--exclude-module=PyQt5.QtOpenGL',
-        # '--exclude-module=PyQt5.QtPrintSupport',
-        # '--exclude-module=PyQt5.QtQml',
-        # '--exclude-module=PyQt5.QtQuick',
-        # '--exclude-module=PyQt5.QtQuickWidgets',
-        # '--exclude-module=PyQt5.QtSvg',
-        # '--exclude-module=PyQt5.QtSvgWidgets',
-        # '--exclude-module=PyQt5.QtWebChannel',
-        # Exclude unnecessary OpenCV modules
-        # '--exclude-module=cv2.cuda',
-        # '--exclude-module=cv2.gapi',
-        # '--exclude-module=cv2.ml',
-        # '--exclude-module=cv2.ocl',
-        # '--exclude-module=cv2.videoio_registry',
-        # '--exclude-module=cv2.utils',
-        # Exclude unnecessary numpy modules
-        # '--exclude-module=numpy.random._examples',
-        # '--exclude-module=numpy.doc',
-        # '--exclude-module=numpy.f2py',
-        # '--exclude-module=numpy.distutils',
-        # '--exclude-module=numpy.testing',
-        # '--exclude-module=numpy.core.tests',
-        # '--exclude-module=numpy.lib.tests',
-        # '--exclude-module=numpy.linalg.tests',
-        # '--exclude-module=numpy.ma.tests',
-        # '--exclude-module=numpy.matrixlib.tests',
-        # '--exclude-module=numpy.polynomial.tests',
-        # '--exclude-module=numpy.random.tests',
-        # '--exclude-module=numpy.tests',
+        # cv2 and numpy are imported lazily by name, invisible to the analysis
+        '--hidden-import=cv2',
+        '--hidden-import=numpy',
         'main.py'
     ]
     
@@ -118,6 +131,11 @@ def build_executable():
     subprocess.check_call(['pyinstaller', *options])
 
 def main():
+    parser = argparse.ArgumentParser(description="Build the Video Processing Tool executable")
+    parser.add_argument('--onedir', action='store_true',
+                        help="build a folder bundle with unused modules excluded (faster startup)")
+    args = parser.parse_args()
+    
     try:
         print("Uninstalling conflicting packages...")
         uninstall_conflicts()
@@ -126,7 +144,7 @@ def main():
         install_requirements()
         
         print(f"\nBuilding for {platform.system()}...")
-        build_executable()
+        build_executable(onedir=args.onedir)
         
         print("\nBuild completed!")
         print("The executable can be found in the 'dist' directory.")
@@ -0,0 +1,77 @@
+from collections import OrderedDict
+from decoder_backends import media_key, open_capture, preferred_backend
+from file_cache import source_fingerprint
+from lazy_import import lazy_module
+from video_codecs import fourcc_name
+
+cv2 = lazy_module('cv2')
+
+
+def probe_capture(cap):
+    """Basic stream properties of an open capture"""
+    return {
+        'fps': cap.get(cv2.CAP_PROP_FPS),
+        'frame_count': int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+        'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        'codec': fourcc_name(int(cap.get(cv2.CAP_PROP_FOURCC))).strip('\x00'),
+    }
+
+
+class CapturePool:
+    """Bounded set of open captures; the least recently used one is released first.
+
+    Files are opened on the backend remembered for their codec/container (see
+    decoder_backends) with threads decoder threads (0 = backend default).
+    """
+    def __init__(self, max_open=4, threads=0):
+        self.max_open = max_open
+        self.threads = threads
+        self.captures = OrderedDict()
+        self.probes = {}  # path -> (fingerprint, properties)
+
+    def __contains__(self, path):
+        return path in self.captures
+
+    def get(self, path, keep=()):
+        """Open capture of path; captures of the paths in keep are never released to make room"""
+        cap = self.captures.get(path)
+        if cap is not None:
+            self.captures.move_to_end(path)
+            return cap
+        cap = open_capture(path, threads=self.threads)
+        if not cap.isOpened():
+            cap.release()
+            raise Exception("Failed to open video file")
+        backend = preferred_backend(media_key(path, cap))
+        if backend and backend != cap.getBackendName():
+            preferred = open_capture(path, backend, self.threads)
+            if preferred.isOpened():
+                cap.release()
+                cap = preferred
+            else:
+                preferred.release()
+        self.captures[path] = cap
+        evictable = [p for p in self.captures if p != path and p not in keep]
+        for old_path in evictable[:max(0, len(self.captures) - self.max_open)]:
+            self.captures.pop(old_path).release()
+        return cap
+
+    def probe(self, path, keep=()):
+        """Cached stream properties, re-probed when the file changes"""
+        fingerprint = source_fingerprint(path)
+        cached = self.probes.get(path)
+        if cached is None or cached[0] != fingerprint:
+            cached = self.probes[path] = (fingerprint, probe_capture(self.get(path, keep)))
+        return cached[1]
+
+    def release(self, path):
+        cap = self.captures.pop(path, None)
+        if cap is not None:
+            cap.release()
+        self.probes.pop(path, None)
+
+    def release_all(self):
+        for cap in self.captures.values():
+            cap.release()
+        self.captures.clear()
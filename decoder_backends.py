@@ -0,0 +1,185 @@
+'''
+python decoder_backends.py video.mp4
+python decoder_backends.py video.mp4 --backends FFMPEG GSTREAMER --threads 4 --remember
+'''
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import statistics
+from file_cache import CACHE_ROOT
+from lazy_import import lazy_module
+from video_codecs import fourcc_name
+
+cv2 = lazy_module('cv2')
+
+# Registered backends that read cameras or image sequences, not video files
+NON_FILE_BACKENDS = ('V4L2', 'CV_IMAGES', 'DSHOW', 'FIREWIRE', 'UEYE', 'OBSENSOR', 'ANDROID')
+PREFERENCES_PATH = os.path.join(CACHE_ROOT, 'decoder_backends.json')
+
+
+def stream_backends():
+    """{name: api id} of the file-capable backends built into this OpenCV"""
+    apis = {cv2.videoio_registry.getBackendName(api): api for api in cv2.videoio_registry.getStreamBackends()}
+    return {name: api for name, api in apis.items() if name not in NON_FILE_BACKENDS}
+
+
+def available_backends():
+    return list(stream_backends())
+
+
+def open_capture(path, backend=None, threads=0):
+    """VideoCapture on the named backend (None = OpenCV's choice) with threads
+    decoder threads (0 = backend default)"""
+    api = stream_backends().get(backend, cv2.CAP_ANY) if backend else cv2.CAP_ANY
+    if threads:
+        # Backends without a thread setting refuse the open parameter
+        try:
+            cap = cv2.VideoCapture(path, api, [cv2.CAP_PROP_N_THREADS, threads])
+            if cap.isOpened():
+                return cap
+            cap.release()
+        except cv2.error:
+            pass
+    return cv2.VideoCapture(path, api)
+
+
+def media_key(path, cap):
+    """Codec/container pair backend preferences are remembered for"""
+    codec = fourcc_name(int(cap.get(cv2.CAP_PROP_FOURCC))).strip('\x00').lower()
+    return f"{codec or 'unknown'}/{os.path.splitext(path)[1].lower()}"
+
+
+def load_preferences(path=PREFERENCES_PATH):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def preferred_backend(key, path=PREFERENCES_PATH):
+    return load_preferences(path).get(key)
+
+
+def remember_backend(key, backend, path=PREFERENCES_PATH):
+    preferences = load_preferences(path)
+    preferences[key] = backend
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(preferences, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def thumbnail(frame):
+    # Small grey image; enough to tell neighbouring frames apart
+    small = cv2.resize(frame, (64, 36), interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY).astype('int16')
+
+
+def benchmark_backend(path, backend, frames=240, seeks=20, threads=0, seed=0):
+    """Sequential decode rate and random-seek latency of one backend on a file.
+
+    The first frames frames are decoded in order (timed) and kept as
+    thumbnails; seeks then jump to random frames of that window in random
+    order and count as accurate when the frame read matches the sequential one.
+    Returns a dict, or None when the backend cannot open the file.
+    """
+    start = time.perf_counter()
+    cap = open_capture(path, backend, threads)
+    if not cap.isOpened():
+        cap.release()
+        return None
+    try:
+        open_ms = (time.perf_counter() - start) * 1000
+        name = cap.getBackendName()
+        reference = []
+        start = time.perf_counter()
+        while len(reference) < frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            reference.append(thumbnail(frame))
+        elapsed = time.perf_counter() - start
+        if not reference:
+            return None
+        fps = len(reference) / elapsed if elapsed > 0 else 0.0
+
+        targets = random.Random(seed).choices(range(len(reference)), k=seeks)
+        latencies = []
+        accurate = 0
+        for target in targets:
+            start = time.perf_counter()
+            cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+            ret, frame = cap.read()
+            latencies.append((time.perf_counter() - start) * 1000)
+            if ret and abs(thumbnail(frame) - reference[target]).mean() < 1.0:
+                accurate += 1
+        return {
+            'backend': name,
+            'threads': threads,
+            'open_ms': open_ms,
+            'fps': fps,
+            'seek_ms': statistics.median(latencies),
+            'seek_accuracy': accurate / len(targets),
+        }
+    finally:
+        cap.release()
+
+
+def benchmark_backends(path, backends=None, frames=240, seeks=20, threads=0):
+    """benchmark_backend for every backend that can open the file"""
+    results = []
+    for backend in backends or available_backends():
+        try:
+            result = benchmark_backend(path, backend, frames, seeks, threads)
+        except cv2.error:
+            result = None
+        if result is not None:
+            results.append(result)
+    return results
+
+
+def best_backend(results, frames=240, min_accuracy=1.0):
+    """Fastest backend whose seeks all land on the right frame, or None.
+
+    Speed is the time to seek once and play frames frames from there.
+    """
+    accurate = [r for r in results if r['seek_accuracy'] >= min_accuracy and r['fps'] > 0]
+    if not accurate:
+        return None
+    return min(accurate, key=lambda r: r['seek_ms'] + frames / r['fps'] * 1000)['backend']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare video decoder backends on a file")
+    parser.add_argument('source')
+    parser.add_argument('--backends', nargs='+', help=f"default: {' '.join(available_backends())}")
+    parser.add_argument('--frames', type=int, default=240, help="frames decoded sequentially")
+    parser.add_argument('--seeks', type=int, default=20, help="random seeks within those frames")
+    parser.add_argument('--threads', type=int, default=0, help="decoder threads (0 = backend default)")
+    parser.add_argument('--remember', action='store_true', help="use the winner for this codec/container")
+    args = parser.parse_args()
+
+    results = benchmark_backends(args.source, args.backends, args.frames, args.seeks, args.threads)
+    for r in results:
+        print(f"{r['backend']:12s} open {r['open_ms']:7.1f} ms  decode {r['fps']:8.1f} fps  "
+              f"seek {r['seek_ms']:7.1f} ms  accurate {r['seek_accuracy']:6.1%}")
+    best = best_backend(results, args.frames)
+    if best is None:
+        print("No backend seeks accurately in this file")
+        return 1
+    print(f"Best: {best}")
+    if args.remember:
+        cap = open_capture(args.source, best)
+        key = media_key(args.source, cap)
+        cap.release()
+        remember_backend(key, best)
+        print(f"Remembered {best} for {key}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,121 @@
+import os
+import json
+import shutil
+from file_cache import CACHE_ROOT, cache_path
+
+
+def link_path(src, dst):
+    """Hardlink src to dst, a whole tree for directories"""
+    unlink_outputs([dst])
+    if os.path.isdir(src):
+        shutil.copytree(src, dst, copy_function=os.link)
+    else:
+        os.link(src, dst)
+    return dst
+
+
+def link_or_copy(src, dst):
+    """Hardlink src to dst, copying when they are on different filesystems"""
+    try:
+        return link_path(src, dst)
+    except OSError:
+        unlink_outputs([dst])
+        if os.path.isdir(src):
+            return shutil.copytree(src, dst)
+        return shutil.copy2(src, dst)
+
+
+def unlink_outputs(outputs):
+    """Remove earlier outputs so a writer never truncates a file shared with the cache"""
+    for output in outputs:
+        if os.path.isdir(output) and not os.path.islink(output):
+            shutil.rmtree(output)
+        elif os.path.lexists(output):
+            os.remove(output)
+
+
+def unshared_size(path):
+    """Bytes removing path frees: files still hardlinked elsewhere are not counted"""
+    paths = [path] if not os.path.isdir(path) else [
+        os.path.join(root, name) for root, _, names in os.walk(path) for name in names]
+    size = 0
+    for file_path in paths:
+        stat = os.stat(file_path)
+        if stat.st_nlink == 1:
+            size += stat.st_size
+    return size
+
+
+class ExportCache:
+    """Finished exports keyed by source content digest and edit parameters.
+
+    Every entry is a directory holding hardlinks to the output files, so a
+    repeated export is served by linking them back instead of decoding again.
+    Entries are touched on use and the least recently used ones are removed
+    once the files only the cache holds grow past max_bytes.
+    """
+    def __init__(self, cache_dir=None, max_bytes=10 * 1024 ** 3):
+        self.cache_dir = cache_dir or os.path.join(CACHE_ROOT, 'exports')
+        self.max_bytes = max_bytes
+
+    def entry_path(self, params):
+        return cache_path('exports', json.dumps(params, sort_keys=True), cache_dir=self.cache_dir)
+
+    def fetch(self, params, outputs):
+        """Link a cached export to the output paths; False when it is not cached"""
+        entry = self.entry_path(params)
+        sources = [os.path.join(entry, os.path.basename(output)) for output in outputs]
+        if not all(os.path.lexists(source) for source in sources):
+            return False
+        for source, output in zip(sources, outputs):
+            link_or_copy(source, output)
+        os.utime(entry)
+        return True
+
+    def fetch_into(self, params, directory):
+        """Link every file of a cached export into directory; False when it is not cached"""
+        entry = self.entry_path(params)
+        if not os.path.isdir(entry):
+            return False
+        for name in os.listdir(entry):
+            link_or_copy(os.path.join(entry, name), os.path.join(directory, name))
+        os.utime(entry)
+        return True
+
+    def store(self, params, outputs):
+        """Keep the finished output paths for later requests with the same params.
+
+        Outputs are only hardlinked, never copied: an output on another
+        filesystem than the cache is not cached and False is returned.
+        """
+        entry = self.entry_path(params)
+        tmp_entry = entry + '.tmp'
+        shutil.rmtree(tmp_entry, ignore_errors=True)
+        os.makedirs(tmp_entry)
+        try:
+            for output in outputs:
+                link_path(output, os.path.join(tmp_entry, os.path.basename(output)))
+        except OSError:
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+            return False
+        shutil.rmtree(entry, ignore_errors=True)
+        os.replace(tmp_entry, entry)
+        self.evict()
+        return True
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if os.path.isdir(path) and not name.endswith('.tmp'):
+                entries.append((os.path.getmtime(path), unshared_size(path), path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
@@ -0,0 +1,141 @@
+import os
+import json
+import shutil
+import subprocess
+
+# Trailer every complete file of the format ends with
+IMAGE_TRAILERS = {
+    '.jpg': b'\xff\xd9',
+    '.png': b'IEND\xaeB`\x82',
+}
+
+
+def frame_file_valid(path):
+    """True for a non-empty image file that was written to the end"""
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return False
+    trailer = IMAGE_TRAILERS.get(os.path.splitext(path)[1].lower())
+    if trailer is None:
+        return size > 0
+    if size < len(trailer):
+        return False
+    with open(path, 'rb') as f:
+        # Encoders may pad after the trailer, so look at the last few bytes
+        f.seek(max(0, size - 16))
+        return trailer in f.read()
+
+
+def written_frames(directory, frame_numbers, fmt):
+    """Frame numbers whose image already exists and is complete in directory"""
+    if not os.path.isdir(directory):
+        return set()
+    names = set(os.listdir(directory))
+    return {n for n in frame_numbers
+            if f"{n:06d}{fmt}" in names and frame_file_valid(os.path.join(directory, f"{n:06d}{fmt}"))}
+
+
+def frames_to_resume(directory, frame_numbers, fmt, params):
+    """Frames written by an earlier export with the same params, which can be skipped.
+
+    The params are recorded next to the frames; a run with different params
+    (another source, crop or size) starts over and overwrites the old frames.
+    """
+    params = json.loads(json.dumps(params))
+    checkpoint_path = os.path.join(directory, f".checkpoint{fmt}.json")
+    try:
+        with open(checkpoint_path) as f:
+            same_export = json.load(f) == params
+    except (OSError, ValueError):
+        same_export = False
+    if same_export:
+        return written_frames(directory, frame_numbers, fmt)
+    os.makedirs(directory, exist_ok=True)
+    with open(checkpoint_path + '.tmp', 'w') as f:
+        json.dump(params, f)
+    os.replace(checkpoint_path + '.tmp', checkpoint_path)
+    return set()
+
+
+class ChunkedVideoExport:
+    """Write a video export as fixed-size chunks that survive an interrupted run.
+
+    Chunks go to <save_path>.parts and are listed in manifest.json once complete.
+    A rerun with the same parameters only encodes the chunks that are missing;
+    the parts are joined into save_path at the end and then removed. Joining
+    is a stream copy with ffmpeg; without ffmpeg the export is one part, which
+    is renamed into place, so frames are never encoded twice.
+    """
+    def __init__(self, save_path, params, chunk_frames=1800):
+        self.save_path = save_path
+        self.parts_dir = save_path + '.parts'
+        self.params = json.loads(json.dumps(params))  # Compare in the form stored on disk
+        self.chunk_frames = chunk_frames if shutil.which('ffmpeg') else None
+        self.suffix = os.path.splitext(save_path)[1]
+        self.manifest_path = os.path.join(self.parts_dir, 'manifest.json')
+        self.completed = self.load_manifest()
+
+    def load_manifest(self):
+        try:
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = None
+        if manifest is None or manifest.get('params') != self.params \
+                or manifest.get('chunk_frames') != self.chunk_frames:
+            # Parts of a different export cannot be reused
+            shutil.rmtree(self.parts_dir, ignore_errors=True)
+            os.makedirs(self.parts_dir)
+            return []
+        return [c for c in manifest['completed'] if os.path.exists(self.part_path(c))]
+
+    def save_manifest(self):
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'params': self.params, 'chunk_frames': self.chunk_frames,
+                       'completed': self.completed}, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def chunks(self, begin, end):
+        if self.chunk_frames is None:
+            return [(begin, end)]
+        return [(b, min(b + self.chunk_frames, end)) for b in range(begin, end, self.chunk_frames)]
+
+    def pending_chunks(self, begin, end):
+        return [c for c in self.chunks(begin, end) if c[0] not in self.completed]
+
+    def part_path(self, chunk_begin):
+        return os.path.join(self.parts_dir, f"part_{chunk_begin:09d}{self.suffix}")
+
+    def tmp_part_path(self, chunk_begin):
+        return os.path.join(self.parts_dir, f"part_{chunk_begin:09d}.tmp{self.suffix}")
+
+    def complete(self, chunk_begin):
+        os.replace(self.tmp_part_path(chunk_begin), self.part_path(chunk_begin))
+        self.completed.append(chunk_begin)
+        self.save_manifest()
+
+    def concatenate(self):
+        """Join the parts into save_path and remove the parts directory"""
+        parts = [self.part_path(c) for c in sorted(self.completed)]
+        if len(parts) == 1:
+            os.replace(parts[0], self.save_path)
+        elif not concat_with_ffmpeg(parts, self.save_path):
+            # The parts are kept, so a rerun only retries the join
+            raise Exception("Failed to join the export parts with ffmpeg")
+        shutil.rmtree(self.parts_dir, ignore_errors=True)
+
+
+def concat_with_ffmpeg(parts, save_path):
+    """Stream-copy the parts into one file; False when ffmpeg is unavailable or fails"""
+    ffmpeg = shutil.which('ffmpeg')
+    if ffmpeg is None:
+        return False
+    list_path = os.path.join(os.path.dirname(parts[0]), 'concat.txt')
+    with open(list_path, 'w') as f:
+        for part in parts:
+            f.write(f"file '{os.path.abspath(part)}'\n")
+    result = subprocess.run([ffmpeg, '-y', '-loglevel', 'error', '-f', 'concat', '-safe', '0',
+                             '-i', list_path, '-c', 'copy', save_path])
+    return result.returncode == 0
@@ -0,0 +1,375 @@
+'''
+python export_service.py --port 8765 --workers 2
+
+curl -X POST localhost:8765/jobs -d '{"source": "/videos/a.mp4", "begin": 300, "end": 900, "format": ".mp4", "size": [640, 360]}'
+curl -X POST localhost:8765/jobs -d '{"source": "/videos/a.mp4", "format": ".npy", "array": {"stride": 5}}'
+curl localhost:8765/jobs/1/events
+'''
+import os
+import sys
+import json
+import queue
+import argparse
+import itertools
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from array_export import open_array_writer
+from capture_pool import CapturePool
+from frame_blocks import transform_frame
+from frame_writer import AsyncFrameWriter, open_frame_sink, SINKS
+from timestamps import load_pts_table, seek_frame
+from video_codecs import platform_fourcc
+from lazy_import import lazy_module
+
+cv2 = lazy_module('cv2')
+
+FORMATS = ('.mp4', '.avi', '*.jpg', '*.png', '.npy', '.npz', '*.npy')
+ARRAY_KINDS = {'.npy': 'npy', '.npz': 'npz', '*.npy': 'shards'}
+
+
+class ExportJob:
+    """One export request and the progress events it has produced so far"""
+    def __init__(self, job_id, params, priority=0):
+        self.id = job_id
+        self.params = params
+        self.priority = priority
+        self.state = 'queued'
+        self.events = []
+        self.changed = threading.Condition()
+
+    def emit(self, **event):
+        with self.changed:
+            if 'state' in event:
+                self.state = event['state']
+            self.events.append(dict(event, job=self.id))
+            self.changed.notify_all()
+
+    def wait_events(self, start, timeout=None):
+        """Events after index start, blocking until there is one (or the job is over)"""
+        with self.changed:
+            if len(self.events) <= start and self.state not in ('done', 'failed'):
+                self.changed.wait(timeout)
+            return self.events[start:]
+
+    def status(self):
+        return {'job': self.id, 'state': self.state, 'priority': self.priority,
+                'params': self.params, 'last_event': self.events[-1] if self.events else None}
+
+
+def is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def check_job(params, probe):
+    """Raise ValueError for job parameters that cannot be exported from a stream
+    with the probed properties, before anything is decoded or written"""
+    if not isinstance(params.get('source'), str):
+        raise ValueError("Missing source")
+    if params.get('format', '.mp4') not in FORMATS:
+        raise ValueError(f"Unsupported format {params.get('format')!r}")
+    if params.get('container', 'Folder') not in SINKS:
+        raise ValueError(f"Unsupported container {params.get('container')!r}")
+    begin = params.get('begin', 0)
+    end = params.get('end', probe['frame_count'])
+    if not (is_int(begin) and is_int(end)):
+        raise ValueError(f"Invalid frame range {begin!r}, {end!r}")
+    if not 0 <= begin < min(end, probe['frame_count']):
+        raise ValueError(f"No frames in [{begin}, {end}) of a {probe['frame_count']} frame file")
+    clip_rect = params.get('clip_rect')
+    if clip_rect is not None:
+        if not (isinstance(clip_rect, (list, tuple)) and len(clip_rect) == 4 and all(map(is_int, clip_rect))):
+            raise ValueError(f"Invalid clip_rect {clip_rect!r}, expected [x1, y1, x2, y2]")
+        x1, y1, x2, y2 = clip_rect
+        if not (0 <= x1 < x2 <= probe['width'] and 0 <= y1 < y2 <= probe['height']):
+            raise ValueError(f"clip_rect {list(clip_rect)} is outside the {probe['width']}x{probe['height']} frame")
+    size = params.get('size')
+    if size is not None and not (isinstance(size, (list, tuple)) and len(size) == 2
+                                 and all(is_int(v) and v > 0 for v in size)):
+        raise ValueError(f"Invalid size {size!r}, expected [width, height]")
+    speed = params.get('speed', 1.0)
+    if isinstance(speed, bool) or not isinstance(speed, (int, float)) or not speed > 0:
+        raise ValueError(f"Invalid speed {speed!r}")
+    options = params.get('array', {})
+    if not isinstance(options, dict):
+        raise ValueError(f"Invalid array options {options!r}")
+    stride = options.get('stride', 1)
+    if not (is_int(stride) and stride >= 1):
+        raise ValueError(f"Invalid array stride {stride!r}")
+    for name, choices in (('dtype', ('uint8', 'float16', 'float32')), ('channels', ('RGB', 'BGR')),
+                          ('layout', ('HWC', 'CHW'))):
+        if options.get(name, choices[0]) not in choices:
+            raise ValueError(f"Invalid array {name} {options[name]!r}")
+
+
+def export_segment(cap, probe, params, progress=None):
+    """Export [begin, end) of an open capture with the edit parameters of a job.
+
+    Returns the path written.
+    """
+    # Checked again here: the file may have changed since the job was submitted
+    check_job(params, probe)
+    source = params['source']
+    fmt = params.get('format', '.mp4')
+    begin = params.get('begin', 0)
+    end = min(params.get('end', probe['frame_count']), probe['frame_count'])
+    clip_rect = params.get('clip_rect')
+    size = params.get('size')
+    speed = params.get('speed', 1.0)
+    stride = 1
+    base_path = params.get('output') or os.path.join(
+        os.path.dirname(source), os.path.splitext(os.path.basename(source))[0] + '_frames')
+    total = max(end - begin, 1)
+    os.makedirs(base_path, exist_ok=True)
+
+    if fmt in ('*.jpg', '*.png'):
+        writer = AsyncFrameWriter(open_frame_sink(params.get('container', 'Folder'), base_path))
+        write = lambda n, frame: writer.submit(f"{n:06d}{fmt[1:]}", cv2.imencode(fmt[1:], frame)[1].tobytes())
+        close = writer.close
+        path = writer.path
+    elif fmt in ARRAY_KINDS:
+        options = params.get('array', {})
+        stride = options.get('stride', 1)
+        writer = open_array_writer(ARRAY_KINDS[fmt], os.path.join(base_path, f"{begin:06d}-{end:06d}"),
+                                   len(range(begin, end, stride)), options.get('dtype', 'uint8'),
+                                   options.get('channels', 'RGB'), options.get('layout', 'HWC'))
+        write = writer.write
+        close = writer.close
+        path = writer.path
+    else:
+        width, height = probe['width'], probe['height']
+        if clip_rect:
+            x1, y1, x2, y2 = clip_rect
+            width, height = x2 - x1, y2 - y1
+        if size:
+            width, height = size
+        # Keep the segment duration on VFR sources by writing at its average rate
+        pts_table = load_pts_table(source, build=False)
+        fps = (pts_table.average_fps(begin, end) if pts_table is not None else probe['fps']) * speed
+        path = os.path.join(base_path, f"{begin:06d}-{end:06d}{fmt}")
+        writer = cv2.VideoWriter(path, platform_fourcc(), fps, (width, height))
+        if not writer.isOpened():
+            raise Exception("Failed to create output video file")
+        write = lambda n, frame: writer.write(frame)
+        close = writer.release
+
+    try:
+        seek_frame(cap, begin, load_pts_table(source, build=False))
+        for frame_number in range(begin, end):
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if (frame_number - begin) % stride:
+                continue
+            write(frame_number, transform_frame(frame, clip_rect, size))
+            if progress:
+                progress((frame_number + 1 - begin) / total * 100)
+    finally:
+        close()
+    return path
+
+
+class ExportService:
+    """Priority queue of export jobs run by a fixed number of worker threads.
+
+    The workers share one CapturePool, so jobs on the same file reuse the
+    open decoder and its probed stream properties whichever worker runs
+    them. A capture is used by one job at a time: a job on a file another
+    job is decoding opens a capture of its own.
+    """
+    def __init__(self, workers=2, max_open=4, threads=0):
+        self.jobs = {}
+        self.queue = queue.PriorityQueue()
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+        self.threads = threads
+        self.pool = CapturePool(max_open, threads)
+        self.pool_lock = threading.Lock()
+        self.busy = set()  # Files whose pooled capture a job is using
+        self.workers = [threading.Thread(target=self.work, daemon=True) for _ in range(workers)]
+        for worker in self.workers:
+            worker.start()
+
+    def submit(self, params, priority=0):
+        """Queue a job; higher priorities run first, equal ones in submission order.
+
+        Raises ValueError when the job cannot be exported from its source.
+        """
+        if not isinstance(params.get('source'), str):
+            raise ValueError("Missing source")
+        try:
+            probe = self.probe(params['source'])
+        except Exception as e:
+            raise ValueError(f"Cannot open {params['source']}: {str(e)}")
+        check_job(params, probe)
+        with self.lock:
+            job = ExportJob(next(self.ids), params, priority)
+            self.jobs[job.id] = job
+        job.emit(state='queued')
+        self.queue.put((-priority, job.id, job))
+        return job
+
+    def work(self):
+        while True:
+            _, _, job = self.queue.get()
+            if job is None:
+                break
+            self.run(job)
+
+    def probe(self, source):
+        """Stream properties of a file, probed through the shared pool"""
+        with self.pool_lock:
+            if source not in self.busy:
+                return self.pool.probe(source, keep=self.busy)
+        # Another job is decoding the pooled capture
+        private = CapturePool(1, self.threads)
+        try:
+            return private.probe(source)
+        finally:
+            private.release_all()
+
+    def acquire(self, source):
+        """(pool, capture, probe) for a job; pool is None for a private capture"""
+        with self.pool_lock:
+            if source not in self.busy:
+                self.busy.add(source)
+                try:
+                    return self.pool, self.pool.get(source, keep=self.busy), self.pool.probe(source)
+                except Exception:
+                    self.busy.discard(source)
+                    raise
+        private = CapturePool(1, self.threads)
+        try:
+            return None, private.get(source), private.probe(source)
+        except Exception:
+            private.release_all()
+            raise
+
+    def release(self, source, pool, cap, failed):
+        if pool is None:
+            cap.release()
+            return
+        with self.pool_lock:
+            self.busy.discard(source)
+            if failed:
+                # The capture may be left in an unknown state
+                self.pool.release(source)
+
+    def run(self, job):
+        job.emit(state='running')
+        last = [-1]
+
+        def progress(percent):
+            # Report whole percents only
+            if int(percent) > last[0]:
+                last[0] = int(percent)
+                job.emit(progress=last[0])
+
+        source = job.params['source']
+        try:
+            pool, cap, probe = self.acquire(source)
+        except Exception as e:
+            job.emit(state='failed', error=str(e))
+            return
+        try:
+            path = export_segment(cap, probe, job.params, progress)
+        except Exception as e:
+            self.release(source, pool, cap, failed=True)
+            job.emit(state='failed', error=str(e))
+        else:
+            self.release(source, pool, cap, failed=False)
+            job.emit(state='done', path=path)
+
+    def close(self):
+        for _ in self.workers:
+            self.queue.put((float('inf'), 0, None))
+        for worker in self.workers:
+            worker.join()
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """POST /jobs, GET /jobs, GET /jobs/<id> and GET /jobs/<id>/events (newline-delimited JSON)"""
+    service = None
+
+    def send_json(self, data, code=200):
+        body = json.dumps(data).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def find_job(self, parts):
+        try:
+            return self.service.jobs.get(int(parts[1]))
+        except (IndexError, ValueError):
+            return None
+
+    def do_POST(self):
+        if self.path.rstrip('/') != '/jobs':
+            return self.send_json({'error': 'not found'}, 404)
+        try:
+            params = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            if not isinstance(params, dict):
+                raise ValueError("The job must be a JSON object")
+            priority = params.pop('priority', 0)
+            if isinstance(priority, bool) or not isinstance(priority, (int, float)):
+                raise ValueError(f"Invalid priority {priority!r}")
+            job = self.service.submit(params, priority)
+        except (TypeError, KeyError, ValueError) as e:
+            return self.send_json({'error': str(e)}, 400)
+        self.send_json(job.status(), 201)
+
+    def do_GET(self):
+        parts = self.path.strip('/').split('/')
+        if parts == ['jobs']:
+            return self.send_json([job.status() for job in self.service.jobs.values()])
+        job = self.find_job(parts)
+        if parts[0] != 'jobs' or job is None:
+            return self.send_json({'error': 'not found'}, 404)
+        if parts[2:] == ['events']:
+            return self.stream_events(job)
+        self.send_json(job.status())
+
+    def stream_events(self, job):
+        # The response has no length and ends when the job does
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.end_headers()
+        sent = 0
+        while True:
+            events = job.wait_events(sent, timeout=30)
+            for event in events:
+                self.wfile.write(json.dumps(event).encode() + b'\n')
+            self.wfile.flush()
+            sent += len(events)
+            if job.state in ('done', 'failed') and sent == len(job.events):
+                break
+
+
+def serve(host='127.0.0.1', port=8765, workers=2, threads=0):
+    service = ExportService(workers, threads=threads)
+    handler = type('Handler', (ServiceHandler,), {'service': service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    print(f"Export service listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local export job service")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=2, help="jobs exported at the same time")
+    parser.add_argument('--decoder-threads', type=int, default=0, help="threads per decoder (0 = backend default)")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workers, args.decoder_threads)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
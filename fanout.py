@@ -0,0 +1,219 @@
+'''
+python fanout.py video.mp4 --rendition 1080p:1080:.mp4 --rendition 480p:480:.mp4 --rendition thumbs:180:*.jpg:30
+python fanout.py video.mp4 --begin 300 --end 900 --crop 0,0,1920,1080 --rendition preview:360:.avi
+'''
+import os
+import sys
+import queue
+import argparse
+import threading
+from frame_blocks import transform_frame
+from frame_writer import AsyncFrameWriter, open_frame_sink
+from timestamps import load_pts_table, seek_frame
+from video_codecs import platform_fourcc
+from lazy_import import lazy_module
+
+cv2 = lazy_module('cv2')
+
+# Default ladder offered by the GUI
+DEFAULT_RENDITIONS = [
+    {'name': '1080p', 'height': 1080, 'format': '.mp4'},
+    {'name': '480p', 'height': 480, 'format': '.mp4'},
+    {'name': 'thumbs', 'height': 180, 'format': '*.jpg', 'stride': 30},
+]
+
+
+def rendition_size(spec, width, height):
+    """Output size of a rendition for frames of width x height; never upscales"""
+    if spec.get('size'):
+        return tuple(spec['size'])
+    target = min(spec.get('height') or height, height)
+    # Keep the aspect ratio with even dimensions (required by most codecs)
+    return max(2, round(width * target / height / 2) * 2), max(2, target // 2 * 2)
+
+
+def plan_cascade(sizes):
+    """For every size, the index of the larger size it is downscaled from (None = the source).
+
+    Sizes are processed from largest to smallest so each rendition is resized
+    from the smallest already computed frame that is at least as large.
+    """
+    order = sorted(range(len(sizes)), key=lambda i: sizes[i][0] * sizes[i][1], reverse=True)
+    parents = {}
+    for position, index in enumerate(order):
+        width, height = sizes[index]
+        candidates = [i for i in order[:position] if sizes[i][0] >= width and sizes[i][1] >= height]
+        parents[index] = min(candidates, key=lambda i: sizes[i][0] * sizes[i][1]) if candidates else None
+    return order, parents
+
+
+class RenditionOutput:
+    """Encoder thread of one rendition, fed through a bounded queue"""
+    def __init__(self, spec, path, size, fps, queue_size=8):
+        self.spec = spec
+        self.path = path
+        self.size = size
+        self.fmt = spec.get('format', '.mp4')
+        self.stride = spec.get('stride', 1)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.error = None
+        if self.fmt.startswith('*'):
+            self.writer = AsyncFrameWriter(open_frame_sink(spec.get('container', 'Folder'), path))
+            self.path = self.writer.path
+        else:
+            self.writer = cv2.VideoWriter(path, platform_fourcc(), fps, size)
+            if not self.writer.isOpened():
+                raise Exception(f"Failed to create output video file {path}")
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def wants(self, offset):
+        return offset % self.stride == 0
+
+    def put(self, frame_number, frame):
+        if self.error is not None:
+            raise self.error
+        self.queue.put((frame_number, frame))
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            if self.error is not None:
+                continue
+            frame_number, frame = item
+            try:
+                if self.fmt.startswith('*'):
+                    ret, buffer = cv2.imencode(self.fmt[1:], frame)
+                    if not ret:
+                        raise Exception(f"Failed to encode frame as {self.fmt[1:]}")
+                    self.writer.submit(f"{frame_number:06d}{self.fmt[1:]}", buffer.tobytes())
+                else:
+                    self.writer.write(frame)
+            except Exception as e:
+                self.error = e
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+        if self.fmt.startswith('*'):
+            self.writer.close()
+        else:
+            self.writer.release()
+        if self.error is not None:
+            raise self.error
+
+
+def fanout_export(frames, specs, base_path, fps, begin, end, progress=None):
+    """Feed one stream of (frame_number, frame) to several renditions.
+
+    frames must already be cropped. Every spec has a name, a format ('.mp4',
+    '.avi', '*.jpg', '*.png'), an optional 'height' or 'size' and an optional
+    frame 'stride'. Returns {name: path}.
+    """
+    os.makedirs(base_path, exist_ok=True)
+    outputs = None
+    total = max(end - begin, 1)
+    try:
+        for frame_number, frame in frames:
+            if outputs is None:
+                # Sizes are known once the first (cropped) frame is seen
+                height, width = frame.shape[:2]
+                sizes = [rendition_size(spec, width, height) for spec in specs]
+                order, parents = plan_cascade(sizes)
+                outputs = []
+                for spec, size in zip(specs, sizes):
+                    name = f"{begin:06d}-{end:06d}_{spec['name']}"
+                    fmt = spec.get('format', '.mp4')
+                    path = os.path.join(base_path, name if fmt.startswith('*') else name + fmt)
+                    outputs.append(RenditionOutput(spec, path, size, fps))
+            offset = frame_number - begin
+            wanted = [output.wants(offset) for output in outputs]
+            # Also compute the frames a wanted smaller rendition is scaled from
+            needed = list(wanted)
+            for index in reversed(order):
+                if needed[index] and parents[index] is not None:
+                    needed[parents[index]] = True
+            scaled = {}
+            for index in order:
+                if not needed[index]:
+                    continue
+                parent = frame if parents[index] is None else scaled[parents[index]]
+                size = sizes[index]
+                if (parent.shape[1], parent.shape[0]) != size:
+                    parent = cv2.resize(parent, size, interpolation=cv2.INTER_AREA)
+                scaled[index] = parent
+            for index, output in enumerate(outputs):
+                if wanted[index]:
+                    output.put(frame_number, scaled[index])
+            if progress:
+                progress((offset + 1) / total * 100)
+    finally:
+        errors = []
+        for output in outputs or []:
+            try:
+                output.close()
+            except Exception as e:
+                errors.append(e)
+        if errors:
+            raise errors[0]
+    return {spec['name']: output.path for spec, output in zip(specs, outputs or [])}
+
+
+def parse_rendition(text):
+    """name:height[:format[:stride]] or name:WIDTHxHEIGHT[:format[:stride]]"""
+    parts = text.split(':')
+    spec = {'name': parts[0], 'format': parts[2] if len(parts) > 2 else '.mp4'}
+    if 'x' in parts[1].lower():
+        width, height = parts[1].lower().split('x')
+        spec['size'] = (int(width), int(height))
+    else:
+        spec['height'] = int(parts[1])
+    if len(parts) > 3:
+        spec['stride'] = int(parts[3])
+    return spec
+
+
+def main():
+    from extract import parse_rect
+
+    parser = argparse.ArgumentParser(description="Export several renditions from one decode pass")
+    parser.add_argument('source')
+    parser.add_argument('--rendition', type=parse_rendition, action='append',
+                        help="name:height[:format[:stride]], repeatable")
+    parser.add_argument('--begin', type=int, default=0)
+    parser.add_argument('--end', type=int)
+    parser.add_argument('--crop', type=parse_rect, help="x1,y1,x2,y2")
+    parser.add_argument('-o', '--output', help="output directory")
+    args = parser.parse_args()
+
+    cap = cv2.VideoCapture(args.source)
+    if not cap.isOpened():
+        raise Exception("Failed to open video file")
+    end = args.end or int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    pts_table = load_pts_table(args.source, build=False)
+    fps = pts_table.average_fps(args.begin, end) if pts_table is not None else cap.get(cv2.CAP_PROP_FPS)
+
+    def frames():
+        seek_frame(cap, args.begin, pts_table)
+        for frame_number in range(args.begin, end):
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield frame_number, transform_frame(frame, args.crop)
+
+    output = args.output or os.path.join(os.path.dirname(args.source),
+                                         os.path.splitext(os.path.basename(args.source))[0] + '_frames')
+    try:
+        paths = fanout_export(frames(), args.rendition or DEFAULT_RENDITIONS, output, fps, args.begin, end,
+                              progress=lambda p: print(f"\rExporting renditions: {p:.1f}%", end=""))
+    finally:
+        cap.release()
+    print()
+    for name, path in paths.items():
+        print(f"{name}: {path}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
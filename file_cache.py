@@ -0,0 +1,45 @@
+import os
+import hashlib
+import tempfile
+
+# Root directory for every derived per-file artefact (frame stores, tables, ...)
+CACHE_ROOT = os.path.join(tempfile.gettempdir(), 'VideoProcessor')
+
+
+def source_fingerprint(source):
+    stat = os.stat(source)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def content_digest(source, samples=16, block_size=64 * 1024):
+    """Digest of a file's size and evenly spread blocks of its content.
+
+    Identical content under another name or modification time gets the same
+    digest, and a rewrite in place changes it unless every sampled block is
+    unchanged. The file is read again on every call.
+    """
+    size = os.path.getsize(source)
+    digest = hashlib.sha1(str(size).encode())
+    with open(source, 'rb') as f:
+        if size <= samples * block_size:
+            digest.update(f.read())
+        else:
+            for i in range(samples):
+                f.seek((size - block_size) * i // (samples - 1))
+                digest.update(f.read(block_size))
+    return digest.hexdigest()
+
+
+def cache_path(kind, *key, suffix='', cache_dir=None):
+    """Path of a cached artefact of the given kind, named by a hash of the key parts"""
+    if cache_dir is None:
+        cache_dir = os.path.join(CACHE_ROOT, kind)
+    os.makedirs(cache_dir, exist_ok=True)
+    digest = hashlib.sha1(':'.join(str(part) for part in key).encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, digest + suffix)
+
+
+def source_cache_path(kind, source, *key, suffix='', cache_dir=None):
+    """Cache path that is invalidated whenever the source file changes"""
+    return cache_path(kind, os.path.abspath(source), *source_fingerprint(source), *key,
+                      suffix=suffix, cache_dir=cache_dir)
@@ -0,0 +1,89 @@
+from lazy_import import lazy_module
+
+cv2 = lazy_module('cv2')
+np = lazy_module('numpy')
+
+
+def read_block(cap, block, count=None):
+    """Decode up to count frames in place into the rows of a (K, H, W, 3) block"""
+    count = len(block) if count is None else count
+    n = 0
+    while n < count:
+        ret, _ = cap.read(block[n])
+        if not ret:
+            break
+        n += 1
+    return n
+
+
+def iter_blocks(cap, count, block_size):
+    """Yield (offset, frames) with frames decoded into one reused (K, H, W, 3) array"""
+    if count <= 0:
+        return
+    ret, first = cap.read()
+    if not ret:
+        return
+    block = np.empty((block_size,) + first.shape, dtype=first.dtype)
+    block[0] = first
+    n = 1 + read_block(cap, block[1:], min(block_size, count) - 1)
+    offset = 0
+    while n:
+        yield offset, block[:n]
+        offset += n
+        n = read_block(cap, block, min(block_size, count - offset))
+
+
+class BlockTransformer:
+    """Apply crop, resize and colour conversion to a whole block of frames.
+
+    Crops are views, every frame is resized straight into one reused contiguous
+    (K, h, w, 3) output and the colour conversion runs once over the block.
+    """
+    def __init__(self, clip_rect=None, size=None, color_code=None, interpolation=None):
+        self.clip_rect = clip_rect
+        self.size = tuple(size) if size else None
+        self.color_code = color_code
+        self.interpolation = cv2.INTER_LINEAR if interpolation is None else interpolation
+        self.buffers = {}
+
+    def buffer(self, name, shape):
+        # Scratch arrays are reused across blocks of the same frame shape
+        buf = self.buffers.get(name)
+        if buf is None or buf.shape[1:] != shape[1:] or len(buf) < shape[0]:
+            buf = self.buffers[name] = np.empty(shape, dtype=np.uint8)
+        return buf[:shape[0]]
+
+    def __call__(self, frames):
+        if self.clip_rect:
+            x1, y1, x2, y2 = self.clip_rect
+            frames = frames[:, y1:y2, x1:x2]
+        k, h, w, c = frames.shape
+
+        if self.size and self.size != (w, h):
+            w, h = self.size
+            out = self.buffer('resize', (k, h, w, c))
+            for i in range(k):
+                cv2.resize(frames[i], self.size, dst=out[i], interpolation=self.interpolation)
+            frames = out
+
+        if self.color_code is not None:
+            if not frames.flags.c_contiguous:
+                frames = np.ascontiguousarray(frames)
+            out = self.buffer('color', (k, h, w, c))
+            cv2.cvtColor(frames.reshape(k * h, w, c), self.color_code, dst=out.reshape(k * h, w, c))
+            frames = out
+        return frames
+
+
+def transform_frame(frame, clip_rect=None, size=None, color_code=None, interpolation=None):
+    """Per-frame equivalent of BlockTransformer"""
+    if interpolation is None:
+        interpolation = cv2.INTER_LINEAR
+    if clip_rect:
+        x1, y1, x2, y2 = clip_rect
+        frame = frame[y1:y2, x1:x2]
+    if size:
+        frame = cv2.resize(frame, tuple(size), interpolation=interpolation)
+    if color_code is not None:
+        frame = cv2.cvtColor(frame, color_code)
+    return frame
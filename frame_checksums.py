@@ -0,0 +1,212 @@
+'''
+python frame_checksums.py video.mp4 --begin 300 --end 900
+'''
+import sys
+import json
+import zlib
+import argparse
+import threading
+from collections import Counter, deque
+from bisect import bisect_right
+from timestamps import load_keyframes
+from lazy_import import lazy_module
+
+cv2 = lazy_module('cv2')
+
+
+def frame_digest(frame):
+    """CRC-32 of the decoded pixels of a frame; zlib releases the GIL on large buffers
+    and is several times faster than a cryptographic hash"""
+    return f"{zlib.crc32(memoryview(frame).cast('B')):08x}"
+
+
+def reference_digests(source, frame_numbers, keyframes=None, cancelled=None):
+    """{frame_number: digest} from a decode that does not trust frame seeks.
+
+    Decoding starts at the keyframe before the first frame, where a seek lands
+    exactly, or at the start of the file without keyframe data; everything
+    up to the requested frames is stepped through with grab(). Setting the
+    cancelled event stops the decode early.
+    """
+    wanted = sorted(set(frame_numbers))
+    digests = {}
+    if not wanted:
+        return digests
+    cap = cv2.VideoCapture(source)
+    try:
+        position = 0
+        if keyframes and wanted[0] >= keyframes[0]:
+            keyframe = keyframes[bisect_right(keyframes, wanted[0]) - 1]
+            cap.set(cv2.CAP_PROP_POS_FRAMES, keyframe)
+            if int(cap.get(cv2.CAP_PROP_POS_FRAMES)) == keyframe:
+                position = keyframe
+            else:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        for frame_number in wanted:
+            if cancelled is not None and cancelled.is_set():
+                return digests
+            while position < frame_number:
+                if cancelled is not None and cancelled.is_set():
+                    return digests
+                if not cap.grab():
+                    return digests
+                position += 1
+            ret, frame = cap.read()
+            if not ret:
+                return digests
+            position += 1
+            digests[frame_number] = frame_digest(frame)
+    finally:
+        cap.release()
+    return digests
+
+
+def compare_digests(expected, recorded, reference):
+    """Report of an export: frames that were not written, written twice or whose
+    pixels are not the source frame of that number (with the frame they match, if any)"""
+    by_digest = {}
+    for frame_number, digest in reference.items():
+        by_digest.setdefault(digest, frame_number)
+    written = Counter(frame_number for frame_number, _ in recorded)
+    missing = [n for n in expected if n not in written]
+    duplicated = sorted(n for n, count in written.items() if count > 1)
+    mismatched = []
+    for frame_number, digest in recorded:
+        if frame_number in reference and reference[frame_number] != digest:
+            mismatched.append({'frame': frame_number, 'matches': by_digest.get(digest)})
+    unverified = [n for n in written if n not in reference]
+    return {
+        'expected': len(expected),
+        'written': len(recorded),
+        'missing': missing,
+        'duplicated': duplicated,
+        'mismatched': mismatched,
+        'unverified': unverified,
+        'ok': not (missing or duplicated or mismatched or unverified),
+    }
+
+
+class ExportVerifier:
+    """Checksum exported source frames on a side thread and check them against
+    an independent decode of the same frames.
+
+    record() only queues the frame, which must not be modified afterwards; it
+    blocks while the queued frames take more than max_inflight_bytes. The
+    reference decode runs on a second thread while the export is going.
+    """
+    def __init__(self, source, frame_numbers, max_inflight_bytes=256 * 1024 * 1024):
+        self.source = source
+        self.expected = list(frame_numbers)
+        self.recorded = []
+        self.reference = {}
+        self.error = None
+        self.max_inflight_bytes = max_inflight_bytes
+        self.queue = deque()
+        self.inflight_bytes = 0
+        self.closed = False
+        self.cancelled = threading.Event()
+        self.cond = threading.Condition()
+        self.hasher = threading.Thread(target=self.hash_frames, daemon=True)
+        self.decoder = threading.Thread(target=self.decode_reference, daemon=True)
+        self.hasher.start()
+        self.decoder.start()
+
+    def record(self, frame_number, frame):
+        with self.cond:
+            # Always admit one frame so a frame over the budget cannot deadlock
+            while self.inflight_bytes > 0 and self.inflight_bytes + frame.nbytes > self.max_inflight_bytes:
+                self.cond.wait()
+            self.queue.append((frame_number, frame))
+            self.inflight_bytes += frame.nbytes
+            self.cond.notify_all()
+
+    def hash_frames(self):
+        while True:
+            with self.cond:
+                while not self.queue and not self.closed:
+                    self.cond.wait()
+                if not self.queue or self.cancelled.is_set():
+                    return
+                frame_number, frame = self.queue[0]
+            digest = frame_digest(frame)
+            with self.cond:
+                self.recorded.append((frame_number, digest))
+                self.queue.popleft()
+                self.inflight_bytes -= frame.nbytes
+                self.cond.notify_all()
+
+    def decode_reference(self):
+        try:
+            self.reference = reference_digests(self.source, self.expected, load_keyframes(self.source),
+                                               self.cancelled)
+        except Exception as e:
+            self.error = e
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+        self.hasher.join()
+        self.decoder.join()
+
+    def finish(self):
+        """Wait for both threads and return the comparison report"""
+        self.close()
+        if self.error is not None:
+            raise self.error
+        return compare_digests(self.expected, self.recorded, self.reference)
+
+    def cancel(self):
+        """Stop both threads without a report, e.g. when the export failed"""
+        self.cancelled.set()
+        self.close()
+
+
+def format_report(report, limit=10):
+    if report['ok']:
+        return f"Verified {report['written']} frames"
+    lines = [f"{report['written']} of {report['expected']} frames written"]
+    if report['missing']:
+        lines.append(f"Missing: {report['missing'][:limit]}{' ...' if len(report['missing']) > limit else ''}")
+    if report['duplicated']:
+        lines.append(f"Written more than once: {report['duplicated'][:limit]}")
+    if report['mismatched']:
+        shown = [f"{m['frame']} (is {m['matches'] if m['matches'] is not None else 'unknown'})"
+                 for m in report['mismatched'][:limit]]
+        lines.append(f"Wrong content: {', '.join(shown)}{' ...' if len(report['mismatched']) > limit else ''}")
+    if report['unverified']:
+        lines.append(f"Not in the reference decode: {len(report['unverified'])} frames")
+    return '\n'.join(lines)
+
+
+def main():
+    from timestamps import load_pts_table, seek_frame
+
+    parser = argparse.ArgumentParser(description="Check that seeking reads exactly the frames of a range")
+    parser.add_argument('source')
+    parser.add_argument('--begin', type=int, default=0)
+    parser.add_argument('--end', type=int)
+    parser.add_argument('--report', help="write the JSON report here")
+    args = parser.parse_args()
+
+    cap = cv2.VideoCapture(args.source)
+    end = args.end or int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    verifier = ExportVerifier(args.source, range(args.begin, end))
+    # Read the range the way exports do: one seek, then sequential reads
+    seek_frame(cap, args.begin, load_pts_table(args.source, build=False))
+    for frame_number in range(args.begin, end):
+        ret, frame = cap.read()
+        if not ret:
+            break
+        verifier.record(frame_number, frame)
+    cap.release()
+    report = verifier.finish()
+    print(format_report(report))
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=1)
+    return 0 if report['ok'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,56 @@
+import json
+from lazy_import import lazy_module
+
+cv2 = lazy_module('cv2')
+np = lazy_module('numpy')
+
+HASH_SIZE = 16  # 16x16 gradient bits = 256-bit hash; 8x8 misses small text changes
+
+
+def dhash(frame):
+    """Difference hash of a BGR or grayscale frame, as an int of HASH_SIZE ** 2 bits.
+
+    The frame is reduced to a (HASH_SIZE + 1) x HASH_SIZE grey image and every
+    bit says whether a pixel is brighter than its right-hand neighbour.
+    """
+    small = cv2.resize(frame, (HASH_SIZE + 1, HASH_SIZE), interpolation=cv2.INTER_AREA)
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    bits = small[:, 1:] > small[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+class DuplicateFilter:
+    """Flag frames whose hash is within threshold bits of the last kept frame.
+
+    Every checked frame is recorded in an index of {frame, hash, duplicate_of}.
+    """
+    def __init__(self, threshold=0):
+        self.threshold = threshold
+        self.last_hash = None
+        self.last_frame = None
+        self.index = []
+
+    def check(self, frame_number, frame):
+        """Frame number of the kept frame this one duplicates, or None to keep it"""
+        frame_hash = dhash(frame)
+        duplicate_of = None
+        if self.last_hash is not None and hamming(frame_hash, self.last_hash) <= self.threshold:
+            duplicate_of = self.last_frame
+        else:
+            self.last_hash = frame_hash
+            self.last_frame = frame_number
+        self.index.append({'frame': frame_number, 'hash': f"{frame_hash:0{HASH_SIZE * HASH_SIZE // 4}x}", 'duplicate_of': duplicate_of})
+        return duplicate_of
+
+    def duplicates(self):
+        return [(entry['frame'], entry['duplicate_of']) for entry in self.index
+                if entry['duplicate_of'] is not None]
+
+    def index_bytes(self):
+        return json.dumps({'hash': f'dhash{HASH_SIZE * HASH_SIZE}', 'threshold': self.threshold,
+                           'frames': self.index}, indent=0).encode()
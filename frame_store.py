@@ -0,0 +1,188 @@
+import os
+import struct
+from file_cache import CACHE_ROOT, cache_path, source_fingerprint
+from lazy_import import lazy_module
+
+cv2 = lazy_module('cv2')
+np = lazy_module('numpy')
+
+# Header layout: magic, version, begin, count, filled, height, width, channels,
+# source size, source mtime. Frame data starts at a page-aligned offset.
+HEADER_FORMAT = '<4sIqqqiiiqq'
+HEADER_SIZE = 4096
+MAGIC = b'VPFS'
+VERSION = 1
+
+
+def frame_store_path(source, begin, end, cache_dir=None):
+    """Local cache path of the raw store for a segment of a source file"""
+    return cache_path('frame_store', os.path.abspath(source), begin, end,
+                      suffix='.raw', cache_dir=cache_dir)
+
+
+class FrameStore:
+    """Fixed-stride uint8 frame array on disk, read through numpy memmap views"""
+    def __init__(self, path, mode='r'):
+        self.path = path
+        with open(path, 'rb') as f:
+            header = struct.unpack(HEADER_FORMAT, f.read(struct.calcsize(HEADER_FORMAT)))
+        (magic, version, self.begin, self.count, self.filled, height, width, channels,
+         self.source_size, self.source_mtime) = header
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not a frame store: {path}")
+        self.frame_shape = (height, width, channels)
+        self.frames = np.memmap(path, dtype=np.uint8, mode=mode, offset=HEADER_SIZE,
+                                shape=(self.count,) + self.frame_shape)
+
+    @classmethod
+    def create(cls, path, begin, count, frame_shape, source):
+        source_size, source_mtime = source_fingerprint(source)
+        height, width, channels = frame_shape
+        with open(path, 'wb') as f:
+            f.write(struct.pack(HEADER_FORMAT, MAGIC, VERSION, begin, count, 0,
+                                height, width, channels, source_size, source_mtime))
+            # Reserve the whole array up front so the memmap has a fixed size
+            f.truncate(HEADER_SIZE + count * height * width * channels)
+        return cls(path, mode='r+')
+
+    @property
+    def end(self):
+        return self.begin + self.filled
+
+    @property
+    def nbytes(self):
+        return self.frames.nbytes
+
+    def matches(self, source):
+        return (self.source_size, self.source_mtime) == source_fingerprint(source)
+
+    def covers(self, frame_number):
+        return self.begin <= frame_number < self.begin + self.filled
+
+    def covers_range(self, begin, end):
+        return self.begin <= begin and end <= self.begin + self.filled
+
+    def frame(self, frame_number):
+        # Zero-copy view into the mapped file
+        return self.frames[frame_number - self.begin]
+
+    def append(self, frame):
+        self.frames[self.filled] = frame
+        self.filled += 1
+
+    def flush(self):
+        self.frames.flush()
+        with open(self.path, 'r+b') as f:
+            f.seek(struct.calcsize('<4sIqq'))
+            f.write(struct.pack('<q', self.filled))
+
+    def trim(self):
+        """Shrink a writable store to the frames appended so far, for a source that ended early"""
+        self.flush()
+        self.frames = None
+        with open(self.path, 'r+b') as f:
+            f.seek(struct.calcsize('<4sIq'))
+            f.write(struct.pack('<qq', self.filled, self.filled))
+            height, width, channels = self.frame_shape
+            f.truncate(HEADER_SIZE + self.filled * height * width * channels)
+        self.count = self.filled
+
+    def close(self):
+        if self.frames is not None:
+            if self.frames.mode == 'r+':
+                self.flush()
+            # The mapping is released once outstanding frame views are dropped
+            self.frames = None
+
+
+def open_frame_store(source, begin, end, cache_dir=None):
+    """Return a complete read-only store for the segment, or None if it has to be built.
+
+    A store trimmed because the source ended early is complete up to that end.
+    """
+    path = frame_store_path(source, begin, end, cache_dir)
+    if not os.path.exists(path):
+        return None
+    try:
+        store = FrameStore(path)
+    except (ValueError, struct.error):
+        return None
+    if not store.matches(source) or store.begin != begin or store.filled != store.count:
+        store.close()
+        return None
+    # The modification time orders stores for eviction
+    os.utime(path)
+    return store
+
+
+def evict_frame_stores(max_bytes, cache_dir=None, keep=()):
+    """Remove the least recently used stores until the others take at most max_bytes"""
+    cache_dir = cache_dir or os.path.join(CACHE_ROOT, 'frame_store')
+    entries = []
+    for entry in os.scandir(cache_dir) if os.path.isdir(cache_dir) else ():
+        if entry.name.endswith('.raw') and entry.path not in keep:
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            # Still mapped by a live frame view (Windows)
+            pass
+
+
+def build_frame_store(cap, source, begin, end, cache_dir=None, max_bytes=None, progress=None,
+                      seek=None, cache_bytes=None, keep=()):
+    """Decode frames [begin, end) once into a raw store and return it opened read-only.
+
+    With cache_bytes, older stores (except the paths in keep) are evicted first
+    so all stores together stay within cache_bytes.
+    """
+    store = open_frame_store(source, begin, end, cache_dir)
+    if store is not None:
+        return store
+
+    if seek is not None:
+        seek(begin)
+    else:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, begin)
+    ret, frame = cap.read()
+    if not ret:
+        raise Exception("Failed to decode segment start")
+    count = end - begin
+    if max_bytes is not None and count * frame.nbytes > max_bytes:
+        raise Exception(f"Segment needs {count * frame.nbytes / 1e9:.1f} GB, "
+                        f"over the {max_bytes / 1e9:.1f} GB frame store budget")
+
+    path = frame_store_path(source, begin, end, cache_dir)
+    if cache_bytes is not None:
+        evict_frame_stores(cache_bytes - count * frame.nbytes, os.path.dirname(path), keep)
+    store = FrameStore.create(path, begin, count, frame.shape, source)
+    try:
+        store.append(frame)
+        while store.filled < count:
+            ret, frame = cap.read()
+            if not ret:
+                # Record where the source really ends, so the store is reused
+                store.trim()
+                break
+            store.append(frame)
+            if progress:
+                progress(store.filled / count * 100)
+    finally:
+        store.close()
+    return FrameStore(path)
+
+
+def remove_frame_store(store):
+    path = store.path
+    store.close()
+    try:
+        os.remove(path)
+    except OSError:
+        # Still mapped by a live frame view (Windows) or already gone
+        pass
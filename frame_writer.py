@@ -0,0 +1,202 @@
+import os
+import io
+import json
+import time
+import tarfile
+import zipfile
+import threading
+from collections import deque
+
+
+class DirectorySink:
+    """Write each frame as its own file inside a directory"""
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.unsynced = []
+
+    def write(self, name, data):
+        file_path = os.path.join(self.path, name)
+        # Write under a temporary name so an interrupted export never leaves a partial frame
+        tmp_path = file_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, file_path)
+        self.unsynced.append(file_path)
+
+    def sync(self):
+        for file_path in self.unsynced:
+            with open(file_path, 'rb+') as f:
+                os.fsync(f.fileno())
+        self.unsynced = []
+        # Persist the directory entries as well (not supported on Windows)
+        if hasattr(os, 'O_DIRECTORY'):
+            fd = os.open(self.path, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def close(self):
+        pass
+
+
+class TarSink:
+    """Append frames to a single uncompressed tar archive"""
+    def __init__(self, path):
+        self.path = path
+        self.tar = tarfile.open(path, 'w')
+
+    def write(self, name, data):
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = int(time.time())
+        self.tar.addfile(info, io.BytesIO(data))
+
+    def sync(self):
+        self.tar.fileobj.flush()
+        os.fsync(self.tar.fileobj.fileno())
+
+    def close(self):
+        self.tar.close()
+
+
+class ZipSink:
+    """Append frames to a single zip archive (stored, images are already compressed)"""
+    def __init__(self, path):
+        self.path = path
+        self.zip = zipfile.ZipFile(path, 'w', zipfile.ZIP_STORED)
+
+    def write(self, name, data):
+        self.zip.writestr(name, bytes(data))
+
+    def sync(self):
+        self.zip.fp.flush()
+        os.fsync(self.zip.fp.fileno())
+
+    def close(self):
+        self.zip.close()
+
+
+class ShardSink:
+    """Pack frames back to back into one binary file with a JSON offset index"""
+    def __init__(self, path):
+        self.path = path
+        self.index_path = path + '.idx'
+        self.file = open(path, 'wb')
+        self.offset = 0
+        self.index = []
+
+    def write(self, name, data):
+        self.file.write(data)
+        self.index.append((name, self.offset, len(data)))
+        self.offset += len(data)
+
+    def sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+        with open(self.index_path, 'w') as f:
+            json.dump({'entries': self.index}, f)
+
+
+def read_shard(path):
+    """Yield (name, bytes) for every frame stored in a shard written by ShardSink"""
+    with open(path + '.idx') as f:
+        entries = json.load(f)['entries']
+    with open(path, 'rb') as f:
+        for name, offset, length in entries:
+            f.seek(offset)
+            yield name, f.read(length)
+
+
+# Container name -> (sink class, file suffix appended to the output base path)
+SINKS = {
+    'Folder': (DirectorySink, ''),
+    'Tar': (TarSink, '.tar'),
+    'Zip': (ZipSink, '.zip'),
+    'Shard': (ShardSink, '.shard'),
+}
+
+
+def open_frame_sink(container, base_path):
+    sink_class, suffix = SINKS[container]
+    return sink_class(base_path + suffix)
+
+
+class AsyncFrameWriter:
+    """Write encoded frames on a background thread with a bounded in-flight byte budget"""
+    def __init__(self, sink, max_inflight_bytes=64 * 1024 * 1024, fsync_every=0):
+        self.sink = sink
+        self.max_inflight_bytes = max_inflight_bytes
+        self.fsync_every = fsync_every  # 0 disables fsync batching
+        self.queue = deque()
+        self.inflight_bytes = 0
+        self.written = 0
+        self.closed = False
+        self.error = None
+        self.cond = threading.Condition()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    @property
+    def path(self):
+        return self.sink.path
+
+    def submit(self, name, data):
+        size = len(data)
+        with self.cond:
+            # Block the producer while the budget is exhausted, but always admit
+            # at least one item so oversized frames cannot deadlock
+            while (self.error is None and self.inflight_bytes > 0 and
+                   self.inflight_bytes + size > self.max_inflight_bytes):
+                self.cond.wait()
+            if self.error is not None:
+                raise self.error
+            self.queue.append((name, data))
+            self.inflight_bytes += size
+            self.cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.queue and not self.closed:
+                    self.cond.wait()
+                if not self.queue:
+                    return
+                name, data = self.queue[0]
+            try:
+                if self.error is None:
+                    self.sink.write(name, data)
+                    self.written += 1
+                    if self.fsync_every and self.written % self.fsync_every == 0:
+                        self.sink.sync()
+            except Exception as e:
+                with self.cond:
+                    self.error = e
+            with self.cond:
+                self.queue.popleft()
+                self.inflight_bytes -= len(data)
+                self.cond.notify_all()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+        self.thread.join()
+        try:
+            if self.error is None and self.fsync_every:
+                self.sink.sync()
+        finally:
+            self.sink.close()
+        if self.error is not None:
+            raise self.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
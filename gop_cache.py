@@ -0,0 +1,126 @@
+'''
+python gop_cache.py video.mp4 --frame 1500 --steps 200
+'''
+import sys
+import time
+import argparse
+from bisect import bisect_right
+from collections import OrderedDict
+from timestamps import load_keyframes, load_pts_table, seek_frame
+from lazy_import import lazy_module
+
+cv2 = lazy_module('cv2')
+
+
+class GopCache:
+    """Decoded frames of recently visited GOPs, for stepping and playing backwards.
+
+    A frame that is not cached costs one seek to a keyframe at least window
+    frames before it and a forward decode up to it; every frame decoded on the
+    way is kept, so the frames before it are then served from memory and each
+    frame is decoded about once however it is stepped through. Frames are
+    evicted least recently used first once max_bytes is exceeded.
+    """
+    def __init__(self, source, keyframes=None, max_bytes=512 * 1024 * 1024, window=64):
+        self.source = source
+        self.keyframes = keyframes
+        self.max_bytes = max_bytes
+        self.window = window
+        self.frames = OrderedDict()  # frame_number -> frame
+        self.nbytes = 0
+
+    def __contains__(self, frame_number):
+        return frame_number in self.frames
+
+    def get(self, frame_number):
+        frame = self.frames.get(frame_number)
+        if frame is not None:
+            self.frames.move_to_end(frame_number)
+        return frame
+
+    def run_start(self, frame_number, frame_bytes):
+        """First frame of the decode run that ends at frame_number"""
+        # Every seek decodes some frames before its target, so runs span at
+        # least window frames and start on a keyframe, where seeks land cheaply
+        start = max(frame_number - self.window + 1, 0)
+        if self.keyframes and start >= self.keyframes[0]:
+            start = self.keyframes[bisect_right(self.keyframes, start) - 1]
+        # Long GOPs are decoded in parts that fit the cache
+        return max(start, frame_number - max(self.max_bytes // max(frame_bytes, 1), 1) + 1)
+
+    def decode_to(self, cap, frame_number, pts_table=None):
+        """Decode the run ending at frame_number into the cache and return that frame.
+
+        The capture is left positioned after frame_number. Returns None when
+        the frame cannot be read.
+        """
+        frame_bytes = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)) * int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) * 3
+        start = self.run_start(frame_number, frame_bytes)
+        seek_frame(cap, start, pts_table)
+        frame = None
+        for position in range(start, frame_number + 1):
+            ret, frame = cap.read()
+            if not ret:
+                return None
+            self.put(position, frame)
+        return frame
+
+    def frame(self, cap, frame_number, pts_table=None):
+        frame = self.get(frame_number)
+        return frame if frame is not None else self.decode_to(cap, frame_number, pts_table)
+
+    def put(self, frame_number, frame):
+        old = self.frames.pop(frame_number, None)
+        if old is not None:
+            self.nbytes -= old.nbytes
+        self.frames[frame_number] = frame
+        self.nbytes += frame.nbytes
+        while self.nbytes > self.max_bytes and len(self.frames) > 1:
+            _, evicted = self.frames.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+
+    def clear(self):
+        self.frames.clear()
+        self.nbytes = 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare forward and backward frame stepping costs")
+    parser.add_argument('source')
+    parser.add_argument('--frame', type=int, default=0, help="first frame of the stepped range")
+    parser.add_argument('--steps', type=int, default=200)
+    parser.add_argument('--max-mb', type=int, default=512)
+    args = parser.parse_args()
+
+    cap = cv2.VideoCapture(args.source)
+    if not cap.isOpened():
+        raise Exception("Failed to open video file")
+    pts_table = load_pts_table(args.source, build=False)
+    begin, end = args.frame, args.frame + args.steps
+
+    start = time.perf_counter()
+    seek_frame(cap, begin, pts_table)
+    for _ in range(begin, end):
+        cap.read()
+    forward = (time.perf_counter() - start) / args.steps * 1000
+    print(f"{'Forward':20s} {forward:7.2f} ms/frame")
+
+    start = time.perf_counter()
+    for frame_number in range(end - 1, max(end - 1 - min(args.steps, 30), begin - 1), -1):
+        seek_frame(cap, frame_number, pts_table)
+        cap.read()
+    seeking = (time.perf_counter() - start) / min(args.steps, 30) * 1000
+    print(f"{'Backward, seeking':20s} {seeking:7.2f} ms/frame")
+
+    cache = GopCache(args.source, load_keyframes(args.source), args.max_mb * 1024 * 1024)
+    start = time.perf_counter()
+    for frame_number in range(end - 1, begin - 1, -1):
+        if cache.frame(cap, frame_number, pts_table) is None:
+            break
+    cached = (time.perf_counter() - start) / args.steps * 1000
+    print(f"{'Backward, GOP cache':20s} {cached:7.2f} ms/frame")
+    cap.release()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,245 @@
+'''
+python ingest.py scan /videos/watch --workers 8
+python ingest.py list --under /videos/watch --codec h264 --min-width 1920
+python ingest.py list --name interview --min-duration 60 --limit 20
+'''
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from capture_pool import probe_capture
+from file_cache import CACHE_ROOT
+from lazy_import import lazy_module
+
+cv2 = lazy_module('cv2')
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov')
+CATALOG_PATH = os.path.join(CACHE_ROOT, 'catalog.sqlite')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    directory TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    fps REAL,
+    frame_count INTEGER,
+    width INTEGER,
+    height INTEGER,
+    codec TEXT,
+    duration REAL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS files_directory ON files (directory);
+CREATE INDEX IF NOT EXISTS files_codec ON files (codec);
+CREATE INDEX IF NOT EXISTS files_size ON files (width, height);
+CREATE INDEX IF NOT EXISTS files_duration ON files (duration);
+'''
+COLUMNS = ('path', 'directory', 'name', 'size', 'mtime_ns', 'fps', 'frame_count', 'width', 'height',
+           'codec', 'duration', 'error')
+
+
+def walk_videos(root):
+    """Yield (path, size, mtime_ns) of every video file under root"""
+    stack = [root]
+    while stack:
+        try:
+            entries = list(os.scandir(stack.pop()))
+        except OSError:
+            continue
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.lower().endswith(VIDEO_EXTENSIONS):
+                    stat = entry.stat()
+                    yield os.path.abspath(entry.path), stat.st_size, stat.st_mtime_ns
+            except OSError:
+                continue
+
+
+def probe_file(path):
+    """Stream properties of one file; {'error': ...} when it cannot be opened"""
+    cap = cv2.VideoCapture(path)
+    try:
+        if not cap.isOpened():
+            return {'error': 'cannot open'}
+        probe = probe_capture(cap)
+    finally:
+        cap.release()
+    probe['duration'] = probe['frame_count'] / probe['fps'] if probe['fps'] else None
+    return probe
+
+
+def subtree_bounds(root):
+    # Every path under root sorts between these two, so the primary key index is used
+    prefix = os.path.join(os.path.abspath(root), '')
+    return prefix, prefix[:-1] + chr(ord(os.sep) + 1)
+
+
+class Catalog:
+    """SQLite index of the stream properties of every ingested video.
+
+    Connections are per thread, so a catalog can be shared by the GUI and its
+    scanning thread.
+    """
+    def __init__(self, path=CATALOG_PATH):
+        self.path = path
+        self.local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.db.executescript(SCHEMA)
+
+    @property
+    def db(self):
+        db = getattr(self.local, 'db', None)
+        if db is None:
+            db = self.local.db = sqlite3.connect(self.path, timeout=30)
+            db.row_factory = sqlite3.Row
+            db.execute('PRAGMA journal_mode=WAL')
+        return db
+
+    def scan(self, root, workers=8, progress=None):
+        """Bring the catalog in line with the videos under root.
+
+        Only new files and files whose size or mtime changed are probed, on a
+        pool of workers; entries of deleted files are dropped.
+        Returns {'probed', 'unchanged', 'removed'}.
+        """
+        low, high = subtree_bounds(root)
+        known = {row['path']: (row['size'], row['mtime_ns']) for row in self.db.execute(
+            'SELECT path, size, mtime_ns FROM files WHERE path >= ? AND path < ?', (low, high))}
+        found = {path: (size, mtime_ns) for path, size, mtime_ns in walk_videos(root)}
+        changed = [path for path, stat in found.items() if known.get(path) != stat]
+        removed = [path for path in known if path not in found]
+
+        with self.db:
+            self.db.executemany('DELETE FROM files WHERE path = ?', ((path,) for path in removed))
+        self.probe_files(changed, found, workers, progress)
+        return {'probed': len(changed), 'unchanged': len(found) - len(changed), 'removed': len(removed)}
+
+    def add_files(self, paths, workers=8, progress=None):
+        """Probe the given videos unless the catalog already has their current version.
+
+        Returns the number of files probed.
+        """
+        found = {}
+        for path in paths:
+            path = os.path.abspath(path)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            found[path] = (stat.st_size, stat.st_mtime_ns)
+        changed = []
+        for path, stat in found.items():
+            row = self.get(path)
+            if row is None or (row['size'], row['mtime_ns']) != stat:
+                changed.append(path)
+        self.probe_files(changed, found, workers, progress)
+        return len(changed)
+
+    def probe_files(self, paths, found, workers=8, progress=None):
+        # Probes run concurrently; rows are written from this thread only
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(probe_file, path): path for path in paths}
+            rows = []
+            for done, future in enumerate(as_completed(futures), 1):
+                path = futures[future]
+                try:
+                    probe = future.result()
+                except Exception as e:
+                    probe = {'error': str(e)}
+                size, mtime_ns = found[path]
+                rows.append(dict(probe, path=path, directory=os.path.dirname(path),
+                                 name=os.path.basename(path), size=size, mtime_ns=mtime_ns))
+                # Commit in batches so an interrupted scan keeps its progress
+                if len(rows) >= 256 or done == len(futures):
+                    self.upsert(rows)
+                    rows = []
+                if progress:
+                    progress(done / len(futures) * 100)
+
+    def upsert(self, rows):
+        placeholders = ', '.join('?' * len(COLUMNS))
+        with self.db:
+            self.db.executemany(f'INSERT OR REPLACE INTO files ({", ".join(COLUMNS)}) VALUES ({placeholders})',
+                                ([row.get(column) for column in COLUMNS] for row in rows))
+
+    def query(self, under=None, name=None, codec=None, min_width=None, min_height=None,
+              min_duration=None, max_duration=None, order_by='path', limit=None):
+        """Catalog rows matching every given filter, as dicts"""
+        if order_by not in COLUMNS:
+            raise ValueError(f"Cannot order by {order_by}")
+        clauses, args = ['error IS NULL'], []
+        if under:
+            clauses.append('path >= ? AND path < ?')
+            args += subtree_bounds(under)
+        if name:
+            # Wildcards typed in the filter match literally
+            clauses.append("name LIKE ? ESCAPE '\\'")
+            pattern = name.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            args.append(f'%{pattern}%')
+        if codec:
+            clauses.append('codec = ? COLLATE NOCASE')
+            args.append(codec)
+        for clause, value in (('width >= ?', min_width), ('height >= ?', min_height),
+                              ('duration >= ?', min_duration), ('duration <= ?', max_duration)):
+            if value is not None:
+                clauses.append(clause)
+                args.append(value)
+        sql = f'SELECT * FROM files WHERE {" AND ".join(clauses)} ORDER BY {order_by}'
+        if limit:
+            sql += f' LIMIT {int(limit)}'
+        return [dict(row) for row in self.db.execute(sql, args)]
+
+    def get(self, path):
+        row = self.db.execute('SELECT * FROM files WHERE path = ?', (os.path.abspath(path),)).fetchone()
+        return dict(row) if row else None
+
+    def close(self):
+        db = getattr(self.local, 'db', None)
+        if db is not None:
+            db.close()
+            self.local.db = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index the videos of a directory tree")
+    parser.add_argument('--catalog', default=CATALOG_PATH)
+    commands = parser.add_subparsers(dest='command', required=True)
+    scan = commands.add_parser('scan', help="add new and changed files, drop deleted ones")
+    scan.add_argument('root')
+    scan.add_argument('--workers', type=int, default=8)
+    listing = commands.add_parser('list', help="print catalog entries")
+    listing.add_argument('--under')
+    listing.add_argument('--name', help="substring of the file name")
+    listing.add_argument('--codec')
+    listing.add_argument('--min-width', type=int)
+    listing.add_argument('--min-height', type=int)
+    listing.add_argument('--min-duration', type=float, help="seconds")
+    listing.add_argument('--max-duration', type=float, help="seconds")
+    listing.add_argument('--order-by', default='path', choices=COLUMNS)
+    listing.add_argument('--limit', type=int)
+    args = parser.parse_args()
+
+    catalog = Catalog(args.catalog)
+    if args.command == 'scan':
+        start = time.perf_counter()
+        counts = catalog.scan(args.root, args.workers,
+                              progress=lambda p: print(f"\rProbing: {p:.1f}%", end=""))
+        print(f"\n{counts['probed']} probed, {counts['unchanged']} unchanged, {counts['removed']} removed "
+              f"in {time.perf_counter() - start:.2f}s")
+        return
+    rows = catalog.query(args.under, args.name, args.codec, args.min_width, args.min_height,
+                         args.min_duration, args.max_duration, args.order_by, args.limit)
+    for row in rows:
+        print(f"{row['width']}x{row['height']} {row['fps']:6.2f} fps {row['frame_count']:8d} frames "
+              f"{row['codec']:5s} {row['path']}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
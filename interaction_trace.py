@@ -0,0 +1,327 @@
+'''
+VIDEOPROCESSOR_TRACE=session.jsonl python main.py
+python interaction_trace.py replay session.jsonl --profile session.prof
+python interaction_trace.py replay session.jsonl --profiler sample --profile session.folded --source other.mp4
+python interaction_trace.py stats session.jsonl
+'''
+import os
+import sys
+import json
+import time
+import cProfile
+import argparse
+import threading
+import functools
+from collections import Counter
+
+# Upper bucket edges of the latency histograms, in milliseconds
+HISTOGRAM_EDGES_MS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+recorder = None
+
+
+class InteractionRecorder:
+    """Append traced handler calls to a JSON-lines file.
+
+    Each line is {"t": seconds since the recording started, "handler",
+    "args", "ms": time spent in the handler}. Only outermost calls are
+    written: handlers called by other handlers are part of their caller's
+    latency and are not replayed separately. path None keeps the events in
+    memory only.
+    """
+    def __init__(self, path=None):
+        self.path = path
+        self.file = open(path, 'w', buffering=1) if path else None
+        self.events = []
+        self.depth = 0
+        self.start = time.perf_counter()
+
+    def record(self, handler, args, start, end):
+        event = {'t': round(start - self.start, 6), 'handler': handler, 'args': args,
+                 'ms': round((end - start) * 1000, 3)}
+        self.events.append(event)
+        if self.file is not None:
+            self.file.write(json.dumps(event) + '\n')
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def start_recording(path=None):
+    global recorder
+    stop_recording()
+    recorder = InteractionRecorder(path)
+    return recorder
+
+
+def stop_recording():
+    global recorder
+    if recorder is not None:
+        recorder.close()
+    stopped, recorder = recorder, None
+    return stopped
+
+
+def traced(capture=None):
+    """Record calls of a UI handler while a recorder is active.
+
+    capture(self, *args) returns the JSON-able arguments replay needs; by
+    default the call arguments are stored. Like Qt, extra signal arguments
+    the handler does not take (e.g. clicked's checked flag) are dropped.
+    """
+    def decorate(method):
+        handler = method.__qualname__
+        code = method.__code__
+        nargs = None if code.co_flags & 0x04 else code.co_argcount - 1  # CO_VARARGS
+
+        @functools.wraps(method)
+        def wrapper(self, *args):
+            args = args[:nargs] if nargs is not None else args
+            active = recorder
+            if active is None:
+                return method(self, *args)
+            active.depth += 1
+            start = time.perf_counter()
+            try:
+                return method(self, *args)
+            finally:
+                end = time.perf_counter()
+                active.depth -= 1
+                if active.depth == 0:
+                    active.record(handler, capture(self, *args) if capture else list(args), start, end)
+        return wrapper
+    return decorate
+
+
+def load_trace(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def latency_histogram(latencies_ms):
+    """[(bucket label, count)] over HISTOGRAM_EDGES_MS plus an open last bucket"""
+    counts = Counter()
+    for ms in latencies_ms:
+        counts[next((edge for edge in HISTOGRAM_EDGES_MS if ms < edge), None)] += 1
+    labels = []
+    low = 0
+    for edge in HISTOGRAM_EDGES_MS:
+        labels.append((f"{low}-{edge} ms", counts[edge]))
+        low = edge
+    labels.append((f">={low} ms", counts[None]))
+    return labels
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(int(fraction * len(sorted_values)), len(sorted_values) - 1)]
+
+
+def handler_latencies(events):
+    """{handler: {'count', 'p50_ms', 'p95_ms', 'max_ms', 'histogram'}}"""
+    by_handler = {}
+    for event in events:
+        by_handler.setdefault(event['handler'], []).append(event['ms'])
+    stats = {}
+    for handler, latencies in sorted(by_handler.items()):
+        latencies.sort()
+        stats[handler] = {
+            'count': len(latencies),
+            'p50_ms': percentile(latencies, 0.5),
+            'p95_ms': percentile(latencies, 0.95),
+            'max_ms': latencies[-1],
+            'histogram': latency_histogram(latencies),
+        }
+    return stats
+
+
+def format_latencies(stats, width=40):
+    lines = []
+    for handler, s in stats.items():
+        lines.append(f"{handler}: {s['count']} calls, p50 {s['p50_ms']:.1f} ms, "
+                     f"p95 {s['p95_ms']:.1f} ms, max {s['max_ms']:.1f} ms")
+        peak = max(count for _, count in s['histogram'])
+        # Empty buckets above the slowest call are left out
+        last = max(i for i, (_, count) in enumerate(s['histogram']) if count)
+        for label, count in s['histogram'][:last + 1]:
+            lines.append(f"  {label:>12s} {count:6d} {'#' * round(count / peak * width)}")
+    return '\n'.join(lines)
+
+
+class StackSampler:
+    """Sampling profiler for one thread, writing folded stacks.
+
+    Every interval seconds the thread's Python stack is recorded as
+    "file:function;file:function ..." lines with counts, the input format of
+    flamegraph.pl and speedscope.
+    """
+    def __init__(self, thread_id=None, interval=0.002):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.stacks = Counter()
+        self.running = False
+        self.thread = None
+
+    def enable(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+        self.thread.start()
+
+    def disable(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+
+    def sample(self):
+        while self.running:
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+            time.sleep(self.interval)
+
+    def dump_stats(self, path):
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def mouse_event(kind):
+    # ClipWidget mouse handlers: args are the position and the widget size it was recorded at
+    def replay(player, method, args):
+        from PyQt5.QtCore import QEvent, QPointF, QSize, Qt
+        from PyQt5.QtGui import QMouseEvent
+        x, y, width, height = args
+        widget = method.__self__
+        if widget.size() != QSize(width, height):
+            widget.resize(width, height)
+        buttons = Qt.NoButton if kind == QEvent.MouseButtonRelease else Qt.LeftButton
+        method(QMouseEvent(kind, QPointF(x, y), Qt.LeftButton, buttons, Qt.NoModifier))
+    return replay
+
+
+def key_event(player, method, args):
+    from PyQt5.QtCore import QEvent, Qt
+    from PyQt5.QtGui import QKeyEvent
+    method(QKeyEvent(QEvent.KeyPress, args[0], Qt.NoModifier))
+
+
+def set_then_call(widget_name, setter):
+    # Handlers that read a control: set the recorded value, then call without arguments
+    def replay(player, method, args):
+        widget = getattr(player, widget_name)
+        getattr(widget, setter)(args[0])
+        method()
+    return replay
+
+
+def replayers():
+    from PyQt5.QtCore import QEvent
+    return {
+        'VideoPlayer.keyPressEvent': key_event,
+        'VideoPlayer.confirm_speed': set_then_call('speed_input', 'setText'),
+        'VideoPlayer.save_current': lambda player, method, args: (
+            player.save_format.setCurrentText(args[0]), player.save_container.setCurrentText(args[1]), method()),
+        'ClipWidget.mousePressEvent': mouse_event(QEvent.MouseButtonPress),
+        'ClipWidget.mouseMoveEvent': mouse_event(QEvent.MouseMove),
+        'ClipWidget.mouseReleaseEvent': mouse_event(QEvent.MouseButtonRelease),
+    }
+
+
+def resolve(player, handler):
+    """Bound method a trace handler name refers to, or None when its widget does not exist"""
+    owner, name = handler.split('.')
+    if owner == type(player).__name__:
+        return getattr(player, name)
+    for widget in vars(player).values():
+        if type(widget).__name__ == owner:
+            return getattr(widget, name)
+    return None
+
+
+def replay_trace(events, player, app, realtime=False, source=None, report=print):
+    """Drive player through recorded events, processing Qt events in between.
+
+    With realtime the recorded pauses are kept, so playback timers run as
+    they did; otherwise events follow each other as fast as they are handled.
+    source replaces the files the recording loaded.
+    """
+    special = replayers()
+    start = time.perf_counter()
+    for event in events:
+        if realtime:
+            while time.perf_counter() - start < event['t']:
+                app.processEvents()
+                time.sleep(0.001)
+        app.processEvents()
+        method = resolve(player, event['handler'])
+        if method is None:
+            report(f"Skipped {event['handler']}: widget not open")
+            continue
+        args = event['args']
+        if source and event['handler'] == 'VideoPlayer.load_video':
+            args = [source]
+        special.get(event['handler'], lambda player, method, args: method(*args))(player, method, args)
+    app.processEvents()
+
+
+def replay_main(args):
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication, QMessageBox
+    from main import VideoPlayer
+
+    # Dialogs would block a headless run; print them instead
+    for name in ('information', 'warning', 'critical'):
+        setattr(QMessageBox, name, staticmethod(lambda parent, title, text, *rest: print(f"{title}: {text}")))
+    app = QApplication.instance() or QApplication([sys.argv[0]])
+    player = VideoPlayer()
+    player.show()
+    events = load_trace(args.trace)
+
+    profiler = StackSampler(interval=args.interval / 1000) if args.profiler == 'sample' else cProfile.Profile()
+    timing = start_recording()
+    profiler.enable()
+    start = time.perf_counter()
+    try:
+        replay_trace(events, player, app, args.realtime, args.source)
+    finally:
+        profiler.disable()
+        stop_recording()
+    print(f"Replayed {len(events)} events in {time.perf_counter() - start:.2f}s")
+    print(format_latencies(handler_latencies(timing.events)))
+    if args.profile:
+        profiler.dump_stats(args.profile)
+        print(f"Profile written to {args.profile}")
+    if args.histogram:
+        with open(args.histogram, 'w') as f:
+            json.dump(handler_latencies(timing.events), f, indent=1)
+    player.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay and profile recorded UI interactions")
+    commands = parser.add_subparsers(dest='command', required=True)
+    replay = commands.add_parser('replay', help="drive a headless player through a trace")
+    replay.add_argument('trace')
+    replay.add_argument('--source', help="video to load instead of the recorded ones")
+    replay.add_argument('--realtime', action='store_true', help="keep the recorded pauses between events")
+    replay.add_argument('--profiler', choices=('cprofile', 'sample'), default='cprofile')
+    replay.add_argument('--interval', type=float, default=2.0, help="sampling interval in ms")
+    replay.add_argument('--profile', help="pstats file (cprofile) or folded stacks (sample)")
+    replay.add_argument('--histogram', help="write per-handler latencies as JSON")
+    stats = commands.add_parser('stats', help="latency histograms of a recorded session")
+    stats.add_argument('trace')
+    args = parser.parse_args()
+
+    if args.command == 'replay':
+        return replay_main(args)
+    print(format_latencies(handler_latencies(load_trace(args.trace))))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,35 @@
+import os
+import sys
+import importlib
+
+# Set VIDEOPROCESSOR_EAGER_IMPORTS=1 to import every heavy module at startup
+EAGER_IMPORTS = os.environ.get('VIDEOPROCESSOR_EAGER_IMPORTS') == '1'
+
+
+class LazyModule:
+    """Module proxy that imports the real module on first attribute access"""
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            module = self.__dict__['_module'] = importlib.import_module(self.__dict__['_name'])
+        return module
+
+    def __getattr__(self, attr):
+        value = getattr(self._load(), attr)
+        # Cache on the proxy so later lookups skip __getattr__
+        self.__dict__[attr] = value
+        return value
+
+    def __repr__(self):
+        state = 'loaded' if self.__dict__['_module'] is not None else 'not loaded'
+        return f"<lazy module '{self.__dict__['_name']}' ({state})>"
+
+
+def lazy_module(name):
+    if EAGER_IMPORTS or name in sys.modules:
+        return importlib.import_module(name)
+    return LazyModule(name)
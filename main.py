@@ -1,15 +1,53 @@
 import sys
 import os
-import cv2
-import numpy as np
+import json
+import time
+import threading
+from contextlib import nullcontext
+from bisect import bisect_left
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                             QHBoxLayout, QPushButton, QLabel, QSlider, 
                             QFileDialog, QStyle, QMessageBox, QToolBar, 
                             QAction, QDialog, QSpinBox, QComboBox, QLineEdit,
-                            QStackedWidget)
+                            QStackedWidget, QCheckBox, QTabBar, QTableWidget, QTableWidgetItem,
+                            QFormLayout)
 from PyQt5.QtCore import Qt, QTimer, QPoint
 from PyQt5.QtGui import QImage, QPixmap, QDragEnterEvent, QDropEvent, QIcon, QCursor
 from PyQt5.QtCore import pyqtSignal
+from frame_writer import AsyncFrameWriter, open_frame_sink, SINKS
+from frame_store import build_frame_store, remove_frame_store
+from timestamps import load_keyframes, load_pts_table, seek_frame
+from scene_detect import load_scene_cuts
+from frame_blocks import BlockTransformer, iter_blocks, transform_frame
+from capture_pool import CapturePool
+from gop_cache import GopCache
+from ingest import VIDEO_EXTENSIONS, Catalog
+from decoder_backends import benchmark_backends, best_backend, media_key, remember_backend
+from fanout import DEFAULT_RENDITIONS, fanout_export
+from tiles import grid_rois, parse_roi, tile_export
+from activity import activity_strip, keep_mask, load_activity
+from extract import iter_frames_at
+from array_export import ARRAY_WRITERS, open_array_writer
+from animated_preview import (PREVIEW_FORMATS, iter_preview_batches, load_palette, palette_cache_path,
+                              palette_samples, preview_size, preview_step, write_preview)
+from export_cache import ExportCache, link_or_copy, unlink_outputs
+from frame_hash import HASH_SIZE, DuplicateFilter
+from frame_checksums import ExportVerifier, format_report
+from export_checkpoint import ChunkedVideoExport, frames_to_resume
+from yuv_frames import export_yuv_segment, yuv_compatible
+from video_codecs import platform_fourcc
+from file_cache import CACHE_ROOT, content_digest
+from interaction_trace import (traced, start_recording, stop_recording, handler_latencies,
+                               format_latencies)
+from memory_usage import track_peak_rss
+from lazy_import import lazy_module
+
+# OpenCV and NumPy are only imported once a video is opened
+cv2 = lazy_module('cv2')
+np = lazy_module('numpy')
+
+# Save format -> array export kind
+ARRAY_SAVE_FORMATS = {'.npy': 'npy', '.npz': 'npz', '*.npy': 'shards'}
 
 class TimeSlider(QSlider):
     clicked = pyqtSignal(int)
@@ -31,6 +69,7 @@ class SegmentWidget(QWidget):
         super().__init__(parent)
         self.parent = parent
         self.is_updating = False
+        self.cut_points = []  # Proposed scene cuts to snap to
         self.init_ui()
         
     def init_ui(self):
@@ -123,8 +162,39 @@ class SegmentWidget(QWidget):
         self.cancel_btn.clicked.connect(self.cancel_selection)
         button_layout.addWidget(self.confirm_btn)
         button_layout.addWidget(self.cancel_btn)
+        
+        # Snap to detected scene cuts
+        self.snap_checkbox = QCheckBox("Snap to scene cuts")
+        self.snap_checkbox.setEnabled(False)
+        button_layout.addWidget(self.snap_checkbox)
         layout.addLayout(button_layout)
         
+    def set_cut_points(self, cut_points):
+        self.cut_points = cut_points or []
+        self.snap_checkbox.setEnabled(bool(self.cut_points))
+        self.snap_checkbox.setChecked(bool(self.cut_points))
+        if cut_points is None:
+            self.snap_checkbox.setText("Detecting scene cuts...")
+        else:
+            self.snap_checkbox.setText(f"Snap to scene cuts ({len(self.cut_points)})")
+        
+    def snap(self, value):
+        if not self.snap_checkbox.isChecked() or not self.cut_points:
+            return value
+        # Nearest cut point within 1% of the timeline
+        index = bisect_left(self.cut_points, value)
+        nearest = min(self.cut_points[max(index - 1, 0):index + 1], key=lambda cut: abs(cut - value))
+        tolerance = max(1, self.begin_slider.maximum() // 100)
+        return nearest if abs(nearest - value) <= tolerance else value
+        
+    def parse_position(self, text):
+        # Accept a frame number or a timestamp such as 01:23.456
+        if ':' in text:
+            minutes, seconds = text.rsplit(':', 1)
+            seconds = int(minutes or 0) * 60 + float(seconds)
+            return self.parent.frame_at_time(seconds) if self.parent else 0
+        return int(text or 0)
+        
     def set_range(self, total_frames):
         self.is_updating = True
         self.begin_slider.setRange(0, total_frames)
@@ -140,10 +210,11 @@ class SegmentWidget(QWidget):
             return
         self.is_updating = True
         try:
-            end_value = int(self.end_input.text() or 0)
+            value = self.snap(value)
+            end_value = self.parse_position(self.end_input.text())
             if value >= end_value:
                 value = end_value - 1
-                self.begin_slider.setValue(value)
+            self.begin_slider.setValue(value)
             self.begin_input.setText(str(value))
             if self.parent:
                 self.parent.update_preview_frame(value)
@@ -155,10 +226,11 @@ class SegmentWidget(QWidget):
             return
         self.is_updating = True
         try:
-            begin_value = int(self.begin_input.text() or 0)
+            value = self.snap(value)
+            begin_value = self.parse_position(self.begin_input.text())
             if value <= begin_value:
                 value = begin_value + 1
-                self.end_slider.setValue(value)
+            self.end_slider.setValue(value)
             self.end_input.setText(str(value))
             if self.parent:
                 self.parent.update_preview_frame(value)
@@ -171,7 +243,8 @@ class SegmentWidget(QWidget):
             
         self.is_updating = True
         try:
-            end_value = int(self.end_input.text() or 0)
+            value = self.snap(value)
+            end_value = self.parse_position(self.end_input.text())
             if value >= end_value:
                 value = end_value - 1
             self.begin_input.setText(str(value))
@@ -187,7 +260,8 @@ class SegmentWidget(QWidget):
             
         self.is_updating = True
         try:
-            begin_value = int(self.begin_input.text() or 0)
+            value = self.snap(value)
+            begin_value = self.parse_position(self.begin_input.text())
             if value <= begin_value:
                 value = begin_value + 1
             self.end_input.setText(str(value))
@@ -203,14 +277,13 @@ class SegmentWidget(QWidget):
             
         self.is_updating = True
         try:
-            value = int(self.begin_input.text() or 0)
-            end_value = int(self.end_input.text() or 0)
+            value = self.parse_position(self.begin_input.text())
+            end_value = self.parse_position(self.end_input.text())
             if value >= end_value:
                 value = end_value - 1
-                self.begin_input.setText(str(value))
             elif value < 0:
                 value = 0
-                self.begin_input.setText("0")
+            self.begin_input.setText(str(value))
             self.begin_slider.setValue(value)
             if self.parent:
                 self.parent.update_preview_frame(value)
@@ -225,14 +298,13 @@ class SegmentWidget(QWidget):
             
         self.is_updating = True
         try:
-            value = int(self.end_input.text() or 0)
-            begin_value = int(self.begin_input.text() or 0)
+            value = self.parse_position(self.end_input.text())
+            begin_value = self.parse_position(self.begin_input.text())
             if value <= begin_value:
                 value = begin_value + 1
-                self.end_input.setText(str(value))
             elif value > self.begin_slider.maximum():
                 value = self.begin_slider.maximum()
-                self.end_input.setText(str(value))
+            self.end_input.setText(str(value))
             self.end_slider.setValue(value)
             if self.parent:
                 self.parent.update_preview_frame(value)
@@ -244,8 +316,8 @@ class SegmentWidget(QWidget):
     def confirm_selection(self):
         if self.parent:
             self.parent.confirm_segment(
-                int(self.begin_input.text() or 0),
-                int(self.end_input.text() or 0)
+                self.parse_position(self.begin_input.text()),
+                self.parse_position(self.end_input.text())
             )
             
     def cancel_selection(self):
@@ -309,8 +381,9 @@ class ClipWidget(QWidget):
         if frame is None:
             return
             
-        self.original_frame = frame.copy()
-        self.display_frame = frame.copy()
+        # Frames from the raw frame store are read-only views and can be shared as is
+        self.original_frame = frame if not frame.flags.writeable else frame.copy()
+        self.display_frame = self.original_frame
         
         # Initialize crop area to full frame
         h, w = frame.shape[:2]
@@ -322,15 +395,27 @@ class ClipWidget(QWidget):
         if self.original_frame is None:
             return
             
+        frame = self.original_frame
+        x1, y1, x2, y2 = self.crop_rect
+        corner_size = self.corner_size
+        if self.parent is not None and self.parent.low_memory:
+            # Draw on a label-sized image instead of a full-resolution copy
+            h, w = frame.shape[:2]
+            factor = min(self.video_label.width() / w, self.video_label.height() / h)
+            if factor < 1:
+                frame = cv2.resize(frame, (max(1, int(w * factor)), max(1, int(h * factor))),
+                                   interpolation=cv2.INTER_AREA)
+                x1, y1, x2, y2 = (int(v * factor) for v in self.crop_rect)
+                corner_size = max(3, int(corner_size * factor))
+        
         # Create a copy of the display frame
-        display = self.original_frame.copy()
+        display = frame.copy() if frame is self.original_frame else frame
         
         # Create semi-transparent mask
         mask = np.zeros_like(display)
         mask[:] = (128, 128, 128)  # Gray background
         
         # Draw crop area
-        x1, y1, x2, y2 = self.crop_rect
         mask[y1:y2, x1:x2] = (255, 200, 200)  # Lighter red area
         
         # Merge original frame and mask
@@ -344,9 +429,9 @@ class ClipWidget(QWidget):
         corners = [(x1, y1), (x2, y1), (x1, y2), (x2, y2)]
         for corner in corners:
             # Draw outer circle
-            cv2.circle(display, corner, self.corner_size, (255, 255, 255), -1)
+            cv2.circle(display, corner, corner_size, (255, 255, 255), -1)
             # Draw inner circle
-            cv2.circle(display, corner, self.corner_size - 2, (0, 0, 0), 1)
+            cv2.circle(display, corner, corner_size - 2, (0, 0, 0), 1)
         
         # Convert to QImage and display
         h, w, ch = display.shape
@@ -355,6 +440,7 @@ class ClipWidget(QWidget):
         self.video_label.setPixmap(QPixmap.fromImage(qt_image).scaled(
             self.video_label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation))
             
+    @traced(lambda self, event: [event.x(), event.y(), self.width(), self.height()])
     def mousePressEvent(self, event):
         if self.original_frame is None:
             return
@@ -388,6 +474,7 @@ class ClipWidget(QWidget):
                 self.dragging_corner = i
                 break
                 
+    @traced(lambda self, event: [event.x(), event.y(), self.width(), self.height()])
     def mouseMoveEvent(self, event):
         if self.dragging_corner is None or self.original_frame is None:
             return
@@ -436,6 +523,7 @@ class ClipWidget(QWidget):
         
         self.update_display()
         
+    @traced(lambda self, event: [event.x(), event.y(), self.width(), self.height()])
     def mouseReleaseEvent(self, event):
         self.dragging_corner = None
         
@@ -620,7 +708,177 @@ class SpeedWidget(QWidget):
         if self.parent:
             self.parent.cancel_speed()
 
+class LibraryWidget(QWidget):
+    """Browse the ingest catalog; the filter runs as an indexed query on every keystroke"""
+    MAX_ROWS = 1000
+    
+    def __init__(self, parent=None):
+        super().__init__(parent, Qt.Window)  # Make it a window
+        self.parent = parent
+        self.setWindowTitle("Library")
+        self.init_ui()
+        
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setSpacing(5)
+        layout.setContentsMargins(5, 5, 5, 5)
+        
+        # Filters: name substring, codec and minimum height
+        filter_layout = QHBoxLayout()
+        filter_layout.setSpacing(5)
+        self.name_input = QLineEdit()
+        self.name_input.setPlaceholderText("File name contains...")
+        self.codec_input = QLineEdit()
+        self.codec_input.setPlaceholderText("Codec")
+        self.codec_input.setFixedWidth(70)
+        self.height_input = QSpinBox()
+        self.height_input.setRange(0, 9999)
+        self.height_input.setPrefix("min height ")
+        for widget in (self.name_input, self.codec_input):
+            widget.textChanged.connect(self.refresh)
+            filter_layout.addWidget(widget)
+        self.height_input.valueChanged.connect(self.refresh)
+        filter_layout.addWidget(self.height_input)
+        layout.addLayout(filter_layout)
+        
+        self.table = QTableWidget(0, 5)
+        self.table.setHorizontalHeaderLabels(["File", "Size", "FPS", "Duration", "Codec"])
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.cellDoubleClicked.connect(self.open_row)
+        layout.addWidget(self.table)
+        
+        self.count_label = QLabel()
+        layout.addWidget(self.count_label)
+        self.resize(800, 500)
+        
+    def refresh(self):
+        if not self.parent:
+            return
+        rows = self.parent.catalog.query(name=self.name_input.text() or None,
+                                         codec=self.codec_input.text() or None,
+                                         min_height=self.height_input.value() or None,
+                                         limit=self.MAX_ROWS + 1)
+        shown = rows[:self.MAX_ROWS]
+        self.table.setUpdatesEnabled(False)
+        self.table.setRowCount(len(shown))
+        for index, row in enumerate(shown):
+            duration = row['duration'] or 0
+            cells = (row['path'], f"{row['width']}x{row['height']}", f"{row['fps']:.2f}",
+                     f"{int(duration // 60)}:{duration % 60:05.2f}", row['codec'])
+            for column, text in enumerate(cells):
+                self.table.setItem(index, column, QTableWidgetItem(text))
+        self.table.setUpdatesEnabled(True)
+        more = "+" if len(rows) > self.MAX_ROWS else ""
+        self.count_label.setText(f"{len(shown)}{more} files")
+        
+    def open_row(self, row, column):
+        if self.parent:
+            self.parent.load_video(self.table.item(row, 0).text())
+            
+    def showEvent(self, event):
+        self.refresh()
+        super().showEvent(event)
+
+class SettingsWidget(QWidget):
+    """Export and decoding options; every change applies right away"""
+    def __init__(self, parent=None):
+        super().__init__(parent, Qt.Window)  # Make it a window
+        self.parent = parent
+        self.setWindowTitle("Settings")
+        self.init_ui()
+        
+    def init_ui(self):
+        self.form = QFormLayout(self)
+        self.form.setContentsMargins(10, 10, 10, 10)
+        
+        # Batched crop/resize of decoded blocks in exports
+        self.block_size_input = self.add_spin_box(
+            "Export block size:", self.parent.export_block_size, 0, 256,
+            lambda value: setattr(self.parent, 'export_block_size', value), "per frame")
+        
+        # Durability of frame sequence exports
+        self.fsync_input = self.add_spin_box(
+            "Fsync frames every:", self.parent.writer_fsync_every, 0, 100000,
+            lambda value: setattr(self.parent, 'writer_fsync_every', value), "never")
+        
+        # "Skip repeats": how close a frame's hash must be and what happens to repeats
+        self.dedup_threshold_input = self.add_spin_box(
+            "Repeat hash distance:", self.parent.dedup_threshold, 0, HASH_SIZE * HASH_SIZE // 4,
+            lambda value: setattr(self.parent, 'dedup_threshold', value))
+        self.dedup_mode_input = QComboBox()
+        self.dedup_mode_input.addItems(["skip", "link"])
+        self.dedup_mode_input.setCurrentText(self.parent.dedup_mode)
+        self.dedup_mode_input.currentTextChanged.connect(lambda mode: setattr(self.parent, 'dedup_mode', mode))
+        self.form.addRow("Repeated frames:", self.dedup_mode_input)
+        
+        # Decoding threads of each capture; open captures are reopened
+        self.decoder_threads_input = self.add_spin_box(
+            "Decoder threads:", self.parent.decoder_threads, 0, 64,
+            self.parent.set_decoder_threads, "backend default")
+        
+        # "Tiles" format: a grid of tiles, or named regions instead of the grid
+        self.tile_cols_input = self.add_spin_box(
+            "Tile columns:", self.parent.tile_grid[0], 1, 16,
+            lambda value: setattr(self.parent, 'tile_grid', (value, self.parent.tile_grid[1])))
+        self.tile_rows_input = self.add_spin_box(
+            "Tile rows:", self.parent.tile_grid[1], 1, 16,
+            lambda value: setattr(self.parent, 'tile_grid', (self.parent.tile_grid[0], value)))
+        self.tile_overlap_input = self.add_spin_box(
+            "Tile overlap:", self.parent.tile_overlap, 0, 1024,
+            lambda value: setattr(self.parent, 'tile_overlap', value))
+        self.tile_format_input = QComboBox()
+        self.tile_format_input.addItems([".mp4", ".avi", "*.jpg", "*.png"])
+        self.tile_format_input.setCurrentText(self.parent.tile_format)
+        self.tile_format_input.currentTextChanged.connect(lambda fmt: setattr(self.parent, 'tile_format', fmt))
+        self.form.addRow("Tile format:", self.tile_format_input)
+        self.tile_rois_input = QLineEdit()
+        self.tile_rois_input.setPlaceholderText("name:x1,y1,x2,y2; ... (empty = grid)")
+        self.tile_rois_input.setText(self.format_rois(self.parent.tile_rois))
+        self.tile_rois_input.editingFinished.connect(self.set_tile_rois)
+        self.form.addRow("Tile regions:", self.tile_rois_input)
+        
+    def format_rois(self, rois):
+        return "; ".join(f"{roi['name']}:{','.join(map(str, roi['rect']))}" for roi in rois or [])
+        
+    def set_tile_rois(self):
+        text = self.tile_rois_input.text().strip()
+        try:
+            rois = [parse_roi(part.strip()) for part in text.split(';') if part.strip()]
+            if any(len(roi['rect']) != 4 for roi in rois):
+                raise ValueError("a region needs four coordinates")
+        except ValueError as e:
+            QMessageBox.warning(self, "Error", f"Invalid tile regions: {str(e)}")
+            self.tile_rois_input.setText(self.format_rois(self.parent.tile_rois))
+            return
+        # Bounds are checked against the frame when the tiles are exported
+        self.parent.tile_rois = rois or None
+        
+    def add_spin_box(self, label, value, minimum, maximum, changed, zero_text=None):
+        spin_box = QSpinBox()
+        spin_box.setRange(minimum, maximum)
+        if zero_text:
+            spin_box.setSpecialValueText(zero_text)
+        spin_box.setValue(value)
+        spin_box.valueChanged.connect(changed)
+        self.form.addRow(label, spin_box)
+        return spin_box
+
 class VideoPlayer(QMainWindow):
+    pts_table_ready = pyqtSignal(str, object)
+    keyframes_ready = pyqtSignal(str, object)
+    scene_cuts_ready = pyqtSignal(str, object)
+    activity_ready = pyqtSignal(str, object)
+    decoder_benchmark_ready = pyqtSignal(str, object)
+    ingest_ready = pyqtSignal(object)
+    
+    # Attributes saved per file when switching between files of the session
+    FILE_STATE = ('original_fps', 'total_frames', 'segment_begin', 'segment_end',
+                  'clip_rect', 'resize_dimensions', 'last_resize_dimensions', 'playback_speed',
+                  'current_frame', 'current_frame_number', 'pts_table', 'keyframes', 'scene_cuts',
+                  'frame_store', 'activity', 'idle_keep')
+    
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Video Processing Tool")
@@ -646,6 +904,58 @@ class VideoPlayer(QMainWindow):
         self.speed_widget = None  # Will be created when needed
         self.playback_speed = 1.0  # Current playback speed
         self.original_fps = 0  # Store original FPS
+        self.writer_inflight_bytes = 64 * 1024 * 1024  # Max encoded bytes queued for writing
+        self.writer_fsync_every = 0  # Fsync every N frames (0 = never)
+        self.use_frame_store = False  # Decode the segment once into a raw frame store
+        self.frame_store = None  # Memory-mapped frames of the current segment
+        self.frame_store_max_bytes = 4 * 1024 ** 3  # Max size of a raw frame store
+        self.frame_store_cache_bytes = 16 * 1024 ** 3  # Max size of all stores kept on disk
+        self.pending_seek = None  # Capture position to restore after store reads
+        self.play_direction = 1  # 1 plays forward, -1 backwards
+        self.gop_cache = None  # Decoded GOPs of the current file, for stepping backwards
+        self.gop_cache_max_bytes = 512 * 1024 * 1024  # Max size of the decoded GOPs
+        self.export_block_size = 0  # Frames per block for batched export transforms (0 = per frame)
+        self.export_cache = ExportCache(max_bytes=10 * 1024 ** 3)  # Finished exports by parameters (None = off)
+        self.export_chunk_frames = 1800  # Frames per resumable chunk of a video export (chunks need ffmpeg)
+        self.yuv_export = True  # Crop/resize video exports as I420 planes via ffmpeg when possible
+        self.verify_exports = False  # Check video exports frame by frame against an independent decode
+        self.export_verifier = None  # Checksums of the video export in progress
+        self.verify_inflight_bytes = 256 * 1024 * 1024  # Max source frames queued for checksumming
+        self.dedup_frames = False  # Skip frames that repeat the previous saved frame in frame sequences
+        self.dedup_threshold = 0  # Max differing hash bits for a frame to count as a repeat
+        self.dedup_mode = 'skip'  # 'skip' leaves repeats out, 'link' hardlinks them to the kept frame
+        self.renditions = [dict(spec) for spec in DEFAULT_RENDITIONS]  # Outputs of the Renditions format
+        self.tile_grid = (2, 2)  # Columns and rows of the Tiles format
+        self.tile_overlap = 0  # Pixels shared by neighbouring tiles
+        self.tile_rois = None  # Named regions [{'name', 'rect'}] exported instead of the grid
+        self.tile_format = '.mp4'  # Output of every tile: .mp4, .avi, *.jpg or *.png
+        self.array_export_options = {'dtype': 'uint8', 'channels': 'RGB', 'layout': 'HWC', 'stride': 1}
+        self.preview_options = {'width': 480, 'fps': 12, 'colors': 255, 'tolerance': 16, 'quality': 80}
+        self.decoder_threads = 0  # Decoder threads per capture (0 = backend default)
+        self.capture_pool = CapturePool(max_open=4, threads=self.decoder_threads)  # Open captures of recent files
+        self.decoder_benchmark_file = None  # File whose backend benchmark is running
+        self.catalog = None  # Stream properties of every ingested file; opened when needed
+        self.ingest_workers = 8  # Files probed at the same time while ingesting
+        self.library_widget = None  # Will be created when needed
+        self.settings_widget = None  # Will be created when needed
+        self.file_states = {}  # Saved FILE_STATE per open file
+        self.pts_table = None  # Per-frame timestamps, loaded in the background
+        self.keyframes = None  # Keyframe indices, loaded in the background
+        self.low_memory = False  # Share read-only frames, no block buffers, report peak RSS
+        self.low_memory_inflight_bytes = 8 * 1024 * 1024  # Writer queue limit in low-memory mode
+        self.low_memory_gop_cache_bytes = 64 * 1024 * 1024  # Decoded GOP limit in low-memory mode
+        self.adaptive_display = True  # Fast, reduced-resolution rendering while playing
+        self.preview_scale = 1.0  # Fraction of the label resolution used while playing
+        self.display_time_ms = 0.0  # Smoothed time spent rendering one frame
+        self.time_label_text = ""
+        self.scene_cuts = None  # Detected scene cut frame numbers
+        self.scene_scan_file = None  # File whose scene scan is running
+        self.activity = None  # Per-frame motion scores
+        self.idle_keep = None  # Frames kept when idle spans are skipped
+        self.activity_scan_file = None  # File whose activity scan is running
+        self.skip_idle = False  # Skip low-activity spans in playback and exports
+        self.idle_options = {'mode': 'drop', 'keep_every': 10, 'threshold': 0.005, 'pad': 15, 'min_idle': 30}
+        self.idle_seek_frames = 250  # Longer idle runs are seeked over instead of grabbed
         
         # Create UI
         self.init_ui()
@@ -654,6 +964,13 @@ class VideoPlayer(QMainWindow):
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_frame)
         
+        self.pts_table_ready.connect(self.on_pts_table_ready)
+        self.keyframes_ready.connect(self.on_keyframes_ready)
+        self.scene_cuts_ready.connect(self.on_scene_cuts_ready)
+        self.activity_ready.connect(self.on_activity_ready)
+        self.decoder_benchmark_ready.connect(self.on_decoder_benchmark_ready)
+        self.ingest_ready.connect(self.on_ingest_ready)
+        
     def init_ui(self):
         # Create toolbar
         self.create_toolbar()
@@ -665,6 +982,15 @@ class VideoPlayer(QMainWindow):
         # Main layout
         main_layout = QVBoxLayout(central_widget)
         
+        # Open files of the session
+        self.file_tabs = QTabBar()
+        self.file_tabs.setTabsClosable(True)
+        self.file_tabs.setExpanding(False)
+        self.file_tabs.currentChanged.connect(self.file_tab_changed)
+        self.file_tabs.tabCloseRequested.connect(self.close_file_tab)
+        self.file_tabs.hide()
+        main_layout.addWidget(self.file_tabs)
+        
         # Video display area
         self.video_label = QLabel()
         self.video_label.setAlignment(Qt.AlignCenter)
@@ -720,6 +1046,13 @@ class VideoPlayer(QMainWindow):
         
         default_layout.addLayout(play_controls)
         
+        # Motion heatmap of the timeline (shown while idle spans are skipped)
+        self.activity_bar = QLabel()
+        self.activity_bar.setFixedHeight(8)
+        self.activity_bar.setScaledContents(True)
+        self.activity_bar.hide()
+        default_layout.addWidget(self.activity_bar)
+        
         # Speed control area (initially hidden)
         self.speed_control = QWidget()
         speed_layout = QVBoxLayout(self.speed_control)
@@ -786,11 +1119,18 @@ class VideoPlayer(QMainWindow):
         
         # Save format selection
         self.save_format = QComboBox()
-        self.save_format.addItems([".mp4", ".avi", ".jpg", ".png", "*.jpg", "*.png"])
+        self.save_format.addItems([".mp4", ".avi", ".gif", ".webp", ".jpg", ".png", "*.jpg", "*.png", ".npy", ".npz", "*.npy", "Renditions", "Tiles"])
         self.save_format.setFixedHeight(40)
         self.save_format.setEnabled(False)  # Initially disabled
         save_controls.addWidget(self.save_format)
         
+        # Frame sequence container selection
+        self.save_container = QComboBox()
+        self.save_container.addItems(["Folder", "Tar", "Zip", "Shard"])
+        self.save_container.setFixedHeight(40)
+        self.save_container.setEnabled(False)  # Initially disabled
+        save_controls.addWidget(self.save_container)
+        
         # Save button
         self.save_button = QPushButton("Save")
         self.save_button.setFixedHeight(40)
@@ -841,66 +1181,478 @@ class VideoPlayer(QMainWindow):
         speed_action.triggered.connect(self.show_speed_dialog)
         toolbar.addAction(speed_action)
         
+        # Raw frame store toggle
+        self.cache_action = QAction("Cache", self)
+        self.cache_action.setCheckable(True)
+        self.cache_action.toggled.connect(self.toggle_frame_store)
+        toolbar.addAction(self.cache_action)
+        
+        # Low-memory mode toggle
+        low_memory_action = QAction("Low memory", self)
+        low_memory_action.setCheckable(True)
+        low_memory_action.toggled.connect(self.toggle_low_memory)
+        toolbar.addAction(low_memory_action)
+        
+        # Idle span skipping
+        self.skip_idle_action = QAction("Skip idle", self)
+        self.skip_idle_action.setCheckable(True)
+        self.skip_idle_action.toggled.connect(self.toggle_skip_idle)
+        toolbar.addAction(self.skip_idle_action)
+        
+        # Duplicate frame skipping for frame sequences
+        dedup_action = QAction("Skip repeats", self)
+        dedup_action.setCheckable(True)
+        dedup_action.toggled.connect(lambda checked: setattr(self, 'dedup_frames', checked))
+        toolbar.addAction(dedup_action)
+        
+        # Frame checksum verification of video exports
+        verify_action = QAction("Verify", self)
+        verify_action.setCheckable(True)
+        verify_action.toggled.connect(lambda checked: setattr(self, 'verify_exports', checked))
+        toolbar.addAction(verify_action)
+        
+        # Catalog of ingested files
+        library_action = QAction("Library", self)
+        library_action.triggered.connect(self.show_library)
+        toolbar.addAction(library_action)
+        
+        # Decoder backend benchmark
+        decoder_action = QAction("Decoder", self)
+        decoder_action.triggered.connect(self.start_decoder_benchmark)
+        toolbar.addAction(decoder_action)
+        
+        # Export and decoding options
+        settings_action = QAction("Settings", self)
+        settings_action.triggered.connect(self.show_settings)
+        toolbar.addAction(settings_action)
+        
+        # Interaction recording for replay and profiling
+        trace_action = QAction("Trace", self)
+        trace_action.setCheckable(True)
+        trace_action.toggled.connect(self.toggle_trace)
+        toolbar.addAction(trace_action)
+        
+    def toggle_trace(self, checked):
+        if checked:
+            path = os.path.join(CACHE_ROOT, 'traces', time.strftime('%Y%m%d-%H%M%S') + '.jsonl')
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            start_recording(path)
+            print(f"Recording interactions to {path}")
+            return
+        recorder = stop_recording()
+        if recorder is not None and recorder.events:
+            print(format_latencies(handler_latencies(recorder.events)))
+            print(f"Replay with: python interaction_trace.py replay {recorder.path} --profile trace.prof")
+        
+    @traced()
     def toggle_segment_mode(self):
         if not self.cap:
             QMessageBox.warning(self, "Warning", "Please load a video first!")
             return
             
         self.segment_widget.set_range(self.total_frames)
+        self.segment_widget.set_cut_points(self.scene_cuts)
         self.stacked_widget.setCurrentIndex(1)
         self.pause_video()
+        self.start_scene_scan()
+        
+    def start_scene_scan(self):
+        if self.scene_cuts is not None or self.scene_scan_file == self.input_file:
+            return
+        file_path = self.input_file
+        self.scene_scan_file = file_path
+        
+        def scan():
+            try:
+                cuts = load_scene_cuts(file_path)
+            except Exception as e:
+                print(f"Scene detection failed: {str(e)}")
+                cuts = []
+            self.scene_cuts_ready.emit(file_path, cuts)
+        threading.Thread(target=scan, daemon=True).start()
+        
+    def on_scene_cuts_ready(self, file_path, cuts):
+        if self.scene_scan_file == file_path:
+            self.scene_scan_file = None
+        if file_path != self.input_file:
+            # Keep the result for when the user switches back to that file
+            if file_path in self.file_states:
+                self.file_states[file_path]['scene_cuts'] = cuts
+            return
+        self.scene_cuts = cuts
+        self.segment_widget.set_cut_points(cuts)
+        
+    def set_decoder_threads(self, threads):
+        self.decoder_threads = threads
+        self.capture_pool.threads = threads
+        # Captures of other files reopen with the new count when their tab is shown
+        for file_path in list(self.file_states):
+            if file_path != self.input_file:
+                self.capture_pool.release(file_path)
+        if self.cap is not None and not self.is_processing:
+            self.pause_video()
+            self.capture_pool.release(self.input_file)
+            self.cap = self.capture_pool.get(self.input_file)
+            self.pending_seek = self.current_frame_number + 1
+        
+    def start_decoder_benchmark(self):
+        if not self.cap:
+            QMessageBox.warning(self, "Warning", "Please load a video first!")
+            return
+        if self.decoder_benchmark_file is not None:
+            return
+        file_path = self.input_file
+        self.decoder_benchmark_file = file_path
+        threads = self.decoder_threads
+        key = media_key(file_path, self.cap)
+        
+        def run():
+            try:
+                results = benchmark_backends(file_path, threads=threads)
+            except Exception as e:
+                print(f"Decoder benchmark failed: {str(e)}")
+                results = []
+            self.decoder_benchmark_ready.emit(file_path, (key, results))
+        threading.Thread(target=run, daemon=True).start()
+        
+    def on_decoder_benchmark_ready(self, file_path, benchmark):
+        self.decoder_benchmark_file = None
+        key, results = benchmark
+        best = best_backend(results)
+        lines = [f"{r['backend']}: {r['fps']:.0f} fps, seek {r['seek_ms']:.1f} ms, "
+                 f"{r['seek_accuracy']:.0%} accurate" for r in results]
+        if best is None:
+            QMessageBox.warning(self, "Decoder", "\n".join(lines + ["No backend seeks accurately in this file"]))
+            return
+        remember_backend(key, best)
+        # Reopen on the winning backend; the position is restored on the next read. The
+        # file's tab may be closed by now: never reopen it, which could evict self.cap
+        if file_path in self.capture_pool and self.capture_pool.get(file_path).getBackendName() != best:
+            self.capture_pool.release(file_path)
+            if file_path == self.input_file:
+                self.pause_video()
+                self.cap = self.capture_pool.get(file_path)
+                self.pending_seek = self.current_frame_number + 1
+        QMessageBox.information(self, "Decoder", "\n".join(lines + [f"Using {best} for {key} files"]))
+        
+    def open_catalog(self):
+        if self.catalog is None:
+            self.catalog = Catalog()
+        return self.catalog
+        
+    def start_ingest(self, folders, files):
+        catalog = self.open_catalog()
+        workers = self.ingest_workers
+        
+        def run():
+            probed = 0
+            try:
+                for folder in folders:
+                    probed += catalog.scan(folder, workers)['probed']
+                probed += catalog.add_files(files, workers)
+            except Exception as e:
+                print(f"Ingest failed: {str(e)}")
+            self.ingest_ready.emit(probed)
+        threading.Thread(target=run, daemon=True).start()
+        
+    def on_ingest_ready(self, probed):
+        print(f"Ingest finished: {probed} files probed")
+        self.show_library()
+        
+    def show_library(self):
+        self.open_catalog()
+        if self.library_widget is None:
+            self.library_widget = LibraryWidget(self)
+        if self.library_widget.isVisible():
+            self.library_widget.refresh()
+        self.library_widget.show()
+        self.library_widget.raise_()
+        
+    def show_settings(self):
+        if self.settings_widget is None:
+            self.settings_widget = SettingsWidget(self)
+        self.settings_widget.show()
+        self.settings_widget.raise_()
+        
+    def toggle_skip_idle(self, checked):
+        self.skip_idle = checked
+        if checked and self.cap is not None:
+            self.start_activity_scan()
+        self.update_activity_bar()
+        
+    def start_activity_scan(self):
+        if self.activity is not None or self.activity_scan_file == self.input_file:
+            return
+        file_path = self.input_file
+        self.activity_scan_file = file_path
+        
+        def scan():
+            try:
+                scores = load_activity(file_path)
+            except Exception as e:
+                print(f"Activity scan failed: {str(e)}")
+                scores = None
+            self.activity_ready.emit(file_path, scores)
+        threading.Thread(target=scan, daemon=True).start()
+        
+    def on_activity_ready(self, file_path, scores):
+        if self.activity_scan_file == file_path:
+            self.activity_scan_file = None
+        if scores is None:
+            return
+        keep = keep_mask(scores, 0, len(scores), mode='drop', threshold=self.idle_options['threshold'],
+                         pad=self.idle_options['pad'], min_idle=self.idle_options['min_idle'])
+        if file_path != self.input_file:
+            # Keep the result for when the user switches back to that file
+            if file_path in self.file_states:
+                self.file_states[file_path].update(activity=scores, idle_keep=keep)
+            return
+        self.activity = scores
+        self.idle_keep = keep
+        self.update_activity_bar()
+        
+    def update_activity_bar(self):
+        if not self.skip_idle or self.activity is None:
+            self.activity_bar.hide()
+            return
+        strip = activity_strip(self.activity[self.segment_begin:self.segment_end])
+        strip = cv2.cvtColor(strip, cv2.COLOR_BGR2RGB)
+        h, w, ch = strip.shape
+        qt_image = QImage(strip.data, w, h, ch * w, QImage.Format_RGB888)
+        self.activity_bar.setPixmap(QPixmap.fromImage(qt_image))
+        self.activity_bar.show()
+        
+    def next_active_frame(self, frame_number):
+        # First frame at or after frame_number that is not in a skipped idle span
+        keep = self.idle_keep
+        if keep is None or frame_number >= len(keep) or keep[frame_number]:
+            return frame_number
+        following = np.flatnonzero(keep[frame_number:self.segment_end])
+        return frame_number + int(following[0]) if len(following) else self.segment_end
+        
+    def export_keep_mask(self, begin, end):
+        # Frames of [begin, end) an export keeps, or None when every frame is exported
+        if not self.skip_idle or self.activity is None:
+            return None
+        options = self.idle_options
+        return keep_mask(self.activity, begin, end, options['mode'], options['keep_every'],
+                         options['threshold'], options['pad'], options['min_idle'])
         
     def update_preview_frame(self, frame_number):
         if self.cap is not None:
-            self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
-            ret, frame = self.cap.read()
-            if ret:
+            frame = self.read_frame(frame_number)
+            if frame is not None:
                 self.update_display(frame)
                 
+    def read_frame(self, frame_number):
+        # Serve the frame from the raw frame store without decoding when possible
+        if self.frame_store is not None and self.frame_store.covers(frame_number):
+            self.pending_seek = frame_number + 1
+            return self.frame_store.frame(frame_number)
+        self.set_position(frame_number)
+        ret, frame = self.cap.read()
+        return self.shared_frame(frame) if ret else None
+        
+    def iter_segment_frames(self, begin=None, end=None):
+        # Yield (frame_number, frame) for the current segment (or the [begin, end) part of it)
+        begin = self.segment_begin if begin is None else begin
+        end = self.segment_end if end is None else end
+        if self.frame_store is not None and self.frame_store.covers_range(begin, end):
+            for frame_number in range(begin, end):
+                yield frame_number, self.frame_store.frame(frame_number)
+            return
+        self.set_position(begin)
+        for frame_number in range(begin, end):
+            ret, frame = self.cap.read()
+            if not ret:
+                break
+            yield frame_number, frame
+            
+    def iter_segment_blocks(self, block_size, begin=None, end=None):
+        # Yield the segment as (K, H, W, 3) blocks; decoded blocks reuse one array
+        begin = self.segment_begin if begin is None else begin
+        end = self.segment_end if end is None else end
+        store = self.frame_store
+        if store is not None and store.covers_range(begin, end):
+            for block_begin in range(begin, end, block_size):
+                block_end = min(block_begin + block_size, end)
+                yield store.frames[block_begin - store.begin:block_end - store.begin]
+            return
+        self.set_position(begin)
+        for _, block in iter_blocks(self.cap, end - begin, block_size):
+            yield block
+            
+    def iter_export_frames(self, begin=None, end=None, resize=True, queued=False, segment_keep=None):
+        # Yield (frame_number, frame) of the segment with crop (and resize) applied.
+        # queued: frames are kept after the next one is requested (no reused block buffers)
+        # segment_keep: export_keep_mask of the whole segment, when the caller already has it
+        begin = self.segment_begin if begin is None else begin
+        end = self.segment_end if end is None else end
+        size = self.resize_dimensions if resize else None
+        # Idle runs are found over the whole segment, so they do not depend on where a part starts
+        if segment_keep is None:
+            segment_keep = self.export_keep_mask(self.segment_begin, self.segment_end)
+        keep = None
+        if segment_keep is not None:
+            keep = segment_keep[begin - self.segment_begin:end - self.segment_begin]
+        verifier = self.export_verifier
+        if keep is not None:
+            for frame_number, frame in self.iter_kept_frames(begin, keep):
+                if verifier is not None:
+                    verifier.record(frame_number, frame)
+                yield frame_number, transform_frame(frame, self.clip_rect, size)
+            return
+        # Decoded blocks are overwritten in place, so verified exports go frame by frame
+        if self.export_block_size > 1 and not self.low_memory and verifier is None and not queued:
+            transformer = BlockTransformer(self.clip_rect, size)
+            frame_number = begin
+            for block in self.iter_segment_blocks(self.export_block_size, begin, end):
+                for frame in transformer(block):
+                    yield frame_number, frame
+                    frame_number += 1
+            return
+        for frame_number, frame in self.iter_segment_frames(begin, end):
+            if verifier is not None:
+                verifier.record(frame_number, frame)
+            yield frame_number, transform_frame(frame, self.clip_rect, size)
+            
+    def iter_kept_frames(self, begin, keep):
+        # Decode only the kept frames; skipped ones are grabbed, long skipped runs seeked over
+        frame_numbers = (np.flatnonzero(keep) + begin).tolist()
+        store = self.frame_store
+        if store is not None and store.covers_range(begin, begin + len(keep)):
+            for frame_number in frame_numbers:
+                yield frame_number, store.frame(frame_number)
+            return
+        self.pending_seek = None
+        yield from iter_frames_at(self.cap, frame_numbers, pts_table=self.pts_table,
+                                  max_gap=self.idle_seek_frames)
+            
+    def toggle_low_memory(self, checked):
+        self.low_memory = checked
+        if checked and self.current_frame is not None:
+            self.current_frame = self.shared_frame(self.current_frame)
+            
+    def shared_frame(self, frame):
+        # In low-memory mode frames are read-only so widgets can share them without copies
+        if self.low_memory and frame is not None:
+            frame.flags.writeable = False
+        return frame
+        
+    def track_memory(self, operation):
+        # Peak RSS is reported per operation in low-memory mode
+        return track_peak_rss(operation) if self.low_memory else nullcontext()
+        
+    def writer_max_inflight_bytes(self):
+        if self.low_memory:
+            return min(self.writer_inflight_bytes, self.low_memory_inflight_bytes)
+        return self.writer_inflight_bytes
+        
+    def verify_max_inflight_bytes(self):
+        if self.low_memory:
+            return min(self.verify_inflight_bytes, self.low_memory_inflight_bytes)
+        return self.verify_inflight_bytes
+        
+    def toggle_frame_store(self, checked):
+        self.use_frame_store = checked
+        if checked:
+            if self.cap is not None:
+                self.build_frame_store()
+        else:
+            self.close_frame_store(remove=True)
+            
+    def build_frame_store(self):
+        self.close_frame_store()
+        was_playing = self.is_playing
+        self.pause_video()
+        try:
+            self.is_processing = True
+            with self.track_memory("Cache frames"):
+                self.frame_store = build_frame_store(
+                    self.cap, self.input_file, self.segment_begin, self.segment_end,
+                    max_bytes=self.frame_store_max_bytes, seek=self.set_position,
+                    cache_bytes=self.frame_store_cache_bytes, keep=self.open_frame_store_paths(),
+                    progress=lambda p: print(f"\rCaching frames: {p:.1f}%", end=""))
+            print(f"\nCached to {self.frame_store.path}")
+        except Exception as e:
+            QMessageBox.warning(self, "Warning", f"Frame cache disabled: {str(e)}")
+            self.cache_action.setChecked(False)
+        finally:
+            self.is_processing = False
+            self.set_position(self.segment_begin)
+        if was_playing:
+            self.play_video()
+            
+    def open_frame_store_paths(self):
+        # Stores of other open files are kept when older ones are evicted
+        return {state['frame_store'].path for path, state in self.file_states.items()
+                if path != self.input_file and state['frame_store'] is not None}
+            
+    def close_frame_store(self, remove=False):
+        if self.frame_store is not None:
+            if remove:
+                remove_frame_store(self.frame_store)
+            else:
+                self.frame_store.close()
+            self.frame_store = None
+            
+    @traced()
     def confirm_segment(self, begin, end):
         self.segment_begin = begin
         self.segment_end = end
         self.stacked_widget.setCurrentIndex(0)
         self.time_slider.setRange(self.segment_begin, self.segment_end)
         self.time_slider.setValue(self.segment_begin)
-        self.cap.set(cv2.CAP_PROP_POS_FRAMES, self.segment_begin)
+        if self.use_frame_store:
+            self.build_frame_store()
+        self.update_activity_bar()
+        self.set_position(self.segment_begin)
         self.play_video()
         
+    @traced()
     def cancel_segment(self):
         self.stacked_widget.setCurrentIndex(0)
         self.time_slider.setRange(0, self.total_frames)
         self.time_slider.setValue(self.current_frame_number)
         self.segment_begin = 0
         self.segment_end = self.total_frames
+        self.update_activity_bar()
         
+    @traced()
     def slider_pressed(self):
         self.timer.stop()
         
+    @traced()
     def slider_released(self):
         if self.is_playing:
             self.timer.start(int(1000/self.fps))
             
+    @traced()
     def slider_value_changed(self, value):
         if self.cap is not None:
-            self.cap.set(cv2.CAP_PROP_POS_FRAMES, value)
-            ret, frame = self.cap.read()
-            if ret:
+            frame = self.read_frame(value)
+            if frame is not None:
                 self.current_frame = frame
                 self.current_frame_number = value
                 self.update_display(frame)
                 
+    @traced()
     def time_slider_clicked(self, value):
         if self.time_slider.orientation() == Qt.Horizontal:
             # Set new position
             self.time_slider.setValue(value)
-            self.cap.set(cv2.CAP_PROP_POS_FRAMES, value)
-            ret, frame = self.cap.read()
-            if ret:
+            frame = self.read_frame(value)
+            if frame is not None:
                 self.current_frame = frame
                 self.current_frame_number = value
                 self.update_display(frame)
                 
+    @traced(lambda self: [self.save_format.currentText(), self.save_container.currentText()])
     def save_current(self):
+        with self.track_memory(f"Save {self.save_format.currentText()}"):
+            self.save_current_format()
+            
+    def save_current_format(self):
         if not self.cap or self.current_frame is None:
             QMessageBox.warning(self, "Warning", "Please load a video first!")
             return
@@ -929,53 +1681,219 @@ class VideoPlayer(QMainWindow):
                 QMessageBox.information(self, "Success", f"Saved to {save_path}")
             elif format == '*.jpg' or format == '*.png':
                 # Save all frames in the segment
-                self.cap.set(cv2.CAP_PROP_POS_FRAMES, self.segment_begin)
-                frame_count = self.segment_begin
                 total_frames = self.segment_end - self.segment_begin
+                container = self.save_container.currentText()
+                frame_numbers = range(self.segment_begin, self.segment_end)
+                frame_path = lambda n: os.path.join(base_path, f"{n:06d}{format[1:]}")
+                dedup = DuplicateFilter(self.dedup_threshold) if self.dedup_frames else None
+                if container == 'Folder':
+                    # With duplicate skipping the written files are only known afterwards
+                    outputs = None if dedup else [frame_path(n) for n in frame_numbers]
+                    save_path = base_path
+                else:
+                    save_path = base_path + SINKS[container][1]
+                    outputs = [save_path]
+                params = self.segment_export_params(
+                    format=format, container=container,
+                    dedup=(f'dhash{HASH_SIZE * HASH_SIZE}', self.dedup_threshold, self.dedup_mode) if dedup else None)
+                if self.fetch_cached_export(params, outputs, save_path):
+                    return
+                    
+                # Frames left by an interrupted run of the same export are kept
+                # (not with duplicate skipping, which has to hash every frame)
+                done = set()
+                if container != 'Folder':
+                    unlink_outputs(outputs)
+                elif dedup is None:
+                    done = frames_to_resume(base_path, frame_numbers, format[1:], self.export_params())
+                resume_from = next((n for n in frame_numbers if n not in done), self.segment_end)
+                if done:
+                    print(f"Resuming: {len(done)} frames already saved")
                 
-                while frame_count < self.segment_end:
-                    ret, frame = self.cap.read()
-                    if not ret:
-                        break
-                        
-                    # Apply crop if exists
-                    if self.clip_rect:
-                        x1, y1, x2, y2 = self.clip_rect
-                        frame = frame[y1:y2, x1:x2]
+                # Encoded frames are written on a background thread so slow
+                # filesystems do not stall decoding
+                writer = AsyncFrameWriter(
+                    open_frame_sink(container, base_path),
+                    max_inflight_bytes=self.writer_max_inflight_bytes(),
+                    fsync_every=self.writer_fsync_every)
+                try:
+                    for frame_count, frame in self.iter_export_frames(resume_from):
+                        if frame_count in done:
+                            continue
+                        if dedup is not None and dedup.check(frame_count, frame) is not None:
+                            continue
+                        # Encode frame and hand it to the writer
+                        _, buffer = cv2.imencode(format[1:], frame)
+                        writer.submit(f"{frame_count:06d}{format[1:]}", buffer.tobytes())
                         
-                    # Apply resize if exists
-                    if self.resize_dimensions:
-                        width, height = self.resize_dimensions
-                        frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_LINEAR)
-                    
-                    # Save frame using imencode
-                    save_path = os.path.join(base_path, f"{frame_count:06d}{format[1:]}")
-                    _, buffer = cv2.imencode(format[1:], frame)
-                    with open(save_path, 'wb') as f:
-                        f.write(buffer)
-                    frame_count += 1
-                    
-                    # Update progress
-                    progress = (frame_count - self.segment_begin) / total_frames * 100
-                    print(f"\rSaving frames: {progress:.1f}%", end="")
+                        # Update progress
+                        progress = (frame_count + 1 - self.segment_begin) / total_frames * 100
+                        print(f"\rSaving frames: {progress:.1f}%", end="")
+                    if dedup is not None:
+                        writer.submit(f"{self.segment_begin:06d}-{self.segment_end:06d}_hashes.json",
+                                      dedup.index_bytes())
+                finally:
+                    writer.close()
                     
+                if dedup is not None:
+                    duplicates = dedup.duplicates()
+                    print(f"\nSkipped {len(duplicates)} duplicate frames")
+                    if container == 'Folder':
+                        # Duplicates are hardlinks to the frame they repeat, or absent
+                        for frame_number, original in duplicates:
+                            if self.dedup_mode == 'link':
+                                link_or_copy(frame_path(original), frame_path(frame_number))
+                            else:
+                                unlink_outputs([frame_path(frame_number)])
+                        skipped = set() if self.dedup_mode == 'link' else {n for n, _ in duplicates}
+                        outputs = [frame_path(entry['frame']) for entry in dedup.index
+                                   if entry['frame'] not in skipped]
+                        outputs.append(os.path.join(
+                            base_path, f"{self.segment_begin:06d}-{self.segment_end:06d}_hashes.json"))
+                self.store_cached_export(params, outputs)
+                print("\nDone!")
+                print(f"Saved to {writer.path}")
+                QMessageBox.information(self, "Success", f"Saved to {writer.path}")
+            elif format in ('Renditions', 'Tiles'):
+                paths = self.save_renditions(base_path) if format == 'Renditions' else self.save_tiles(base_path)
                 print("\nDone!")
-                print(f"Saved to {base_path}")
-                QMessageBox.information(self, "Success", f"Saved to {base_path}")
+                for name, path in paths.items():
+                    print(f"{name}: {path}")
+                QMessageBox.information(self, "Success", "Saved to " + ", ".join(paths.values()))
+            elif format in ARRAY_SAVE_FORMATS:
+                kind = ARRAY_SAVE_FORMATS[format]
+                save_path = os.path.join(base_path, f"{self.segment_begin:06d}-{self.segment_end:06d}")
+                outputs = [save_path + ARRAY_WRITERS[kind].suffix]
+                if kind == 'npy':
+                    outputs.append(outputs[0] + '.json')
+                params = self.segment_export_params(format=format, array=self.array_export_options)
+                if self.fetch_cached_export(params, outputs, outputs[0]):
+                    return
+                unlink_outputs(outputs)
+                save_path = self.save_array_segment(save_path, kind)
+                self.store_cached_export(params, outputs)
+                print(f"\nSaved to {save_path}")
+                QMessageBox.information(self, "Success", f"Saved to {save_path}")
+            elif format in PREVIEW_FORMATS:
+                save_path = os.path.join(base_path, f"{self.segment_begin:06d}-{self.segment_end:06d}{format}")
+                params = self.segment_export_params(format=format, playback_speed=self.playback_speed,
+                                                    preview=self.preview_options)
+                if self.fetch_cached_export(params, [save_path], save_path):
+                    return
+                unlink_outputs([save_path])
+                count = self.save_preview(save_path)
+                self.store_cached_export(params, [save_path])
+                print(f"\nSaved {count} frames to {save_path}")
+                QMessageBox.information(self, "Success", f"Saved to {save_path}")
             else:
                 save_path = os.path.join(base_path, f"{self.segment_begin:06d}-{self.segment_end:06d}{format}")
                 # Use absolute path
                 abs_save_path = os.path.abspath(save_path)
                 os.makedirs(os.path.dirname(abs_save_path), exist_ok=True)
-                self.save_video_segment(abs_save_path)
+                params = self.segment_export_params(format=format, playback_speed=self.playback_speed)
+                if self.fetch_cached_export(params, [abs_save_path], save_path):
+                    return
+                unlink_outputs([abs_save_path])
+                report = self.save_video_segment(abs_save_path)
+                if report is not None and not report['ok']:
+                    # Keep a bad export out of the cache
+                    QMessageBox.warning(self, "Verification failed",
+                                        f"Saved to {save_path}\n{format_report(report)}")
+                    return
+                self.store_cached_export(params, [abs_save_path])
                 print(f"Saved to {save_path}")
-                QMessageBox.information(self, "Success", f"Saved to {save_path}")
+                message = f"Saved to {save_path}"
+                if report is not None:
+                    message += f"\n{format_report(report)}"
+                QMessageBox.information(self, "Success", message)
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Save failed: {str(e)}")
         finally:
             self.is_processing = False
             
+    def segment_export_params(self, **options):
+        # Cache key of an export of the current segment
+        return dict(self.export_params(), segment=(self.segment_begin, self.segment_end), **options)
+        
+    def fetch_cached_export(self, params, outputs, save_path):
+        # Link the result of an identical earlier export instead of exporting again
+        if self.export_cache is None:
+            return False
+        if outputs is None:
+            # Outputs not known in advance: take whatever the cached export holds
+            if not self.export_cache.fetch_into(params, save_path):
+                return False
+        elif not self.export_cache.fetch(params, outputs):
+            return False
+        print(f"Saved to {save_path} (cached)")
+        QMessageBox.information(self, "Success", f"Saved to {save_path}")
+        return True
+        
+    def store_cached_export(self, params, outputs):
+        if self.export_cache is not None:
+            self.export_cache.store(params, outputs)
+            
+    def save_array_segment(self, save_path, kind):
+        # Stream every stride-th frame of the segment into a numpy array export
+        options = self.array_export_options
+        stride = max(1, options['stride'])
+        count = len(range(self.segment_begin, self.segment_end, stride))
+        writer = open_array_writer(kind, save_path, count, options['dtype'],
+                                   options['channels'], options['layout'])
+        try:
+            for frame_number, frame in self.iter_export_frames():
+                if (frame_number - self.segment_begin) % stride:
+                    continue
+                writer.write(frame_number, frame)
+                progress = len(writer.frame_numbers) / count * 100
+                print(f"\rSaving frames: {progress:.1f}%", end="")
+        finally:
+            writer.close()
+        return writer.path
+        
+    def save_preview(self, save_path):
+        # Downscaled, frame-rate limited animation of the segment; the GIF palette is
+        # fitted to a few frames once and cached
+        options = self.preview_options
+        if self.resize_dimensions:
+            width, height = self.resize_dimensions
+        elif self.clip_rect:
+            x1, y1, x2, y2 = self.clip_rect
+            width, height = x2 - x1, y2 - y1
+        else:
+            width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        size = preview_size(width, height, options['width'])
+        fps = self.export_fps()
+        step = preview_step(fps, options['fps'])
+        begin, end = self.segment_begin, self.segment_end
+        keep = np.zeros(end - begin, dtype=bool)
+        keep[::step] = True
+        idle_keep = self.export_keep_mask(begin, end)
+        if idle_keep is not None:
+            keep &= idle_keep
+        frame_numbers = (np.flatnonzero(keep) + begin).tolist()
+        if not frame_numbers:
+            raise Exception("No frames to save in this segment")
+        
+        def frames(numbers):
+            mask = np.zeros(end - begin, dtype=bool)
+            mask[np.array(numbers, dtype=int) - begin] = True
+            return (frame for _, frame in self.iter_kept_frames(begin, mask))
+            
+        palette = lut = None
+        if save_path.lower().endswith('.gif'):
+            samples = palette_samples(frame_numbers)
+            path = palette_cache_path(self.input_file, samples, self.clip_rect, size, options['colors'])
+            palette, lut = load_palette(
+                path, lambda: next(iter_preview_batches(frames(samples), self.clip_rect, size, len(samples))),
+                options['colors'])
+        return write_preview(save_path, iter_preview_batches(frames(frame_numbers), self.clip_rect, size),
+                             len(frame_numbers), step / fps, palette, lut, options['tolerance'],
+                             options['quality'], progress=lambda p: print(f"\rSaving preview: {p:.1f}%", end=""))
+        
     def save_video_segment(self, save_path):
+        out = None
         try:
             # Get video properties
             width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
@@ -992,49 +1910,121 @@ class VideoPlayer(QMainWindow):
                 width, height = self.resize_dimensions
             
             # Choose codec based on platform
-            if sys.platform == 'darwin':  # macOS
-                fourcc = cv2.VideoWriter_fourcc(*'avc1')  # H.264 codec
-            elif sys.platform == 'linux':  # Linux
-                fourcc = cv2.VideoWriter_fourcc(*'XVID')  # XVID codec
-            else:  # Windows
-                fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            
-            # Create video writer
-            out = cv2.VideoWriter(save_path, fourcc, self.fps, (width, height))
-            
-            if not out.isOpened():
-                raise Exception("Failed to create output video file")
-            
-            # Set start position
-            self.cap.set(cv2.CAP_PROP_POS_FRAMES, self.segment_begin)
-            
-            # Write frames
-            for _ in range(self.segment_begin, self.segment_end):
-                ret, frame = self.cap.read()
-                if ret:
-                    # Apply crop if exists
-                    if self.clip_rect:
-                        x1, y1, x2, y2 = self.clip_rect
-                        frame = frame[y1:y2, x1:x2]
-                        
-                    # Apply resize if exists
-                    if self.resize_dimensions:
-                        width, height = self.resize_dimensions
-                        frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_LINEAR)
-                        
-                    out.write(frame)
-                else:
-                    break
+            fourcc = platform_fourcc()
+            
+            fps = self.export_fps()
+            
+            # Without pixel edits in BGR, frames can go from decoder to encoder as I420 planes
+            source_size = (int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+            suffix = os.path.splitext(save_path)[1].lower()
+            keep = self.export_keep_mask(self.segment_begin, self.segment_end)
+            yuv = (self.yuv_export and keep is None and not self.verify_exports
+                   and yuv_compatible(source_size, self.clip_rect, self.resize_dimensions, suffix, fourcc))
+            
+            # Encode in chunks so an interrupted export resumes after the last finished chunk
+            # (one chunk without ffmpeg, which is needed to join them without re-encoding)
+            params = self.segment_export_params(fourcc=fourcc, fps=round(fps, 6), yuv=yuv)
+            export = ChunkedVideoExport(save_path, params, self.export_chunk_frames)
+            pending = export.pending_chunks(self.segment_begin, self.segment_end)
+            if len(pending) < len(export.chunks(self.segment_begin, self.segment_end)):
+                print(f"Resuming: {len(export.completed)} chunks already saved")
+            
+            # Check every frame written in this run against an independent decode
+            if self.verify_exports:
+                expected = [n for b, e in pending for n in range(b, e)
+                            if keep is None or keep[n - self.segment_begin]]
+                self.export_verifier = ExportVerifier(self.input_file, expected,
+                                                      max_inflight_bytes=self.verify_max_inflight_bytes())
+            
+            for chunk_begin, chunk_end in pending:
+                if yuv:
+                    begin_seconds = (self.pts_table.time_of(chunk_begin) if self.pts_table is not None
+                                     else chunk_begin / self.original_fps)
+                    written = export_yuv_segment(self.input_file, export.tmp_part_path(chunk_begin), begin_seconds,
+                                                 chunk_end - chunk_begin, source_size, fps, fourcc, self.clip_rect,
+                                                 self.resize_dimensions, suffix)
+                    if written != chunk_end - chunk_begin:
+                        # A short chunk must not be recorded as done, or a resume would keep it
+                        raise Exception(f"ffmpeg decoded {written} of {chunk_end - chunk_begin} frames "
+                                        f"from frame {chunk_begin}")
+                    export.complete(chunk_begin)
+                    continue
                     
-            out.release()
+                # Create video writer
+                out = cv2.VideoWriter(export.tmp_part_path(chunk_begin), fourcc, fps, (width, height))
+                
+                if not out.isOpened():
+                    raise Exception("Failed to create output video file")
+                
+                # Write frames (crop and resize applied)
+                for _, frame in self.iter_export_frames(chunk_begin, chunk_end, segment_keep=keep):
+                    out.write(frame)
+                        
+                out.release()
+                export.complete(chunk_begin)
+            
+            export.concatenate()
+            if self.export_verifier is None:
+                return None
+            report = self.export_verifier.finish()
+            with open(save_path + '.verify.json', 'w') as f:
+                json.dump(report, f, indent=1)
+            print(format_report(report))
+            return report
         except Exception as e:
             if out and out.isOpened():
                 out.release()
             raise e
+        finally:
+            if self.export_verifier is not None:
+                # Stops the reference decode when the export failed
+                self.export_verifier.cancel()
+            self.export_verifier = None
+            
+    def export_fps(self):
+        # Keep the segment duration on VFR sources by writing at its average rate
+        if self.pts_table is not None:
+            return self.pts_table.average_fps(self.segment_begin, self.segment_end) * self.playback_speed
+        return self.fps
+        
+    def save_renditions(self, base_path):
+        # One decode pass feeds every rendition; each is scaled from the cropped frame
+        # or from a larger rendition of the same frame
+        return fanout_export(
+            self.iter_export_frames(resize=False, queued=True), self.renditions, base_path, self.export_fps(),
+            self.segment_begin, self.segment_end,
+            progress=lambda p: print(f"\rSaving renditions: {p:.1f}%", end=""))
+            
+    def save_tiles(self, base_path):
+        # One decode pass; every tile is a view of the (cropped) frame with its own encoder
+        frames = self.iter_export_frames(resize=False, queued=True)
+        rois = self.tile_rois
+        if not rois:
+            if self.clip_rect:
+                x1, y1, x2, y2 = self.clip_rect
+                width, height = x2 - x1, y2 - y1
+            else:
+                width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+                height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            rois = grid_rois(width, height, *self.tile_grid, self.tile_overlap)
+        return tile_export(frames, rois, base_path, self.export_fps(), self.segment_begin, self.segment_end,
+                           self.tile_format, self.save_container.currentText(),
+                           progress=lambda p: print(f"\rSaving tiles: {p:.1f}%", end=""))
+        
+    def export_params(self):
+        # Everything besides the frame range that decides the content of an export;
+        # the source counts by content, so copies and touched files still match
+        return {
+            'content': content_digest(self.input_file),
+            'clip_rect': self.clip_rect,
+            'resize': self.resize_dimensions,
+            'skip_idle': self.idle_options if self.skip_idle and self.activity is not None else None,
+        }
             
     def update_display(self, frame):
         if frame is None:
             return
+        start = time.perf_counter()
             
         # Apply crop
         if self.clip_rect:
@@ -1046,6 +2036,11 @@ class VideoPlayer(QMainWindow):
             width, height = self.resize_dimensions
             frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_LINEAR)
             
+        # Scale down to what the label shows before converting colours
+        playing = self.adaptive_display and self.is_playing
+        if self.adaptive_display:
+            frame = self.fit_to_label(frame, self.preview_scale if playing else 1.0, fast=playing)
+            
         # Convert color space from BGR to RGB
         frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
         h, w, ch = frame_rgb.shape
@@ -1054,14 +2049,39 @@ class VideoPlayer(QMainWindow):
         # Convert to QImage and display
         qt_image = QImage(frame_rgb.data, w, h, bytes_per_line, QImage.Format_RGB888)
         self.video_label.setPixmap(QPixmap.fromImage(qt_image).scaled(
-            self.video_label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation))
+            self.video_label.size(), Qt.KeepAspectRatio,
+            Qt.FastTransformation if playing else Qt.SmoothTransformation))
+            
+        # Update time label (only when the shown seconds change)
+        current_time = self.frame_time(self.current_frame_number)
+        total_time = self.frame_time(self.segment_end)
+        text = (f"{int(current_time//60):02d}:{int(current_time%60):02d} / "
+                f"{int(total_time//60):02d}:{int(total_time%60):02d}")
+        if text != self.time_label_text:
+            self.time_label_text = text
+            self.time_label.setText(text)
+            
+        if playing:
+            self.adapt_preview_scale((time.perf_counter() - start) * 1000)
+        
+    def fit_to_label(self, frame, scale=1.0, fast=False):
+        # Downscale a frame to the label size (times scale); never upscale
+        h, w = frame.shape[:2]
+        factor = min(self.video_label.width() / w, self.video_label.height() / h) * scale
+        if factor >= 1:
+            return frame
+        size = (max(1, int(w * factor)), max(1, int(h * factor)))
+        return cv2.resize(frame, size, interpolation=cv2.INTER_NEAREST if fast else cv2.INTER_AREA)
+        
+    def adapt_preview_scale(self, elapsed_ms):
+        # Lower the preview resolution while rendering takes more than half a frame interval
+        self.display_time_ms = 0.8 * self.display_time_ms + 0.2 * elapsed_ms
+        budget_ms = 500 / self.fps if self.fps else 20
+        if self.display_time_ms > budget_ms:
+            self.preview_scale = max(0.25, self.preview_scale * 0.8)
+        elif self.display_time_ms < budget_ms / 3:
+            self.preview_scale = min(1.0, self.preview_scale * 1.05)
             
-        # Update time label
-        current_time = self.current_frame_number / self.fps
-        total_time = self.segment_end / self.fps
-        self.time_label.setText(f"{int(current_time//60):02d}:{int(current_time%60):02d} / "
-                              f"{int(total_time//60):02d}:{int(total_time%60):02d}")
-        
     def dragEnterEvent(self, event: QDragEnterEvent):
         if event.mimeData().hasUrls():
             event.accept()
@@ -1081,9 +2101,14 @@ class VideoPlayer(QMainWindow):
         ))
             
     def dropEvent(self, event: QDropEvent):
-        files = [u.toLocalFile() for u in event.mimeData().urls()]
+        paths = [u.toLocalFile() for u in event.mimeData().urls()]
+        files = [p for p in paths if os.path.isfile(p)]
         if files:
             self.load_video(files[0])
+        # Folders and multi-file drops go to the catalog
+        folders = [p for p in paths if os.path.isdir(p)]
+        if folders or len(files) > 1:
+            self.start_ingest(folders, [f for f in files if f.lower().endswith(VIDEO_EXTENSIONS)])
         self.video_label.setStyleSheet(self.video_label.styleSheet().replace(
             "border: 2px dashed #4CAF50; background-color: rgba(76, 175, 80, 0.1);",
             "border: 2px dashed #666;"
@@ -1099,6 +2124,7 @@ class VideoPlayer(QMainWindow):
         if file_path:
             self.load_video(file_path)
             
+    @traced()
     def load_video(self, file_path):
         if self.is_processing:
             QMessageBox.warning(self, "Warning", "A video processing task is in progress, please wait!")
@@ -1108,65 +2134,160 @@ class VideoPlayer(QMainWindow):
             QMessageBox.critical(self, "Error", "File does not exist!")
             return
             
-        if not file_path.lower().endswith(('.mp4', '.avi', '.mov')):
+        if not file_path.lower().endswith(VIDEO_EXTENSIONS):
             QMessageBox.warning(self, "Warning", "Unsupported file format!")
             return
             
         try:
-            if self.cap is not None:
-                self.cap.release()
-                
-            self.cap = cv2.VideoCapture(file_path)
-            if not self.cap.isOpened():
-                raise Exception("Failed to open video file")
-                
-            self.input_file = file_path
-            self.original_fps = self.cap.get(cv2.CAP_PROP_FPS)
-            self.fps = self.original_fps
-            self.total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            self.time_slider.setMaximum(self.total_frames - 1)
-            self.last_directory = os.path.dirname(file_path)
-            
-            # Enable controls
-            self.play_button.setEnabled(True)
-            self.time_slider.setEnabled(True)
-            self.save_format.setEnabled(True)
-            self.save_button.setEnabled(True)
-            
-            # Clear hint text
-            self.video_label.setText("")
-            
-            # Reset segment mode
-            self.segment_begin = 0
-            self.segment_end = self.total_frames
-            self.segment_widget.set_range(self.total_frames)
-            
-            # Reset speed
-            self.playback_speed = 1.0
-            self.fps = self.original_fps
-            
-            self.play_video()
+            # Captures of recently used files stay open in the pool
+            cap = self.capture_pool.get(file_path)
+            probe = self.capture_pool.probe(file_path)
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to load video: {str(e)}")
-            if self.cap is not None:
-                self.cap.release()
-                self.cap = None
-            # Disable controls on error
+            return
+            
+        self.pause_video()
+        self.save_file_state()
+        self.cap = cap
+        self.input_file = file_path
+        self.last_directory = os.path.dirname(file_path)
+        
+        state = self.file_states.get(file_path)
+        resumed = state is not None
+        if not resumed:
+            state = self.file_states[file_path] = {
+                'original_fps': probe['fps'],
+                'total_frames': probe['frame_count'],
+                'segment_begin': 0,
+                'segment_end': probe['frame_count'],
+                'clip_rect': None,
+                'resize_dimensions': None,
+                'last_resize_dimensions': None,
+                'playback_speed': 1.0,
+                'current_frame': None,
+                'current_frame_number': 0,
+                'pts_table': None,
+                'keyframes': None,
+                'scene_cuts': None,
+                'frame_store': None,
+                'activity': None,
+                'idle_keep': None,
+            }
+            self.add_file_tab(file_path)
+            # Frame timestamps are scanned once per file and cached
+            self.start_pts_scan(file_path)
+        self.restore_file_state(state)
+        self.file_tabs.setCurrentIndex(self.file_tab_index(file_path))
+        if self.use_frame_store and self.frame_store is None:
+            # The Cache toggle applies to every file of the session
+            self.build_frame_store()
+        
+        # Enable controls
+        self.play_button.setEnabled(True)
+        self.time_slider.setEnabled(True)
+        self.save_format.setEnabled(True)
+        self.save_container.setEnabled(True)
+        self.save_button.setEnabled(True)
+        
+        # Clear hint text
+        self.video_label.setText("")
+        
+        if resumed and self.current_frame is not None:
+            # Show the saved frame right away; the capture seeks when playback resumes
+            self.update_display(self.current_frame)
+            self.pending_seek = self.current_frame_number + 1
+        else:
+            self.set_position(self.segment_begin)
+            self.play_video()
+            
+    def save_file_state(self):
+        if self.input_file in self.file_states:
+            self.file_states[self.input_file] = {key: getattr(self, key) for key in self.FILE_STATE}
+            
+    def restore_file_state(self, state):
+        for key in self.FILE_STATE:
+            setattr(self, key, state[key])
+        self.fps = self.original_fps * self.playback_speed
+        self.pending_seek = None
+        
+        # Timeline covers the confirmed segment, or the whole file. Signals are
+        # blocked so restoring the slider does not trigger a seek.
+        self.segment_widget.set_range(self.total_frames)
+        self.time_slider.blockSignals(True)
+        if self.segment_begin == 0 and self.segment_end == self.total_frames:
+            self.time_slider.setRange(0, self.total_frames - 1)
+        else:
+            self.time_slider.setRange(self.segment_begin, self.segment_end)
+        self.time_slider.setValue(self.current_frame_number)
+        self.time_slider.blockSignals(False)
+        if self.pts_table is not None:
+            self.apply_pts_frame_count()
+        if self.skip_idle:
+            self.start_activity_scan()
+        self.update_activity_bar()
+            
+    def file_tab_index(self, file_path):
+        for index in range(self.file_tabs.count()):
+            if self.file_tabs.tabData(index) == file_path:
+                return index
+        return -1
+        
+    def add_file_tab(self, file_path):
+        index = self.file_tabs.addTab(os.path.basename(file_path))
+        self.file_tabs.setTabData(index, file_path)
+        self.file_tabs.setTabToolTip(index, file_path)
+        self.file_tabs.show()
+        
+    def file_tab_changed(self, index):
+        file_path = self.file_tabs.tabData(index)
+        if file_path and file_path != self.input_file:
+            self.load_video(file_path)
+            
+    def close_file_tab(self, index):
+        if self.is_processing:
+            QMessageBox.warning(self, "Warning", "A video processing task is in progress, please wait!")
+            return
+            
+        file_path = self.file_tabs.tabData(index)
+        state = self.file_states.pop(file_path, None)
+        if file_path == self.input_file:
+            self.pause_video()
+            self.close_frame_store()
+            self.cap = None
+            self.current_frame = None
+            self.input_file = ""
+        elif state is not None and state['frame_store'] is not None:
+            state['frame_store'].close()
+        self.capture_pool.release(file_path)
+        
+        # Removing the current tab switches to a neighbouring file
+        self.file_tabs.removeTab(index)
+        if self.file_tabs.count() == 0:
+            self.file_tabs.hide()
+            self.video_label.clear()
+            self.video_label.setText("Drag and drop video file here")
             self.play_button.setEnabled(False)
             self.time_slider.setEnabled(False)
             self.save_format.setEnabled(False)
+            self.save_container.setEnabled(False)
             self.save_button.setEnabled(False)
         
-    def play_video(self):
+    def play_video(self, direction=1):
+        self.play_direction = direction
         self.is_playing = True
         self.play_button.setIcon(self.style().standardIcon(QStyle.SP_MediaPause))
         self.timer.start(int(1000/self.fps))
         
     def pause_video(self):
+        was_playing = self.is_playing
         self.is_playing = False
         self.play_button.setIcon(self.style().standardIcon(QStyle.SP_MediaPlay))
         self.timer.stop()
+        # Redraw the paused frame at full quality
+        if was_playing and self.adaptive_display and self.current_frame is not None:
+            self.update_display(self.current_frame)
         
+    @traced()
     def toggle_play(self):
         if self.is_playing:
             self.pause_video()
@@ -1174,40 +2295,211 @@ class VideoPlayer(QMainWindow):
             self.play_video()
             
     def update_frame(self):
-        ret, frame = self.cap.read()
-        if ret:
+        if self.play_direction < 0:
+            self.update_frame_backwards()
+            return
+        # Frames served from the store leave the capture behind at its old position
+        if self.pending_seek is not None:
+            position = self.pending_seek
+        else:
+            position = self.capture_position()
+        # Jump over idle spans
+        if self.skip_idle and self.idle_keep is not None:
+            position = self.next_active_frame(position)
+        if self.frame_store is not None and self.frame_store.covers(position):
+            frame = self.read_frame(position)
+        else:
+            if self.pending_seek is not None or position != self.capture_position():
+                self.set_position(position)
+            ret, frame = self.cap.read()
+            frame = self.shared_frame(frame) if ret else None
+        if frame is not None:
             self.current_frame = frame
-            self.current_frame_number = int(self.cap.get(cv2.CAP_PROP_POS_FRAMES))
+            self.current_frame_number = position
+            # Move the slider without re-reading the frame in slider_value_changed
+            self.time_slider.blockSignals(True)
             self.time_slider.setValue(self.current_frame_number)
+            self.time_slider.blockSignals(False)
             
             # Check if reached segment end
-            if self.current_frame_number >= self.segment_end:
+            if self.current_frame_number + 1 >= self.segment_end:
                 self.pause_video()
-                self.cap.set(cv2.CAP_PROP_POS_FRAMES, self.segment_begin)
+                self.set_position(self.segment_begin)
                 self.current_frame_number = self.segment_begin
                 self.time_slider.setValue(self.segment_begin)
             
             self.update_display(frame)
         else:
-            self.cap.set(cv2.CAP_PROP_POS_FRAMES, self.segment_begin)
+            self.set_position(self.segment_begin)
                 
-    def set_position(self, position):
-        if self.cap is not None:
-            self.cap.set(cv2.CAP_PROP_POS_FRAMES, position)
+    def update_frame_backwards(self):
+        if self.current_frame_number <= self.segment_begin:
+            self.pause_video()
+            return
+        if not self.show_frame(self.current_frame_number - 1):
+            self.pause_video()
             
+    def step_frame(self, step):
+        # Show the frame step frames away from the shown one and stay paused
+        if self.cap is None:
+            return
+        self.pause_video()
+        frame_number = self.current_frame_number + step
+        if self.segment_begin <= frame_number < self.segment_end:
+            self.show_frame(frame_number)
+            
+    def show_frame(self, frame_number):
+        frame = self.read_step_frame(frame_number)
+        if frame is None:
+            return False
+        self.current_frame = frame
+        self.current_frame_number = frame_number
+        self.time_slider.blockSignals(True)
+        self.time_slider.setValue(frame_number)
+        self.time_slider.blockSignals(False)
+        self.update_display(frame)
+        return True
+        
+    def read_step_frame(self, frame_number):
+        # Neighbouring frames come from the frame store, the GOP cache or the next
+        # read of the capture; earlier frames decode their GOP once into the cache
+        if self.frame_store is not None and self.frame_store.covers(frame_number):
+            return self.read_frame(frame_number)
+        cache = self.current_gop_cache()
+        frame = cache.get(frame_number)
+        if frame is not None:
+            self.pending_seek = frame_number + 1
+            return self.shared_frame(frame)
+        if frame_number > self.current_frame_number:
+            if self.pending_seek is not None or self.capture_position() != frame_number:
+                self.set_position(frame_number)
+            ret, frame = self.cap.read()
+            return self.shared_frame(frame) if ret else None
+        self.pending_seek = None
+        return self.shared_frame(cache.decode_to(self.cap, frame_number, self.pts_table))
+        
+    def current_gop_cache(self):
+        max_bytes = self.gop_cache_max_bytes
+        if self.low_memory:
+            max_bytes = min(max_bytes, self.low_memory_gop_cache_bytes)
+        cache = self.gop_cache
+        if cache is None or cache.source != self.input_file:
+            # Runs start window frames back until the background keyframe scan is done
+            cache = self.gop_cache = GopCache(self.input_file, self.keyframes, max_bytes)
+        elif cache.max_bytes != max_bytes:
+            cache.max_bytes = max_bytes
+            cache.clear()
+        return cache
+                
+    def set_position(self, position):
+        if self.cap is None:
+            return
+        self.pending_seek = None
+        seek_frame(self.cap, position, self.pts_table)
+                
+    def capture_position(self):
+        # Index of the next frame the capture will return
+        if self.pts_table is not None:
+            return self.pts_table.frame_at(self.cap.get(cv2.CAP_PROP_POS_MSEC)) + 1
+        return int(self.cap.get(cv2.CAP_PROP_POS_FRAMES))
+        
+    def frame_time(self, frame_number):
+        # Playback time of a frame in seconds at the current speed
+        if self.pts_table is not None:
+            return self.pts_table.time_of(frame_number) / self.playback_speed
+        return frame_number / self.fps
+        
+    def frame_at_time(self, seconds):
+        # Source frame shown at the given source time
+        if self.pts_table is not None:
+            return self.pts_table.frame_at_time(seconds)
+        return int(round(seconds * self.original_fps))
+        
+    def start_pts_scan(self, file_path):
+        def scan():
+            try:
+                table = load_pts_table(file_path)
+            except Exception as e:
+                print(f"Timestamp scan failed: {str(e)}")
+                table = None
+            self.pts_table_ready.emit(file_path, table)
+            # Keyframe indices are read from packet headers once per file and cached
+            try:
+                keyframes = load_keyframes(file_path)
+            except Exception as e:
+                print(f"Keyframe scan failed: {str(e)}")
+                keyframes = None
+            self.keyframes_ready.emit(file_path, keyframes)
+        threading.Thread(target=scan, daemon=True).start()
+        
+    def on_pts_table_ready(self, file_path, table):
+        if table is None:
+            return
+        if file_path != self.input_file:
+            # Applied when the user switches back to that file
+            if file_path in self.file_states:
+                self.file_states[file_path]['pts_table'] = table
+            return
+        self.pts_table = table
+        self.apply_pts_frame_count()
+        
+    def on_keyframes_ready(self, file_path, keyframes):
+        if keyframes is None:
+            return
+        if file_path != self.input_file:
+            if file_path in self.file_states:
+                self.file_states[file_path]['keyframes'] = keyframes
+            return
+        self.keyframes = keyframes
+        if self.gop_cache is not None and self.gop_cache.source == file_path:
+            self.gop_cache.keyframes = keyframes
+        
+    def apply_pts_frame_count(self):
+        # The container frame count is only an estimate on VFR sources
+        table = self.pts_table
+        if len(table) != self.total_frames:
+            full_range = self.segment_begin == 0 and self.segment_end == self.total_frames
+            self.total_frames = len(table)
+            if full_range:
+                self.segment_end = self.total_frames
+                self.time_slider.setMaximum(self.total_frames - 1)
+                self.segment_widget.set_range(self.total_frames)
+            
+    @traced(lambda self, event: [event.key()])
     def keyPressEvent(self, event):
-        if event.key() == Qt.Key_Space:
+        key = event.key()
+        if key == Qt.Key_Space:
             self.toggle_play()
+        elif key in (Qt.Key_Right, Qt.Key_Period):
+            self.step_frame(1)
+        elif key in (Qt.Key_Left, Qt.Key_Comma):
+            self.step_frame(-1)
+        elif key == Qt.Key_J:
+            # J/K/L: play backwards, pause, play forward
+            if self.cap is not None:
+                self.play_video(-1)
+        elif key == Qt.Key_K:
+            self.pause_video()
+        elif key == Qt.Key_L:
+            if self.cap is not None:
+                self.play_video()
             
     def closeEvent(self, event):
+        self.save_file_state()
+        for state in self.file_states.values():
+            if state['frame_store'] is not None:
+                state['frame_store'].close()
+        self.frame_store = None
         if self.cap is not None:
-            self.cap.release()
+            self.capture_pool.release_all()
             # Disable controls when closing video
             self.play_button.setEnabled(False)
             self.time_slider.setEnabled(False)
             self.save_format.setEnabled(False)
+            self.save_container.setEnabled(False)
             self.save_button.setEnabled(False)
 
+    @traced()
     def start_clip_mode(self):
         if not self.cap:
             QMessageBox.warning(self, "Warning", "Please load a video first!")
@@ -1217,21 +2509,25 @@ class VideoPlayer(QMainWindow):
         if self.clip_widget is None:
             self.clip_widget = ClipWidget(self)
             
-        self.clip_widget.set_frame(self.current_frame)
-        self.clip_widget.show()
+        with self.track_memory("Clip preview"):
+            self.clip_widget.set_frame(self.current_frame)
+            self.clip_widget.show()
         self.pause_video()
         
+    @traced()
     def confirm_clip(self, x1, y1, x2, y2):
         self.clip_rect = (x1, y1, x2, y2)
         if self.clip_widget:
             self.clip_widget.close()
         self.play_video()
         
+    @traced()
     def cancel_clip(self):
         if self.clip_widget:
             self.clip_widget.close()
         self.play_video()
         
+    @traced()
     def show_resize_dialog(self):
         if not self.cap:
             QMessageBox.warning(self, "Warning", "Please load a video first!")
@@ -1251,6 +2547,7 @@ class VideoPlayer(QMainWindow):
         self.resize_widget.show()
         self.pause_video()
         
+    @traced()
     def confirm_resize(self, width, height):
         self.resize_dimensions = (width, height)
         self.last_resize_dimensions = (width, height)  # Save the dimensions
@@ -1258,11 +2555,13 @@ class VideoPlayer(QMainWindow):
             self.resize_widget.close()
         self.play_video()
         
+    @traced()
     def cancel_resize(self):
         if self.resize_widget:
             self.resize_widget.close()
         self.play_video()
         
+    @traced()
     def show_speed_dialog(self):
         if not self.cap:
             QMessageBox.warning(self, "Warning", "Please load a video first!")
@@ -1270,28 +2569,34 @@ class VideoPlayer(QMainWindow):
             
         # Hide save controls and show speed control
         self.save_format.hide()
+        self.save_container.hide()
         self.save_button.hide()
         self.speed_control.show()
         self.pause_video()
         
+    @traced()
     def speed_changed(self, value):
         # Convert linear slider value (0-100) to logarithmic speed (0.1-10.0)
         # Using the formula: speed = 0.1 * (10^(value/50))
         speed = 0.1 * (10 ** (value / 50))
         self.speed_input.setText(f"{speed:.1f}")
         
+    @traced(lambda self: [self.speed_input.text()])
     def confirm_speed(self):
         speed = float(self.speed_input.text())
         self.playback_speed = speed
         self.fps = self.original_fps * speed
         self.speed_control.hide()
         self.save_format.show()
+        self.save_container.show()
         self.save_button.show()
         self.play_video()
         
+    @traced()
     def cancel_speed(self):
         self.speed_control.hide()
         self.save_format.show()
+        self.save_container.show()
         self.save_button.show()
         self.play_video()
 
@@ -1299,4 +2604,12 @@ if __name__ == '__main__':
     app = QApplication(sys.argv)
     player = VideoPlayer()
     player.show()
-    sys.exit(app.exec_()) 
\ No newline at end of file
+    # Used by the startup benchmark: quit as soon as the first frame is painted
+    if os.environ.get('VIDEOPROCESSOR_STARTUP_PROBE') == '1':
+        QTimer.singleShot(0, app.quit)
+    # Record UI interactions for interaction_trace.py replay
+    if os.environ.get('VIDEOPROCESSOR_TRACE'):
+        start_recording(os.environ['VIDEOPROCESSOR_TRACE'])
+    status = app.exec_()
+    stop_recording()
+    sys.exit(status) 
\ No newline at end of file
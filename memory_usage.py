@@ -0,0 +1,64 @@
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def current_rss():
+    """Resident set size of this process in bytes, or None when unknown"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def reset_peak_rss():
+    """Restart peak tracking; True when supported (Linux only)"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss():
+    """Peak resident set size in bytes since the last reset (or process start)"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+@contextmanager
+def track_peak_rss(operation, report=print):
+    """Report the peak RSS reached while the block runs.
+
+    Where the peak cannot be reset the figure is the process-wide peak so far.
+    """
+    exact = reset_peak_rss()
+    before = current_rss()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        peak = peak_rss()
+        if peak is not None:
+            growth = f", +{(peak - before) / 1e6:.0f} MB over start" if exact and before else ""
+            scope = "" if exact else " (process peak)"
+            report(f"{operation}: peak RSS {peak / 1e6:.0f} MB{scope}{growth}, "
+                   f"{time.perf_counter() - start:.2f}s")
@@ -0,0 +1,107 @@
+import os
+import json
+from file_cache import source_cache_path
+from yuv_frames import open_luma_capture, quiet_decoder_log
+from lazy_import import lazy_module
+
+cv2 = lazy_module('cv2')
+np = lazy_module('numpy')
+
+THUMB_SIZE = (64, 36)  # Analysis resolution (width, height)
+HIST_BINS = 16
+
+
+def read_thumbnails(source, stride=2, chunk_size=512, progress=None):
+    """Yield (frame_numbers, thumbnails) chunks of downscaled grayscale frames.
+
+    Only every stride-th frame is retrieved; the others are grabbed, which skips
+    the colour conversion and the copy out of the decoder. Where the decoder
+    hands out its luma plane directly no frame is converted to BGR at all.
+    """
+    luma = open_luma_capture(source)
+    if luma is not None:
+        cap, levels = luma
+    else:
+        cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        raise Exception("Failed to open video file")
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or 1
+    thumbs = np.empty((chunk_size, THUMB_SIZE[1], THUMB_SIZE[0]), dtype=np.uint8)
+    numbers = []
+    frame_number = 0
+    try:
+        while cap.grab():
+            if frame_number % stride == 0:
+                with quiet_decoder_log():
+                    ret, frame = cap.retrieve()
+                if not ret:
+                    break
+                small = cv2.resize(frame, THUMB_SIZE, interpolation=cv2.INTER_AREA)
+                if luma is None:
+                    thumbs[len(numbers)] = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+                elif levels is not None:
+                    # Stretch video-range luma so thresholds match BGR-derived grey
+                    cv2.LUT(small, levels, dst=thumbs[len(numbers)])
+                else:
+                    thumbs[len(numbers)] = small
+                numbers.append(frame_number)
+                if len(numbers) == chunk_size:
+                    yield np.array(numbers), thumbs
+                    numbers = []
+                    if progress:
+                        progress(frame_number / total * 100)
+            frame_number += 1
+        if numbers:
+            yield np.array(numbers), thumbs[:len(numbers)]
+    finally:
+        cap.release()
+
+
+def scene_scores(thumbs):
+    """Change score in [0, 1] between consecutive thumbnails, computed for the whole block"""
+    frames = thumbs.astype(np.int16)
+    pixel_diff = np.abs(frames[1:] - frames[:-1]).mean(axis=(1, 2)) / 255
+
+    # Luminance histograms of every thumbnail with a single bincount
+    n = len(thumbs)
+    bins = (thumbs >> (8 - int(np.log2(HIST_BINS)))).reshape(n, -1).astype(np.int64)
+    bins += np.arange(n)[:, None] * HIST_BINS
+    hist = np.bincount(bins.ravel(), minlength=n * HIST_BINS).reshape(n, HIST_BINS)
+    hist = hist / thumbs[0].size
+    hist_diff = np.abs(hist[1:] - hist[:-1]).sum(axis=1) / 2
+
+    return (pixel_diff + hist_diff) / 2
+
+
+def detect_scene_cuts(source, stride=2, threshold=0.3, min_scene_frames=15, progress=None):
+    """Return the first frame number of every detected scene after the first"""
+    cuts = []
+    prev_number = None
+    prev_thumb = None
+    for numbers, thumbs in read_thumbnails(source, stride, progress=progress):
+        # Carry the last thumbnail over so chunk boundaries are compared too
+        if prev_thumb is not None:
+            numbers = np.concatenate(([prev_number], numbers))
+            thumbs = np.concatenate((prev_thumb[None], thumbs))
+        if len(thumbs) > 1:
+            scores = scene_scores(thumbs)
+            for index in np.flatnonzero(scores > threshold):
+                cut = int(numbers[index + 1])
+                if not cuts or cut - cuts[-1] >= min_scene_frames:
+                    cuts.append(cut)
+        prev_number = numbers[-1]
+        prev_thumb = thumbs[-1].copy()
+    return cuts
+
+
+def load_scene_cuts(source, stride=2, threshold=0.3, min_scene_frames=15, progress=None):
+    """Scene cuts of a file, detected once per parameter set and cached"""
+    path = source_cache_path('scenes', source, stride, threshold, min_scene_frames,
+                             suffix='.json')
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)['cuts']
+    cuts = detect_scene_cuts(source, stride, threshold, min_scene_frames, progress)
+    with open(path, 'w') as f:
+        json.dump({'cuts': cuts}, f)
+    return cuts
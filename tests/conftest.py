@@ -0,0 +1,25 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+# The modules live at the top of the repository, next to main.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FRAME_COUNT = 60
+FRAME_SIZE = (64, 48)
+
+
+@pytest.fixture(scope='session')
+def numbered_video(tmp_path_factory):
+    """Motion JPEG AVI of FRAME_COUNT frames at 25 fps; frame n is flat grey at level 4 * n,
+    so round(frame.mean() / 4) tells which frame was decoded"""
+    path = str(tmp_path_factory.mktemp('video') / 'numbered.avi')
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 25, FRAME_SIZE)
+    assert out.isOpened()
+    for n in range(FRAME_COUNT):
+        out.write(np.full((FRAME_SIZE[1], FRAME_SIZE[0], 3), 4 * n, dtype=np.uint8))
+    out.release()
+    return path
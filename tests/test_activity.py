@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from activity import active_mask, keep_mask
+
+
+def scores(length, active=()):
+    values = np.zeros(length, dtype=np.float32)
+    values[list(active)] = 1.0
+    return values
+
+
+@pytest.mark.parametrize('length', [0, 1, 10, 30, 31, 32, 100])
+@pytest.mark.parametrize('pad', [0, 1, 15])
+def test_active_mask_has_one_value_per_frame(length, pad):
+    assert len(active_mask(scores(length), pad=pad, min_idle=0)) == length
+
+
+def test_active_mask_pads_around_activity():
+    mask = active_mask(scores(20, [10]), pad=3, min_idle=0)
+    assert np.flatnonzero(mask).tolist() == list(range(7, 14))
+    assert np.flatnonzero(active_mask(scores(20, [10]), pad=0, min_idle=0)).tolist() == [10]
+    # Padding is cut at both ends
+    assert np.flatnonzero(active_mask(scores(5, [0]), pad=15, min_idle=0)).tolist() == list(range(5))
+
+
+def test_active_mask_keeps_short_idle_runs():
+    values = scores(40, [0, 10, 39])
+    assert np.flatnonzero(active_mask(values, pad=0, min_idle=10)).tolist() == list(range(11)) + [39]
+    assert active_mask(values, pad=0, min_idle=30).all()
+
+
+def test_keep_mask_short_segment():
+    # Shorter than 2 * pad + 1 frames: still one value per frame of the segment
+    values = scores(100, [50])
+    keep = keep_mask(values, 40, 50, pad=15, min_idle=0)
+    assert len(keep) == 10
+    assert keep.all()
+    assert not keep_mask(values, 80, 90, pad=15, min_idle=0).any()
+
+
+def test_keep_mask_matches_the_whole_file_at_segment_edges():
+    values = scores(200, [60, 140])
+    whole = keep_mask(values, 0, 200, pad=15, min_idle=30)
+    for begin, end in ((50, 150), (70, 130), (0, 61), (139, 200)):
+        assert keep_mask(values, begin, end, pad=15, min_idle=30).tolist() == whole[begin:end].tolist()
+
+
+def test_keep_mask_compress():
+    values = scores(50, [0])
+    keep = keep_mask(values, 0, 50, mode='compress', keep_every=10, pad=0, min_idle=0)
+    assert np.flatnonzero(keep).tolist() == [0, 1, 11, 21, 31, 41]
+
+
+def test_keep_mask_past_the_scanned_range():
+    # Frames that were not scanned count as active
+    keep = keep_mask(scores(20), 10, 30, pad=2, min_idle=0)
+    assert len(keep) == 20
+    assert np.flatnonzero(keep).tolist() == list(range(8, 20))
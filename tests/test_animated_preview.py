@@ -0,0 +1,66 @@
+import cv2
+import numpy as np
+import pytest
+
+from animated_preview import (lzw_codes_per_run, lzw_codes_per_symbol, palette_lut, quantize,
+                              sample_palette, write_preview)
+
+
+def runs(data):
+    """(values, lengths) of the runs of equal bytes in data"""
+    data = np.frombuffer(data, dtype=np.uint8)
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(data)) + 1))
+    lengths = np.diff(np.concatenate((starts, [len(data)])))
+    return data[starts].tolist(), lengths.tolist()
+
+
+def preview_frames(height=48, width=64):
+    rng = np.random.default_rng(0)
+    noise = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+    stripes = np.repeat(rng.integers(0, 256, (height, 1, 3), dtype=np.uint8), width, axis=1)
+    mixed = stripes.copy()
+    mixed[:, :width // 2] = noise[:, :width // 2]
+    flat = np.full((height, width, 3), (40, 120, 200), dtype=np.uint8)
+    return np.stack([noise, stripes, mixed, flat])
+
+
+@pytest.mark.parametrize('data', [
+    bytes(np.random.default_rng(1).integers(0, 256, 20000, dtype=np.uint8)),  # noise, several clears
+    bytes([7]) * 100000,  # one long run
+    b''.join(bytes([v]) * n for v, n in zip(range(200), range(1, 201))),  # runs of every length
+    bytes(np.repeat(np.random.default_rng(2).integers(0, 4, 5000, dtype=np.uint8),
+                    np.random.default_rng(3).integers(1, 40, 5000))),  # short runs of few symbols
+    bytes([255]),
+])
+def test_lzw_codes_per_run_match_per_symbol(data):
+    assert lzw_codes_per_run(*runs(data)) == lzw_codes_per_symbol(data)
+
+
+@pytest.mark.skipif(not hasattr(cv2, 'imreadanimation'), reason="needs OpenCV 4.11 or newer")
+def test_gif_round_trip(tmp_path):
+    frames = preview_frames()
+    palette = sample_palette(frames)
+    lut = palette_lut(palette)
+    path = str(tmp_path / 'preview.gif')
+    assert write_preview(path, iter([frames[:2], frames[2:]]), len(frames), 0.1, palette, lut) == len(frames)
+
+    ok, animation = cv2.imreadanimation(path)
+    assert ok
+    decoded = np.stack(animation.frames)[..., :3]
+    # Every pixel comes back as its palette colour, including those left transparent
+    np.testing.assert_array_equal(decoded, palette[quantize(frames, lut)])
+    assert list(animation.durations) == [100] * len(frames)
+
+
+@pytest.mark.skipif(not hasattr(cv2, 'imreadanimation'), reason="needs OpenCV 4.11 or newer")
+def test_gif_repeated_frames_extend_the_delay(tmp_path):
+    frames = preview_frames()[[3, 3, 3, 0]]
+    palette = sample_palette(frames)
+    lut = palette_lut(palette)
+    path = str(tmp_path / 'preview.gif')
+    write_preview(path, iter([frames]), len(frames), 0.1, palette, lut)
+
+    ok, animation = cv2.imreadanimation(path)
+    assert ok
+    assert list(animation.durations) == [300, 100]
+    np.testing.assert_array_equal(np.stack(animation.frames)[..., :3], palette[quantize(frames[[0, 3]], lut)])
@@ -0,0 +1,104 @@
+import json
+import os
+import zipfile
+
+import numpy as np
+import pytest
+
+from array_export import (NpyArrayWriter, NpzArrayWriter, ShardedArray, ShardedArrayWriter, export_array,
+                          store_frame, truncate_npy)
+
+
+def frames(count, height=4, width=6):
+    # Frame n has blue n, green 100 + n and red 200 + n
+    return [np.dstack([np.full((height, width), v + n, dtype=np.uint8) for v in (0, 100, 200)])
+            for n in range(count)]
+
+
+def test_store_frame_channels_layout_and_scaling():
+    frame = frames(3)[2]
+    dst = np.empty((4, 6, 3), dtype=np.uint8)
+    store_frame(dst, frame)
+    assert dst[0, 0].tolist() == [202, 102, 2]
+    store_frame(dst, frame, channels='BGR')
+    assert dst[0, 0].tolist() == [2, 102, 202]
+    chw = np.empty((3, 4, 6), dtype=np.float32)
+    store_frame(chw, frame, layout='CHW')
+    np.testing.assert_allclose(chw[:, 1, 1], [202 / 255, 102 / 255, 2 / 255], rtol=1e-6)
+    assert chw.max() <= 1
+
+
+def test_truncate_npy_keeps_header_and_offset(tmp_path):
+    path = str(tmp_path / 'frames.npy')
+    array = np.lib.format.open_memmap(path, mode='w+', dtype=np.uint16, shape=(10, 3, 2))
+    array[:] = np.arange(60).reshape(10, 3, 2)
+    offset = array.offset
+    array.flush()
+    del array
+    truncate_npy(path, 4)
+    loaded = np.load(path, mmap_mode='r')
+    assert loaded.shape == (4, 3, 2)
+    assert loaded.offset == offset
+    np.testing.assert_array_equal(loaded, np.arange(24).reshape(4, 3, 2))
+    assert os.path.getsize(path) == offset + 24 * 2
+
+
+def test_npy_writer_source_ends_early(tmp_path):
+    writer = NpyArrayWriter(str(tmp_path / 'out'), 10, dtype='float16', layout='CHW')
+    for n, frame in enumerate(frames(6)):
+        writer.write(100 + n, frame)
+    writer.close()
+    loaded = np.load(writer.path)
+    assert loaded.shape == (6, 3, 4, 6)
+    assert loaded.dtype == np.float16
+    np.testing.assert_allclose(loaded[5, :, 0, 0], [205 / 255, 105 / 255, 5 / 255], rtol=1e-3)
+    with open(writer.path + '.json') as f:
+        metadata = json.load(f)
+    assert metadata['shape'] == [6, 3, 4, 6]
+    assert metadata['frame_numbers'] == list(range(100, 106))
+
+
+def test_npz_writer_round_trip(tmp_path):
+    writer = NpzArrayWriter(str(tmp_path / 'out'), 10, channels='BGR', chunk_frames=4)
+    for n, frame in enumerate(frames(10)):
+        writer.write(n * 2, frame)
+    writer.close()
+    with zipfile.ZipFile(writer.path) as archive:
+        # Stored, so members can be memory-mapped from the archive
+        assert all(info.compress_type == zipfile.ZIP_STORED for info in archive.infolist())
+    with np.load(writer.path) as data:
+        assert sorted(data.files) == ['frame_numbers', 'frames_00000', 'frames_00001', 'frames_00002']
+        joined = np.concatenate([data[f"frames_{i:05d}"] for i in range(3)])
+        np.testing.assert_array_equal(joined, np.stack(frames(10)))
+        assert data['frame_numbers'].tolist() == list(range(0, 20, 2))
+
+
+def test_sharded_writer_and_reader(tmp_path):
+    writer = ShardedArrayWriter(str(tmp_path / 'out'), 10, chunk_frames=4)
+    for n, frame in enumerate(frames(10)):
+        writer.write(n, frame)
+    writer.close()
+    array = ShardedArray(writer.path)
+    assert len(array) == 10
+    assert [shard['count'] for shard in array.metadata['shards']] == [4, 4, 2]
+    expected = np.stack(frames(10))[..., ::-1]
+    for index in (0, 3, 4, 7, 8, 9, -1, -6, -10):
+        np.testing.assert_array_equal(array[index], expected[index])
+    assert array.frame_numbers == list(range(10))
+
+
+@pytest.mark.parametrize('kind', ['npy', 'npz', 'shards'])
+def test_export_array_past_the_end(numbered_video, tmp_path, kind):
+    path = export_array(numbered_video, str(tmp_path / 'out'), kind, begin=50, end=70, stride=3,
+                        size=(16, 12), channels='BGR')
+    if kind == 'npy':
+        exported = np.load(path)
+    elif kind == 'npz':
+        with np.load(path) as data:
+            exported = data['frames_00000']
+    else:
+        shards = ShardedArray(path)
+        exported = np.stack([shards[i] for i in range(len(shards))])
+    # Frames 50, 53, 56 and 59 exist; 62..68 are past the end of the file
+    assert exported.shape == (4, 12, 16, 3)
+    assert [round(frame.mean() / 4) for frame in exported] == [50, 53, 56, 59]
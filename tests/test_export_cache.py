@@ -0,0 +1,100 @@
+import os
+import shutil
+
+import pytest
+
+import export_cache
+from export_cache import ExportCache, link_or_copy, unshared_size
+from file_cache import content_digest
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ExportCache(str(tmp_path / 'cache'))
+
+
+def export(source, path):
+    # Stands in for an export: the output is a copy of the source
+    shutil.copyfile(source, path)
+    return path
+
+
+def test_content_digest_follows_content_not_name(numbered_video, tmp_path):
+    copy = shutil.copy(numbered_video, str(tmp_path / 'renamed.avi'))
+    os.utime(copy, (0, 0))
+    assert content_digest(copy) == content_digest(numbered_video)
+    with open(copy, 'r+b') as f:
+        f.seek(os.path.getsize(copy) // 2)
+        f.write(b'edited')
+    assert content_digest(copy) != content_digest(numbered_video)
+
+
+def test_hit_and_miss(numbered_video, tmp_path, cache):
+    params = {'content': content_digest(numbered_video), 'format': '.avi', 'begin': 0, 'end': 60}
+    output = str(tmp_path / 'out.avi')
+    assert not cache.fetch(params, [output])
+    assert cache.store(params, [export(numbered_video, output)])
+
+    # A copy of the source under another name is served from the cache, as a hardlink
+    copy = shutil.copy(numbered_video, str(tmp_path / 'copy.avi'))
+    os.makedirs(str(tmp_path / 'again'))
+    again = str(tmp_path / 'again' / 'out.avi')
+    assert cache.fetch(dict(params, content=content_digest(copy)), [again])
+    assert os.path.samefile(again, output)
+    # Other params or other content miss
+    os.remove(again)
+    assert not cache.fetch(dict(params, end=30), [again])
+    assert not cache.fetch(dict(params, content='0' * 40), [again])
+    assert not os.path.exists(again)
+
+
+def test_fetch_into(numbered_video, tmp_path, cache):
+    frames = tmp_path / 'frames'
+    frames.mkdir()
+    outputs = [export(numbered_video, str(frames / f"{n:06d}.jpg")) for n in range(3)]
+    assert cache.store({'format': '*.jpg'}, outputs)
+    directory = tmp_path / 'fetched'
+    directory.mkdir()
+    assert cache.fetch_into({'format': '*.jpg'}, str(directory))
+    assert sorted(os.listdir(directory)) == ['000000.jpg', '000001.jpg', '000002.jpg']
+
+
+def test_copy_when_hardlinks_fail(numbered_video, tmp_path, cache, monkeypatch):
+    output = export(numbered_video, str(tmp_path / 'out.avi'))
+    assert cache.store({'format': '.avi'}, [output])
+
+    def cross_device(src, dst):
+        raise OSError("Invalid cross-device link")
+
+    monkeypatch.setattr(export_cache.os, 'link', cross_device)
+    os.makedirs(str(tmp_path / 'fetched'))
+    fetched = str(tmp_path / 'fetched' / 'out.avi')
+    assert cache.fetch({'format': '.avi'}, [fetched])
+    assert not os.path.samefile(fetched, output)
+    with open(fetched, 'rb') as a, open(output, 'rb') as b:
+        assert a.read() == b.read()
+    # Storing never copies
+    assert not cache.store({'format': '.mp4'}, [output])
+    assert not cache.fetch({'format': '.mp4'}, [str(tmp_path / 'fetched' / 'out.avi')])
+    assert link_or_copy(output, str(tmp_path / 'copied.avi')) == str(tmp_path / 'copied.avi')
+
+
+def test_evict_counts_only_unshared_bytes(numbered_video, tmp_path):
+    size = os.path.getsize(numbered_video)
+    cache = ExportCache(str(tmp_path / 'cache'), max_bytes=size)
+    outputs = []
+    for n in range(3):
+        outputs.append(export(numbered_video, str(tmp_path / f"out{n}.avi")))
+        cache.store({'n': n}, [outputs[-1]])
+        os.utime(cache.entry_path({'n': n}), (n, n))
+    # Every entry is still linked from its output, so removing it frees nothing
+    assert all(unshared_size(cache.entry_path({'n': n})) == 0 for n in range(3))
+    cache.evict()
+    assert all(os.path.isdir(cache.entry_path({'n': n})) for n in range(3))
+
+    for output in outputs:
+        os.remove(output)
+    assert unshared_size(cache.entry_path({'n': 0})) == size
+    cache.evict()
+    # Least recently used first, until the cache fits
+    assert [os.path.isdir(cache.entry_path({'n': n})) for n in range(3)] == [False, False, True]
@@ -0,0 +1,99 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+import export_checkpoint
+from export_checkpoint import ChunkedVideoExport, frame_file_valid, frames_to_resume, written_frames
+
+
+def write_image(path, fmt):
+    _, buffer = cv2.imencode(fmt, np.zeros((8, 8, 3), dtype=np.uint8))
+    with open(path, 'wb') as f:
+        f.write(buffer.tobytes())
+
+
+@pytest.mark.parametrize('fmt', ['.jpg', '.png'])
+def test_frame_file_valid(tmp_path, fmt):
+    path = str(tmp_path / f"000000{fmt}")
+    assert not frame_file_valid(path)
+    write_image(path, fmt)
+    assert frame_file_valid(path)
+    # An interrupted write misses the trailer
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - 4)
+    assert not frame_file_valid(path)
+
+
+def test_frames_to_resume(tmp_path):
+    directory = str(tmp_path / 'frames')
+    params = {'source': 'a.mp4', 'clip_rect': (0, 0, 8, 8)}
+    assert frames_to_resume(directory, range(5), '.png', params) == set()
+    for n in (0, 1, 3):
+        write_image(os.path.join(directory, f"{n:06d}.png"), '.png')
+    with open(os.path.join(directory, "000004.png"), 'wb') as f:
+        f.write(b'\x89PNG')  # cut short
+    assert written_frames(directory, range(5), '.png') == {0, 1, 3}
+    assert frames_to_resume(directory, range(5), '.png', params) == {0, 1, 3}
+    # Other params start over
+    assert frames_to_resume(directory, range(5), '.png', dict(params, clip_rect=None)) == set()
+    assert frames_to_resume(directory, range(5), '.png', params) == set()
+
+
+def with_ffmpeg(monkeypatch):
+    monkeypatch.setattr(export_checkpoint.shutil, 'which', lambda name: '/usr/bin/' + name)
+
+
+def test_chunks_need_ffmpeg(tmp_path, monkeypatch):
+    monkeypatch.setattr(export_checkpoint.shutil, 'which', lambda name: None)
+    export = ChunkedVideoExport(str(tmp_path / 'out.avi'), {'fps': 25}, chunk_frames=10)
+    assert export.chunks(5, 40) == [(5, 40)]
+    with_ffmpeg(monkeypatch)
+    export = ChunkedVideoExport(str(tmp_path / 'out.avi'), {'fps': 25}, chunk_frames=10)
+    assert export.chunks(5, 40) == [(5, 15), (15, 25), (25, 35), (35, 40)]
+
+
+def test_resume_after_completed_chunks(tmp_path, monkeypatch):
+    with_ffmpeg(monkeypatch)
+    save_path = str(tmp_path / 'out.avi')
+    export = ChunkedVideoExport(save_path, {'fps': 25}, chunk_frames=10)
+    for chunk_begin in (0, 10):
+        with open(export.tmp_part_path(chunk_begin), 'wb') as f:
+            f.write(b'part')
+        export.complete(chunk_begin)
+
+    export = ChunkedVideoExport(save_path, {'fps': 25}, chunk_frames=10)
+    assert export.pending_chunks(0, 30) == [(20, 30)]
+    # Parts of another export are discarded
+    export = ChunkedVideoExport(save_path, {'fps': 30}, chunk_frames=10)
+    assert export.pending_chunks(0, 30) == [(0, 10), (10, 20), (20, 30)]
+    assert os.listdir(export.parts_dir) == []
+
+
+def test_concatenate_one_part_is_renamed(tmp_path, monkeypatch):
+    monkeypatch.setattr(export_checkpoint.shutil, 'which', lambda name: None)
+    save_path = str(tmp_path / 'out.avi')
+    export = ChunkedVideoExport(save_path, {'fps': 25})
+    with open(export.tmp_part_path(0), 'wb') as f:
+        f.write(b'video')
+    export.complete(0)
+    export.concatenate()
+    with open(save_path, 'rb') as f:
+        assert f.read() == b'video'
+    assert not os.path.exists(export.parts_dir)
+
+
+def test_failed_join_keeps_the_parts(tmp_path, monkeypatch):
+    with_ffmpeg(monkeypatch)
+    monkeypatch.setattr(export_checkpoint, 'concat_with_ffmpeg', lambda parts, save_path: False)
+    save_path = str(tmp_path / 'out.avi')
+    export = ChunkedVideoExport(save_path, {'fps': 25}, chunk_frames=10)
+    for chunk_begin in (0, 10):
+        with open(export.tmp_part_path(chunk_begin), 'wb') as f:
+            f.write(b'part')
+        export.complete(chunk_begin)
+    with pytest.raises(Exception):
+        export.concatenate()
+    assert not os.path.exists(save_path)
+    assert ChunkedVideoExport(save_path, {'fps': 25}, chunk_frames=10).pending_chunks(0, 20) == []
@@ -0,0 +1,107 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+from export_service import ExportService, ServiceHandler, check_job
+
+PROBE = {'fps': 25.0, 'frame_count': 60, 'width': 64, 'height': 48, 'codec': 'MJPG'}
+
+
+@pytest.mark.parametrize('params', [
+    {'source': 'a.avi', 'begin': -1},
+    {'source': 'a.avi', 'begin': 30, 'end': 20},
+    {'source': 'a.avi', 'begin': 20, 'end': 20, 'format': '.npy'},  # nothing to write
+    {'source': 'a.avi', 'begin': 60},
+    {'source': 'a.avi', 'begin': 1.5},
+    {'source': 'a.avi', 'end': '10'},
+    {'source': 'a.avi', 'size': 640},
+    {'source': 'a.avi', 'size': [640, 0]},
+    {'source': 'a.avi', 'size': {'width': 640, 'height': 360}},
+    {'source': 'a.avi', 'clip_rect': [0, 0, 65, 48]},
+    {'source': 'a.avi', 'clip_rect': [10, 0, 10, 48]},
+    {'source': 'a.avi', 'clip_rect': [0, 0, 32]},
+    {'source': 'a.avi', 'speed': 0},
+    {'source': 'a.avi', 'speed': True},
+    {'source': 'a.avi', 'format': '.mkv'},
+    {'source': 'a.avi', 'format': '*.jpg', 'container': 'Rar'},
+    {'source': 'a.avi', 'format': '.npy', 'array': {'stride': 0}},
+    {'source': 'a.avi', 'format': '.npy', 'array': {'layout': 'NCHW'}},
+    {'source': 'a.avi', 'format': '.npy', 'array': [5]},
+    {'source': ['a.avi']},
+])
+def test_check_job_rejects(params):
+    with pytest.raises(ValueError):
+        check_job(params, PROBE)
+
+
+def test_check_job_accepts():
+    check_job({'source': 'a.avi'}, PROBE)
+    # The end is clamped to the file, as long as some frames remain
+    check_job({'source': 'a.avi', 'begin': 59, 'end': 1000, 'clip_rect': [0, 0, 64, 48], 'size': [32, 24],
+               'format': '.npy', 'array': {'stride': 7, 'dtype': 'float16', 'layout': 'CHW'}}, PROBE)
+
+
+def test_queue_order_is_priority_then_submission():
+    service = ExportService(workers=0)
+    service.probe = lambda source: PROBE
+    jobs = [service.submit({'source': 'a.avi'}, priority) for priority in (0, 5, 0, 5, -1)]
+    order = [service.queue.get_nowait()[2] for _ in jobs]
+    assert [job.id for job in order] == [jobs[1].id, jobs[3].id, jobs[0].id, jobs[2].id, jobs[4].id]
+
+
+def test_submit_validates_against_the_file(numbered_video):
+    service = ExportService(workers=0)
+    with pytest.raises(ValueError):
+        service.submit({'source': numbered_video, 'begin': 60})
+    with pytest.raises(ValueError):
+        service.submit({'source': numbered_video + '.missing'})
+    assert not service.jobs
+
+
+@pytest.fixture
+def server():
+    service = ExportService(workers=1)
+    handler = type('Handler', (ServiceHandler,), {'service': service})
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+    service.close()
+
+
+def request(url, body=None):
+    data = body if isinstance(body, bytes) or body is None else json.dumps(body).encode()
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data)) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+def test_http_bad_jobs_are_400(server, numbered_video):
+    for body in (b'not json', b'[1, 2]', {'source': numbered_video, 'priority': 'high'},
+                 {'source': numbered_video, 'begin': 50, 'end': 10},
+                 {'source': numbered_video, 'clip_rect': [0, 0, 640, 480]}):
+        status, reply = request(server + '/jobs', body)
+        assert status == 400, body
+        assert 'error' in json.loads(reply)
+
+
+def test_http_job_runs_to_done(server, numbered_video, tmp_path):
+    status, reply = request(server + '/jobs', {'source': numbered_video, 'format': '.npy', 'begin': 10,
+                                              'end': 20, 'array': {'stride': 3, 'channels': 'BGR'},
+                                              'output': str(tmp_path)})
+    assert status == 201
+    job = json.loads(reply)['job']
+    status, reply = request(f"{server}/jobs/{job}/events")
+    events = [json.loads(line) for line in reply.splitlines()]
+    assert events[-1]['state'] == 'done'
+    frames = np.load(events[-1]['path'])
+    assert [round(frame.mean() / 4) for frame in frames] == [10, 13, 16, 19]
@@ -0,0 +1,42 @@
+import cv2
+
+from extract import SEEK_COST_FRAMES, iter_frames_at, plan_reads
+
+
+def test_plan_reads_without_keyframes_splits_on_max_gap():
+    assert plan_reads([]) == []
+    assert plan_reads([5, 1, 5, 3]) == [[1, 3, 5]]
+    assert plan_reads([0, 250, 501, 502], max_gap=250) == [[0, 250], [501, 502]]
+
+
+def test_plan_reads_seeks_only_past_expensive_gaps():
+    keyframes = list(range(0, 1000, 100))
+    # Every third frame: one run, never a seek per keyframe
+    assert plan_reads(range(0, 1000, 3), keyframes) == [list(range(0, 1000, 3))]
+    # Keyframe 300 is only 10 frames after 289: decoding through is cheaper than seeking
+    assert plan_reads([210, 289, 305], keyframes) == [[210, 289, 305]]
+    # Seeking to keyframe 500 skips the 479 frames after 20
+    assert plan_reads([10, 20, 510], keyframes) == [[10, 20], [510]]
+    # A target inside the GOP of the previous one never seeks
+    assert plan_reads([110, 190], keyframes) == [[110, 190]]
+    # Before the first keyframe there is nothing to seek to
+    assert plan_reads([3, 40], [50, 100]) == [[3, 40]]
+
+
+def test_plan_reads_seek_cost():
+    keyframes = [0, 100, 200]
+    # Seeking to keyframe 100 skips frames 51..99
+    assert plan_reads([50, 120], keyframes, seek_cost=SEEK_COST_FRAMES) == [[50], [120]]
+    assert plan_reads([50, 120], keyframes, seek_cost=49) == [[50, 120]]
+    assert plan_reads([80, 120], keyframes, seek_cost=SEEK_COST_FRAMES) == [[80, 120]]
+
+
+def test_iter_frames_at(numbered_video):
+    cap = cv2.VideoCapture(numbered_video)
+    try:
+        indices = [44, 3, 0, 3, 17, 59]
+        frames = list(iter_frames_at(cap, indices, keyframes=list(range(60)), max_gap=5))
+    finally:
+        cap.release()
+    assert [index for index, _ in frames] == [0, 3, 17, 44, 59]
+    assert [round(frame.mean() / 4) for _, frame in frames] == [0, 3, 17, 44, 59]
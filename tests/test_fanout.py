@@ -0,0 +1,66 @@
+import os
+
+import cv2
+
+from fanout import fanout_export, parse_rendition, plan_cascade, rendition_size
+
+
+def test_rendition_size():
+    assert rendition_size({'height': 480}, 1920, 1080) == (854, 480)
+    assert rendition_size({'height': 2160}, 1920, 1080) == (1920, 1080)  # never upscales
+    assert rendition_size({'height': 181}, 1920, 1080) == (322, 180)  # even dimensions
+    assert rendition_size({'size': [100, 50]}, 1920, 1080) == (100, 50)
+
+
+def test_plan_cascade_scales_from_the_smallest_larger_size():
+    sizes = [(640, 360), (1920, 1080), (320, 180), (1280, 720)]
+    order, parents = plan_cascade(sizes)
+    assert order == [1, 3, 0, 2]
+    assert parents == {1: None, 3: 1, 0: 3, 2: 0}
+
+
+def test_plan_cascade_needs_both_dimensions():
+    # A wider but lower frame cannot be scaled down to a taller one
+    sizes = [(1000, 100), (500, 400), (400, 50)]
+    order, parents = plan_cascade(sizes)
+    assert parents[1] is None
+    assert parents[0] is None
+    assert parents[2] == 0
+
+
+def test_parse_rendition():
+    assert parse_rendition('thumbs:180:*.jpg:30') == {'name': 'thumbs', 'height': 180, 'format': '*.jpg',
+                                                      'stride': 30}
+    assert parse_rendition('square:64x64') == {'name': 'square', 'size': (64, 64), 'format': '.mp4'}
+
+
+def test_fanout_from_one_decode(numbered_video, tmp_path):
+    decoded = []
+
+    def frames():
+        cap = cv2.VideoCapture(numbered_video)
+        try:
+            for frame_number in range(60):
+                ret, frame = cap.read()
+                assert ret
+                decoded.append(frame_number)
+                yield frame_number, frame
+        finally:
+            cap.release()
+
+    specs = [{'name': 'full', 'format': '.avi'},
+             {'name': 'small', 'height': 24, 'format': '.avi'},
+             {'name': 'thumbs', 'height': 12, 'format': '*.png', 'stride': 20}]
+    paths = fanout_export(frames(), specs, str(tmp_path), 25, 0, 60)
+    assert decoded == list(range(60))
+
+    for name, size in (('full', (64, 48)), ('small', (32, 24))):
+        cap = cv2.VideoCapture(paths[name])
+        assert (cap.get(cv2.CAP_PROP_FRAME_WIDTH), cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) == size
+        assert cap.get(cv2.CAP_PROP_FRAME_COUNT) == 60
+        cap.release()
+    assert sorted(os.listdir(paths['thumbs'])) == ['000000.png', '000020.png', '000040.png']
+    for n in (0, 20, 40):
+        thumb = cv2.imread(os.path.join(paths['thumbs'], f"{n:06d}.png"))
+        assert thumb.shape == (12, 16, 3)
+        assert round(thumb.mean() / 4) == n
@@ -0,0 +1,67 @@
+import cv2
+import numpy as np
+import pytest
+
+from frame_blocks import BlockTransformer, iter_blocks, read_block, transform_frame
+
+
+def numbers(frames):
+    return [round(frame.mean() / 4) for frame in frames]
+
+
+def test_iter_blocks_reuses_one_array(numbered_video):
+    cap = cv2.VideoCapture(numbered_video)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, 10)
+    seen = []
+    arrays = set()
+    for offset, frames in iter_blocks(cap, 23, 8):
+        assert numbers(frames) == list(range(10 + offset, 10 + offset + len(frames)))
+        seen.append((offset, len(frames)))
+        arrays.add(frames.__array_interface__['data'][0])
+    cap.release()
+    assert seen == [(0, 8), (8, 8), (16, 7)]
+    assert len(arrays) == 1
+
+
+def test_iter_blocks_stops_at_the_end_of_the_file(numbered_video):
+    cap = cv2.VideoCapture(numbered_video)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, 50)
+    assert [(offset, len(frames)) for offset, frames in iter_blocks(cap, 20, 8)] == [(0, 8), (8, 2)]
+    assert list(iter_blocks(cap, 5, 8)) == []
+    cap.release()
+
+
+def test_read_block_partial(numbered_video):
+    cap = cv2.VideoCapture(numbered_video)
+    block = np.zeros((4, 48, 64, 3), dtype=np.uint8)
+    assert read_block(cap, block, 3) == 3
+    cap.release()
+    assert numbers(block) == [0, 1, 2, 0]
+
+
+@pytest.mark.parametrize('options', [
+    {},
+    {'clip_rect': (8, 4, 40, 36)},
+    {'size': (32, 24)},
+    {'size': (64, 48)},
+    {'color_code': cv2.COLOR_BGR2RGB},
+    {'clip_rect': (8, 4, 40, 36), 'size': (20, 10), 'color_code': cv2.COLOR_BGR2RGB},
+    {'clip_rect': (1, 1, 63, 47), 'color_code': cv2.COLOR_BGR2RGB},
+])
+def test_block_transformer_matches_per_frame(options):
+    rng = np.random.default_rng(0)
+    transform = BlockTransformer(**options)
+    for k in (5, 3, 5):
+        block = rng.integers(0, 256, (k, 48, 64, 3), dtype=np.uint8)
+        out = transform(block)
+        expected = np.stack([transform_frame(frame, **options) for frame in block])
+        np.testing.assert_array_equal(out, expected)
+
+
+def test_block_transformer_reuses_buffers():
+    transform = BlockTransformer(size=(32, 24), color_code=cv2.COLOR_BGR2RGB)
+    block = np.zeros((4, 48, 64, 3), dtype=np.uint8)
+    first = transform(block)
+    second = transform(block[:2])
+    assert np.shares_memory(first, second)
+    assert second.shape == (2, 24, 32, 3)
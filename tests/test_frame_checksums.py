@@ -0,0 +1,81 @@
+import threading
+
+import cv2
+import numpy as np
+
+from frame_checksums import ExportVerifier, compare_digests, frame_digest, reference_digests
+
+
+def decode_all(path):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                return frames
+            frames.append(frame)
+    finally:
+        cap.release()
+
+
+def test_frame_digest():
+    frame = np.zeros((4, 4, 3), dtype=np.uint8)
+    assert frame_digest(frame) == frame_digest(frame.copy())
+    changed = frame.copy()
+    changed[3, 3, 2] = 1
+    assert frame_digest(changed) != frame_digest(frame)
+    assert len(frame_digest(frame)) == 8
+
+
+def test_reference_digests(numbered_video):
+    frames = decode_all(numbered_video)
+    digests = reference_digests(numbered_video, [40, 5, 6, 5], keyframes=list(range(0, 60, 10)))
+    assert digests == {n: frame_digest(frames[n]) for n in (5, 6, 40)}
+    # Frames past the end are left out
+    assert set(reference_digests(numbered_video, [58, 59, 60, 61])) == {58, 59}
+
+
+def test_reference_digests_cancelled(numbered_video):
+    cancelled = threading.Event()
+    cancelled.set()
+    assert reference_digests(numbered_video, range(60), cancelled=cancelled) == {}
+
+
+def test_compare_digests():
+    reference = {0: 'a', 1: 'b', 2: 'c', 3: 'd'}
+    assert compare_digests([0, 1, 2], [(0, 'a'), (1, 'b'), (2, 'c')], reference)['ok']
+    report = compare_digests([0, 1, 2, 3], [(0, 'a'), (1, 'a'), (1, 'a'), (2, 'x'), (9, 'z')], reference)
+    assert report['missing'] == [3]
+    assert report['duplicated'] == [1]
+    assert report['mismatched'] == [{'frame': 1, 'matches': 0}, {'frame': 1, 'matches': 0},
+                                    {'frame': 2, 'matches': None}]
+    assert report['unverified'] == [9]
+    assert not report['ok']
+
+
+def test_export_verifier(numbered_video):
+    frames = decode_all(numbered_video)
+    expected = list(range(10, 30))
+    # A budget below one frame still admits frames one at a time
+    verifier = ExportVerifier(numbered_video, expected, max_inflight_bytes=1)
+    for n in expected:
+        verifier.record(n, frames[n])
+    report = verifier.finish()
+    assert report['ok']
+    assert report['written'] == len(expected)
+
+    verifier = ExportVerifier(numbered_video, expected)
+    for n in expected:
+        verifier.record(n, frames[n + 1] if n == 20 else frames[n])
+    report = verifier.finish()
+    assert not report['ok']
+    assert report['mismatched'] == [{'frame': 20, 'matches': 21}]
+
+
+def test_export_verifier_cancel(numbered_video):
+    verifier = ExportVerifier(numbered_video, range(60))
+    verifier.record(0, np.zeros((48, 64, 3), dtype=np.uint8))
+    verifier.cancel()
+    assert not verifier.hasher.is_alive()
+    assert not verifier.decoder.is_alive()
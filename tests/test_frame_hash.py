@@ -0,0 +1,56 @@
+import json
+
+import numpy as np
+
+from frame_hash import HASH_SIZE, DuplicateFilter, dhash, hamming
+
+
+def gradient(width=320, height=240, reverse=False):
+    row = np.linspace(0, 255, width).astype(np.uint8)
+    if reverse:
+        row = row[::-1]
+    return np.ascontiguousarray(np.broadcast_to(row[None, :, None], (height, width, 3)))
+
+
+def test_dhash_bits():
+    # Brighter to the right: every bit set; darker: none
+    assert dhash(gradient()) == (1 << HASH_SIZE * HASH_SIZE) - 1
+    assert dhash(gradient(reverse=True)) == 0
+    assert dhash(np.zeros((240, 320), dtype=np.uint8)) == 0
+
+
+def test_dhash_ignores_scale_and_noise():
+    frame = np.random.default_rng(0).integers(0, 256, (36, 64, 3), dtype=np.uint8)
+    large = np.repeat(np.repeat(frame, 10, axis=0), 10, axis=1)
+    noisy = np.clip(large.astype(int) + np.random.default_rng(1).integers(-2, 3, large.shape), 0, 255)
+    assert hamming(dhash(large), dhash(noisy.astype(np.uint8))) <= 8
+    assert hamming(dhash(large), dhash(255 - large)) > HASH_SIZE * HASH_SIZE // 2
+
+
+def test_hamming():
+    assert hamming(0, 0) == 0
+    assert hamming(0b1011, 0b0001) == 2
+
+
+def test_duplicate_filter_compares_with_last_kept_frame():
+    frames = [gradient(), gradient(), gradient(reverse=True), gradient(reverse=True), gradient()]
+    dedup = DuplicateFilter()
+    assert [dedup.check(n, frame) for n, frame in enumerate(frames)] == [None, 0, None, 2, None]
+    assert dedup.duplicates() == [(1, 0), (3, 2)]
+    index = json.loads(dedup.index_bytes())
+    assert index['hash'] == f'dhash{HASH_SIZE * HASH_SIZE}'
+    assert [entry['duplicate_of'] for entry in index['frames']] == [None, 0, None, 2, None]
+    assert all(len(entry['hash']) == HASH_SIZE * HASH_SIZE // 4 for entry in index['frames'])
+
+
+def test_duplicate_filter_threshold():
+    frame = gradient()
+    changed = frame.copy()
+    changed[:, :40] = 0  # flattens the leftmost hash columns
+    distance = hamming(dhash(frame), dhash(changed))
+    assert distance > 0
+    strict, loose = DuplicateFilter(distance - 1), DuplicateFilter(distance)
+    for dedup in (strict, loose):
+        dedup.check(0, frame)
+    assert strict.check(1, changed) is None
+    assert loose.check(1, changed) == 0
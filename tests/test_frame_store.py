@@ -0,0 +1,102 @@
+import os
+import shutil
+
+import cv2
+import pytest
+
+from frame_store import (HEADER_SIZE, FrameStore, build_frame_store, evict_frame_stores, frame_store_path,
+                         open_frame_store)
+
+FRAME_BYTES = 48 * 64 * 3
+
+
+@pytest.fixture
+def source(numbered_video, tmp_path):
+    # A private copy, so changing it does not touch the shared fixture
+    return shutil.copy(numbered_video, str(tmp_path / 'source.avi'))
+
+
+def build(source, cache_dir, begin, end, **kwargs):
+    cap = cv2.VideoCapture(source)
+    try:
+        return build_frame_store(cap, source, begin, end, cache_dir=cache_dir, **kwargs)
+    finally:
+        cap.release()
+
+
+def test_build_and_reopen(source, tmp_path):
+    cache_dir = str(tmp_path / 'stores')
+    assert open_frame_store(source, 10, 20, cache_dir) is None
+    store = build(source, cache_dir, 10, 20)
+    assert (store.begin, store.end, store.frame_shape) == (10, 20, (48, 64, 3))
+    assert store.covers_range(10, 20) and not store.covers(20)
+    assert [round(store.frame(n).mean() / 4) for n in range(10, 20)] == list(range(10, 20))
+    store.close()
+
+    reopened = open_frame_store(source, 10, 20, cache_dir)
+    assert reopened is not None and reopened.path == store.path
+    assert round(reopened.frame(15).mean() / 4) == 15
+    reopened.close()
+    # Another segment of the same source has its own store
+    assert open_frame_store(source, 10, 21, cache_dir) is None
+
+
+def test_store_of_a_source_that_ends_early_is_reused(source, tmp_path):
+    cache_dir = str(tmp_path / 'stores')
+    store = build(source, cache_dir, 50, 70)
+    assert (store.count, store.end) == (10, 60)
+    assert os.path.getsize(store.path) == HEADER_SIZE + 10 * FRAME_BYTES
+    store.close()
+
+    reopened = open_frame_store(source, 50, 70, cache_dir)
+    assert reopened is not None
+    assert reopened.end == 60
+    assert round(reopened.frame(59).mean() / 4) == 59
+    reopened.close()
+
+
+def test_incomplete_or_stale_stores_are_rebuilt(source, tmp_path):
+    cache_dir = str(tmp_path / 'stores')
+    # A build that was interrupted after three frames
+    path = frame_store_path(source, 0, 10, cache_dir)
+    store = FrameStore.create(path, 0, 10, (48, 64, 3), source)
+    for _ in range(3):
+        store.append(store.frames[0])
+    store.close()
+    assert open_frame_store(source, 0, 10, cache_dir) is None
+
+    build(source, cache_dir, 0, 10).close()
+    assert open_frame_store(source, 0, 10, cache_dir) is not None
+    os.utime(source, ns=(0, 10 ** 9))
+    assert open_frame_store(source, 0, 10, cache_dir) is None
+
+
+def test_evict_least_recently_used(source, tmp_path):
+    cache_dir = str(tmp_path / 'stores')
+    paths = []
+    for n in range(3):
+        store = build(source, cache_dir, n * 10, n * 10 + 10)
+        store.close()
+        os.utime(store.path, (n, n))
+        paths.append(store.path)
+    size = os.path.getsize(paths[0])
+
+    evict_frame_stores(2 * size, cache_dir)
+    assert [os.path.exists(path) for path in paths] == [False, True, True]
+    # Kept paths are neither removed nor counted
+    evict_frame_stores(0, cache_dir, keep={paths[1]})
+    assert [os.path.exists(path) for path in paths] == [False, True, False]
+
+
+def test_build_evicts_to_fit_the_cache_budget(source, tmp_path):
+    cache_dir = str(tmp_path / 'stores')
+    first = build(source, cache_dir, 0, 10)
+    first.close()
+    os.utime(first.path, (0, 0))
+    size = os.path.getsize(first.path)
+    second = build(source, cache_dir, 10, 20, cache_bytes=size + 10 * FRAME_BYTES - 1)
+    second.close()
+    assert not os.path.exists(first.path)
+    assert os.path.exists(second.path)
+    with pytest.raises(Exception):
+        build(source, cache_dir, 20, 30, max_bytes=10 * FRAME_BYTES - 1)
@@ -0,0 +1,72 @@
+import os
+import pathlib
+import tarfile
+import zipfile
+
+import pytest
+
+from frame_writer import SINKS, AsyncFrameWriter, open_frame_sink, read_shard
+
+FRAMES = [(f"{n:06d}.jpg", bytes([n]) * (n * 100 + 1)) for n in range(8)]
+
+
+def read_back(container, path):
+    if container == 'Folder':
+        return [(name, (pathlib.Path(path) / name).read_bytes()) for name in sorted(os.listdir(path))]
+    if container == 'Tar':
+        with tarfile.open(path) as tar:
+            return [(member.name, tar.extractfile(member).read()) for member in tar.getmembers()]
+    if container == 'Zip':
+        with zipfile.ZipFile(path) as archive:
+            return [(name, archive.read(name)) for name in archive.namelist()]
+    return list(read_shard(path))
+
+
+@pytest.mark.parametrize('container', sorted(SINKS))
+def test_sinks_round_trip(container, tmp_path):
+    # A budget smaller than two frames keeps the producer waiting on the writer
+    with AsyncFrameWriter(open_frame_sink(container, str(tmp_path / 'frames')), max_inflight_bytes=500,
+                          fsync_every=3) as writer:
+        for name, data in FRAMES:
+            writer.submit(name, data)
+    assert writer.path == str(tmp_path / 'frames') + SINKS[container][1]
+    assert writer.written == len(FRAMES)
+    assert read_back(container, writer.path) == FRAMES
+
+
+def test_folder_sink_leaves_no_temporary_files(tmp_path):
+    with AsyncFrameWriter(open_frame_sink('Folder', str(tmp_path / 'frames')), fsync_every=1) as writer:
+        for name, data in FRAMES:
+            writer.submit(name, data)
+    assert sorted(os.listdir(writer.path)) == [name for name, _ in FRAMES]
+
+
+def test_shard_index(tmp_path):
+    sink = open_frame_sink('Shard', str(tmp_path / 'frames'))
+    for name, data in FRAMES[:3]:
+        sink.write(name, data)
+    sink.close()
+    with open(sink.index_path) as f:
+        assert f.read() == '{"entries": [["000000.jpg", 0, 1], ["000001.jpg", 1, 101], ["000002.jpg", 102, 201]]}'
+    assert os.path.getsize(sink.path) == 303
+
+
+def test_write_errors_reach_the_producer(tmp_path):
+    class FailingSink:
+        path = str(tmp_path)
+        closed = False
+
+        def write(self, name, data):
+            raise OSError("disk full")
+
+        def close(self):
+            self.closed = True
+
+    sink = FailingSink()
+    writer = AsyncFrameWriter(sink, max_inflight_bytes=1)
+    with pytest.raises(OSError):
+        for name, data in FRAMES:
+            writer.submit(name, data)
+    with pytest.raises(OSError):
+        writer.close()
+    assert sink.closed
@@ -0,0 +1,60 @@
+import cv2
+import numpy as np
+
+from gop_cache import GopCache
+
+
+def frame(value, nbytes=100):
+    return np.full(nbytes, value, dtype=np.uint8)
+
+
+def test_run_start():
+    cache = GopCache('video.mp4', keyframes=[0, 50, 100], window=16)
+    assert cache.run_start(5, 1) == 0
+    assert cache.run_start(70, 1) == 50  # the keyframe before frame 55
+    assert cache.run_start(115, 1) == 100
+    assert GopCache('video.mp4', window=16).run_start(70, 1) == 55
+    # Only as many frames as fit in the cache
+    small = GopCache('video.mp4', keyframes=[0], max_bytes=1000, window=16)
+    assert small.run_start(70, 100) == 61
+
+
+def test_put_evicts_least_recently_used():
+    cache = GopCache('video.mp4', max_bytes=300)
+    for n in range(3):
+        cache.put(n, frame(n))
+    cache.get(0)
+    cache.put(3, frame(3))
+    assert list(cache.frames) == [2, 0, 3]
+    assert cache.nbytes == 300
+    cache.put(2, frame(2, 50))
+    assert cache.nbytes == 250
+    # One frame over the budget is still kept
+    cache.put(4, frame(4, 1000))
+    assert list(cache.frames) == [4]
+    cache.clear()
+    assert 4 not in cache and cache.nbytes == 0
+
+
+def test_stepping_backwards_decodes_each_frame_once(numbered_video):
+    cap = cv2.VideoCapture(numbered_video)
+    cache = GopCache(numbered_video, keyframes=list(range(0, 60, 10)), window=8)
+    reads = []
+    read = cap.read
+
+    class CountingCapture:
+        def read(self):
+            reads.append(1)
+            return read()
+
+        def __getattr__(self, name):
+            return getattr(cap, name)
+
+    counting = CountingCapture()
+    try:
+        for n in range(59, 19, -1):
+            assert round(cache.frame(counting, n).mean() / 4) == n
+    finally:
+        cap.release()
+    # Runs start on keyframes, so frames 20..59 are decoded once
+    assert len(reads) == 40
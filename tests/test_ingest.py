@@ -0,0 +1,87 @@
+import os
+import shutil
+
+import pytest
+
+from ingest import Catalog, subtree_bounds
+
+
+@pytest.fixture
+def library(numbered_video, tmp_path):
+    root = tmp_path / 'videos'
+    for name in ('b/clip_1.avi', 'b/clip%2.avi', 'b/sub/clipx1.avi', 'bc/other.avi'):
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy(numbered_video, str(path))
+    (root / 'b' / 'broken.mp4').write_bytes(b'not a video')
+    (root / 'b' / 'notes.txt').write_text('not a video either')
+    return root
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    return Catalog(str(tmp_path / 'catalog.sqlite'))
+
+
+def names(rows):
+    return sorted(row['name'] for row in rows)
+
+
+def test_subtree_bounds():
+    low, high = subtree_bounds('/a/b')
+    assert low <= '/a/b/c.mp4' < high
+    assert low <= '/a/b/sub/c.mp4' < high
+    assert not low <= '/a/bc/c.mp4' < high
+    assert not low <= '/a/b' < high
+
+
+def test_incremental_rescan(library, catalog):
+    assert catalog.scan(str(library), workers=2) == {'probed': 5, 'unchanged': 0, 'removed': 0}
+    assert catalog.scan(str(library), workers=2) == {'probed': 0, 'unchanged': 5, 'removed': 0}
+
+    changed = str(library / 'b' / 'clip_1.avi')
+    os.utime(changed, ns=(0, 10 ** 9))
+    os.remove(str(library / 'bc' / 'other.avi'))
+    assert catalog.scan(str(library), workers=2) == {'probed': 1, 'unchanged': 3, 'removed': 1}
+    assert catalog.get(changed)['mtime_ns'] == 10 ** 9
+    assert catalog.get(str(library / 'bc' / 'other.avi')) is None
+
+    # Files that cannot be opened are recorded, but never listed
+    assert catalog.get(str(library / 'b' / 'broken.mp4'))['error']
+    assert 'broken.mp4' not in names(catalog.query())
+
+
+def test_probed_properties(library, catalog):
+    catalog.scan(str(library), workers=2)
+    row = catalog.get(str(library / 'b' / 'clip_1.avi'))
+    assert (row['width'], row['height'], row['frame_count'], row['codec']) == (64, 48, 60, 'MJPG')
+    assert row['duration'] == pytest.approx(2.4)
+
+
+def test_add_files_skips_current_entries(library, catalog):
+    paths = [str(library / 'b' / 'clip_1.avi'), str(library / 'missing.avi')]
+    assert catalog.add_files(paths, workers=2) == 1
+    assert catalog.add_files(paths, workers=2) == 0
+
+
+def test_query_under_a_directory(library, catalog):
+    catalog.scan(str(library), workers=2)
+    assert names(catalog.query(under=str(library / 'b'))) == ['clip%2.avi', 'clip_1.avi', 'clipx1.avi']
+    assert names(catalog.query(under=str(library / 'bc'))) == ['other.avi']
+
+
+def test_query_name_matches_wildcards_literally(library, catalog):
+    catalog.scan(str(library), workers=2)
+    assert names(catalog.query(name='clip_')) == ['clip_1.avi']
+    assert names(catalog.query(name='%')) == ['clip%2.avi']
+    assert names(catalog.query(name='CLIP')) == ['clip%2.avi', 'clip_1.avi', 'clipx1.avi']
+    assert catalog.query(name='\\') == []
+
+
+def test_query_filters_and_order(library, catalog):
+    catalog.scan(str(library), workers=2)
+    assert len(catalog.query(codec='mjpg', min_width=64, max_duration=3)) == 4
+    assert catalog.query(min_width=65) == []
+    assert [row['name'] for row in catalog.query(order_by='name', limit=2)] == ['clip%2.avi', 'clip_1.avi']
+    with pytest.raises(ValueError):
+        catalog.query(order_by='name; DROP TABLE files')
@@ -0,0 +1,90 @@
+import pytest
+
+import interaction_trace
+from interaction_trace import (handler_latencies, latency_histogram, load_trace, percentile, start_recording,
+                               stop_recording, traced)
+
+
+class Player:
+    def __init__(self):
+        self.calls = []
+
+    @traced()
+    def seek(self, frame_number):
+        self.calls.append(('seek', frame_number))
+
+    @traced()
+    def toggle(self):
+        # Extra signal arguments such as clicked's checked flag are dropped
+        self.calls.append(('toggle',))
+        self.seek(0)
+
+    @traced(capture=lambda self, path: [path.upper()])
+    def open(self, path):
+        self.calls.append(('open', path))
+
+
+@pytest.fixture
+def recording(tmp_path):
+    active = start_recording(str(tmp_path / 'session.jsonl'))
+    yield active
+    stop_recording()
+
+
+def test_only_outer_calls_are_recorded(recording):
+    player = Player()
+    player.seek(5)
+    player.toggle(True)
+    player.open('a.mp4')
+    assert player.calls == [('seek', 5), ('toggle',), ('seek', 0), ('open', 'a.mp4')]
+    assert [(event['handler'], event['args']) for event in recording.events] == [
+        ('Player.seek', [5]), ('Player.toggle', []), ('Player.open', ['A.MP4'])]
+    assert recording.depth == 0
+    stop_recording()
+    assert load_trace(recording.path) == recording.events
+
+
+def test_nothing_is_recorded_without_a_recorder():
+    assert interaction_trace.recorder is None
+    player = Player()
+    player.toggle()
+    assert player.calls == [('toggle',), ('seek', 0)]
+
+
+def test_failing_handlers_are_recorded(recording):
+    class Failing:
+        @traced()
+        def run(self):
+            raise ValueError("bad input")
+
+    with pytest.raises(ValueError):
+        Failing().run()
+    assert len(recording.events) == 1
+    assert recording.events[0]['handler'].endswith('Failing.run')
+    assert recording.depth == 0
+
+
+def test_latency_histogram():
+    histogram = latency_histogram([0.5, 1, 1.5, 3, 900, 5000])
+    assert histogram[0] == ('0-1 ms', 1)
+    assert histogram[1] == ('1-2 ms', 2)
+    assert histogram[2] == ('2-4 ms', 1)
+    assert histogram[-2] == ('512-1024 ms', 1)
+    assert histogram[-1] == ('>=1024 ms', 1)
+    assert sum(count for _, count in histogram) == 6
+
+
+def test_percentile():
+    values = list(range(1, 101))
+    assert percentile(values, 0.5) == 51
+    assert percentile(values, 0.95) == 96
+    assert percentile(values, 1.0) == 100
+    assert percentile([7], 0.95) == 7
+
+
+def test_handler_latencies():
+    events = [{'handler': 'a', 'ms': ms} for ms in (3, 1, 2)] + [{'handler': 'b', 'ms': 40}]
+    stats = handler_latencies(events)
+    assert list(stats) == ['a', 'b']
+    assert (stats['a']['count'], stats['a']['p50_ms'], stats['a']['max_ms']) == (3, 2, 3)
+    assert stats['b']['histogram'][6] == ('32-64 ms', 1)
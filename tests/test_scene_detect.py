@@ -0,0 +1,64 @@
+import functools
+
+import cv2
+import numpy as np
+import pytest
+
+import file_cache
+import scene_detect
+from scene_detect import THUMB_SIZE, detect_scene_cuts, load_scene_cuts, read_thumbnails, scene_scores
+
+# Grey level of each frame: scenes start at 20 and 40, with a two-frame flash back at 40
+LEVELS = [30] * 20 + [200] * 20 + [30] * 2 + [200] * 18
+
+
+@pytest.fixture(scope='module')
+def scenes_video(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('video') / 'scenes.avi')
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 25, (64, 48))
+    for level in LEVELS:
+        out.write(np.full((48, 64, 3), level, dtype=np.uint8))
+    out.release()
+    return path
+
+
+def test_scene_scores():
+    thumbs = np.stack([np.full(THUMB_SIZE[::-1], level, dtype=np.uint8) for level in (10, 10, 250, 245)])
+    scores = scene_scores(thumbs)
+    assert scores[0] == 0
+    # Every pixel moves 240 levels into another histogram bin
+    assert scores[1] == pytest.approx((240 / 255 + 1) / 2)
+    # Same histogram bin, so only the small pixel difference counts
+    assert scores[2] == pytest.approx(5 / 255 / 2)
+
+
+def test_read_thumbnails_strides_and_chunks(numbered_video):
+    # Chunks share one buffer, so each is copied before the next is read
+    chunks = [(numbers, thumbs.copy()) for numbers, thumbs in read_thumbnails(numbered_video, stride=3,
+                                                                                chunk_size=8)]
+    assert [len(numbers) for numbers, _ in chunks] == [8, 8, 4]
+    numbers = np.concatenate([numbers for numbers, _ in chunks])
+    thumbs = np.concatenate([thumbs for _, thumbs in chunks])
+    assert numbers.tolist() == list(range(0, 60, 3))
+    assert thumbs.shape == (20, THUMB_SIZE[1], THUMB_SIZE[0])
+    assert [round(thumb.mean() / 4) for thumb in thumbs] == list(range(0, 60, 3))
+
+
+def test_detect_scene_cuts(scenes_video):
+    assert detect_scene_cuts(scenes_video, stride=1, min_scene_frames=1) == [20, 40, 42]
+    # Cuts closer than min_scene_frames to the previous one are dropped
+    assert detect_scene_cuts(scenes_video, stride=1) == [20, 40]
+    assert detect_scene_cuts(scenes_video, stride=4) == [20, 40]
+
+
+def test_cuts_across_chunk_boundaries(scenes_video, monkeypatch):
+    # With four thumbnails per chunk, the cut at 20 falls between two chunks
+    monkeypatch.setattr(scene_detect, 'read_thumbnails', functools.partial(read_thumbnails, chunk_size=4))
+    assert detect_scene_cuts(scenes_video, stride=5) == [20, 40]
+
+
+def test_load_scene_cuts_is_cached(scenes_video, tmp_path, monkeypatch):
+    monkeypatch.setattr(file_cache, 'CACHE_ROOT', str(tmp_path))
+    assert load_scene_cuts(scenes_video) == [20, 40]
+    monkeypatch.setattr(scene_detect, 'detect_scene_cuts', None)
+    assert load_scene_cuts(scenes_video) == [20, 40]
@@ -0,0 +1,39 @@
+import pytest
+
+from tiles import check_rois, grid_rois, parse_grid, parse_roi
+
+
+def test_grid_rois_cover_the_frame():
+    rois = grid_rois(1920, 1080, 2, 2)
+    assert [roi['name'] for roi in rois] == ['r0c0', 'r0c1', 'r1c0', 'r1c1']
+    assert [roi['rect'] for roi in rois] == [(0, 0, 960, 540), (960, 0, 1920, 540),
+                                             (0, 540, 960, 1080), (960, 540, 1920, 1080)]
+    check_rois(rois, 1920, 1080)
+
+
+def test_grid_rois_overlap_and_even_edges():
+    rois = grid_rois(1001, 601, 3, 2, overlap=64)
+    check_rois(rois, 1001, 601)
+    for roi in rois:
+        assert all(v % 2 == 0 for v in roi['rect'])
+    first, second = rois[0]['rect'], rois[1]['rect']
+    assert first[0] == 0 and first[1] == 0
+    assert first[2] - second[0] == 64
+    # Edge tiles stop at the frame (rounded down to even)
+    assert rois[-1]['rect'][2:] == (1000, 600)
+
+
+def test_check_rois():
+    with pytest.raises(ValueError):
+        check_rois([{'name': 'a', 'rect': (0, 0, 101, 50)}], 100, 100)
+    with pytest.raises(ValueError):
+        check_rois([{'name': 'a', 'rect': (10, 0, 10, 50)}], 100, 100)
+    with pytest.raises(ValueError):
+        check_rois([{'name': 'a', 'rect': (0, 0, 50, 50)}, {'name': 'a', 'rect': (50, 0, 100, 50)}], 100, 100)
+
+
+def test_parse():
+    assert parse_roi('left:0,0,3840,4320') == {'name': 'left', 'rect': (0, 0, 3840, 4320)}
+    assert parse_grid('4X2') == (4, 2)
+    with pytest.raises(ValueError):
+        parse_roi('left')
@@ -0,0 +1,73 @@
+import array
+
+import cv2
+import pytest
+
+from timestamps import PtsTable, load_pts_table, pts_table_path, seek_frame
+
+
+def vfr_table():
+    # 10 frames at 40 ms, then 5 frames at 100 ms, starting at 1000 ms
+    pts = [1000 + 40 * i for i in range(10)] + [1400 + 100 * i for i in range(5)]
+    return PtsTable(array.array('d', pts))
+
+
+def test_time_of_frames():
+    table = vfr_table()
+    assert table.time_of(0) == 0
+    assert table.time_of(10) == pytest.approx(0.4)
+    assert table.time_of(14) == pytest.approx(0.8)
+    # Past the end: the last frame lasts as long as the one before it
+    assert table.duration_ms == pytest.approx(900)
+    assert table.time_of(15) == table.time_of(100) == pytest.approx(0.9)
+
+
+def test_frame_at():
+    table = vfr_table()
+    assert table.frame_at(0) == 0
+    assert table.frame_at(1039) == 0
+    assert table.frame_at(1040) == 1
+    assert table.frame_at(1039.6) == 1  # sub-millisecond rounding of the reported position
+    assert table.frame_at(1550) == 11
+    assert table.frame_at(10 ** 6) == 14
+    assert table.frame_at_time(0.45) == 10
+
+
+def test_average_fps_and_variable_rate():
+    table = vfr_table()
+    assert table.average_fps(0, 10) == pytest.approx(25)
+    assert table.average_fps(10, 15) == pytest.approx(10)
+    assert table.average_fps(3, 3) == 0
+    assert table.is_variable()
+    assert not PtsTable(array.array('d', [0, 40, 80, 120])).is_variable()
+    assert not PtsTable(array.array('d', [0])).is_variable()
+
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / 'table.pts')
+    vfr_table().save(path)
+    assert list(PtsTable.load(path).pts_ms) == list(vfr_table().pts_ms)
+
+
+def test_load_pts_table_scans_once(numbered_video, tmp_path):
+    assert load_pts_table(numbered_video, str(tmp_path), build=False) is None
+    table = load_pts_table(numbered_video, str(tmp_path))
+    assert len(table) == 60
+    assert table.average_fps(0, 60) == pytest.approx(25, rel=0.01)
+    cached = load_pts_table(numbered_video, str(tmp_path), build=False)
+    assert list(cached.pts_ms) == list(table.pts_ms)
+    assert pts_table_path(numbered_video, str(tmp_path)).startswith(str(tmp_path))
+
+
+@pytest.mark.parametrize('position', [0, 1, 17, 59])
+def test_seek_frame(numbered_video, tmp_path, position):
+    table = load_pts_table(numbered_video, str(tmp_path))
+    cap = cv2.VideoCapture(numbered_video)
+    try:
+        cap.read()
+        seek_frame(cap, position, table)
+        ret, frame = cap.read()
+        assert ret
+        assert round(frame.mean() / 4) == position
+    finally:
+        cap.release()
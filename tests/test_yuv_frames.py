@@ -0,0 +1,74 @@
+import cv2
+import numpy as np
+import pytest
+
+import yuv_frames
+from yuv_frames import i420_planes, luma_to_grey, transform_planes, yuv_compatible, yuv_encoder_args
+
+
+def i420(frame):
+    # Packed I420 buffer of a BGR frame, as ffmpeg hands it out
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2YUV_I420).ravel()
+
+
+@pytest.fixture
+def frame():
+    return np.random.default_rng(0).integers(0, 256, (48, 64, 3), dtype=np.uint8)
+
+
+def test_i420_planes_are_views(frame):
+    buffer = i420(frame)
+    y, u, v = i420_planes(buffer, 64, 48)
+    assert (y.shape, u.shape, v.shape) == ((48, 64), (24, 32), (24, 32))
+    assert all(np.shares_memory(plane, buffer) for plane in (y, u, v))
+    np.testing.assert_array_equal(y.ravel(), buffer[:64 * 48])
+    np.testing.assert_array_equal(u.ravel(), buffer[64 * 48:64 * 48 * 5 // 4])
+    np.testing.assert_array_equal(v.ravel(), buffer[64 * 48 * 5 // 4:])
+
+
+def test_transform_planes_crop_matches_cropped_frame(frame):
+    planes = i420_planes(i420(frame), 64, 48)
+    out = transform_planes(planes, clip_rect=(8, 4, 40, 36))
+    np.testing.assert_array_equal(out, i420(np.ascontiguousarray(frame[4:36, 8:40])))
+
+
+def test_transform_planes_resize_into_out(frame):
+    planes = i420_planes(i420(frame), 64, 48)
+    out = np.zeros(32 * 24 * 3 // 2, dtype=np.uint8)
+    assert transform_planes(planes, size=(32, 24), out=out) is out
+    y, u, v = i420_planes(out, 32, 24)
+    # Halving with INTER_AREA averages 2x2 blocks of every plane
+    for src, dst in zip(planes, (y, u, v)):
+        expected = src.reshape(src.shape[0] // 2, 2, src.shape[1] // 2, 2).mean(axis=(1, 3))
+        assert np.abs(dst - expected).max() <= 0.5
+
+
+def test_transform_planes_without_changes_copies(frame):
+    buffer = i420(frame)
+    out = transform_planes(i420_planes(buffer, 64, 48))
+    np.testing.assert_array_equal(out, buffer)
+    assert not np.shares_memory(out, buffer)
+
+
+def test_yuv_compatible(monkeypatch):
+    xvid = cv2.VideoWriter_fourcc(*'XVID')
+    monkeypatch.setattr(yuv_frames, 'ffmpeg_path', lambda: '/usr/bin/ffmpeg')
+    assert yuv_compatible((64, 48), (8, 4, 40, 36), (32, 24), '.avi', xvid)
+    # Odd sizes or crop edges cannot be subsampled 2x2
+    assert not yuv_compatible((64, 48), (8, 3, 40, 36), None, '.avi', xvid)
+    assert not yuv_compatible((64, 48), None, (33, 24), '.avi', xvid)
+    assert not yuv_compatible((64, 48), None, None, '.mkv', xvid)
+    assert not yuv_compatible((64, 48), None, None, '.avi', cv2.VideoWriter_fourcc(*'MJPG'))
+    monkeypatch.setattr(yuv_frames, 'ffmpeg_path', lambda: None)
+    assert not yuv_compatible((64, 48), None, None, '.avi', xvid)
+
+
+def test_yuv_encoder_args():
+    xvid = cv2.VideoWriter_fourcc(*'XVID')
+    assert yuv_encoder_args(xvid, '.avi')[-2:] == ['-vtag', 'XVID']
+    assert '-vtag' not in yuv_encoder_args(xvid, '.mp4')
+
+
+def test_luma_to_grey():
+    levels = luma_to_grey()
+    assert (levels[0], levels[16], levels[126], levels[235], levels[255]) == (0, 0, 128, 255, 255)
@@ -0,0 +1,136 @@
+'''
+python tiles.py pano.mp4 --grid 4x2
+python tiles.py pano.mp4 --roi left:0,0,3840,4320 --roi right:3840,0,7680,4320 --format .avi
+python tiles.py pano.mp4 --grid 2x2 --overlap 64 --begin 300 --end 900 --format *.jpg
+'''
+import os
+import sys
+import argparse
+from fanout import RenditionOutput
+from timestamps import load_pts_table, seek_frame
+from lazy_import import lazy_module
+
+cv2 = lazy_module('cv2')
+
+
+def grid_rois(width, height, cols, rows, overlap=0):
+    """cols x rows tiles covering a width x height frame, named r<row>c<col>.
+
+    Neighbouring tiles share overlap pixels; edges are kept even for the encoders.
+    """
+    rois = []
+    for row in range(rows):
+        for col in range(cols):
+            x1 = max(0, col * width // cols - overlap // 2) // 2 * 2
+            y1 = max(0, row * height // rows - overlap // 2) // 2 * 2
+            x2 = min(width, (col + 1) * width // cols + overlap // 2) // 2 * 2
+            y2 = min(height, (row + 1) * height // rows + overlap // 2) // 2 * 2
+            rois.append({'name': f"r{row}c{col}", 'rect': (x1, y1, x2, y2)})
+    return rois
+
+
+def check_rois(rois, width, height):
+    names = set()
+    for roi in rois:
+        x1, y1, x2, y2 = roi['rect']
+        if not (0 <= x1 < x2 <= width and 0 <= y1 < y2 <= height):
+            raise ValueError(f"ROI {roi['name']} {roi['rect']} is outside the {width}x{height} frame")
+        if roi['name'] in names:
+            raise ValueError(f"Duplicate ROI name {roi['name']}")
+        names.add(roi['name'])
+
+
+def tile_export(frames, rois, base_path, fps, begin, end, fmt='.mp4', container='Folder', progress=None):
+    """Split one stream of (frame_number, frame) into one output per ROI.
+
+    Every frame is decoded once; each ROI is a view into it (no copy) handed
+    to that ROI's encoder thread. Returns {name: path}.
+    """
+    os.makedirs(base_path, exist_ok=True)
+    outputs = None
+    total = max(end - begin, 1)
+    try:
+        for frame_number, frame in frames:
+            if outputs is None:
+                height, width = frame.shape[:2]
+                check_rois(rois, width, height)
+                outputs = []
+                for roi in rois:
+                    x1, y1, x2, y2 = roi['rect']
+                    name = f"{begin:06d}-{end:06d}_{roi['name']}"
+                    path = os.path.join(base_path, name if fmt.startswith('*') else name + fmt)
+                    spec = {'name': roi['name'], 'format': fmt, 'container': container}
+                    outputs.append(RenditionOutput(spec, path, (x2 - x1, y2 - y1), fps))
+            # The decoder returns a new array per frame, so queued views stay valid
+            for roi, output in zip(rois, outputs):
+                x1, y1, x2, y2 = roi['rect']
+                output.put(frame_number, frame[y1:y2, x1:x2])
+            if progress:
+                progress((frame_number - begin + 1) / total * 100)
+    finally:
+        errors = []
+        for output in outputs or []:
+            try:
+                output.close()
+            except Exception as e:
+                errors.append(e)
+        if errors:
+            raise errors[0]
+    return {roi['name']: output.path for roi, output in zip(rois, outputs or [])}
+
+
+def parse_roi(text):
+    """name:x1,y1,x2,y2"""
+    name, rect = text.split(':')
+    return {'name': name, 'rect': tuple(int(v) for v in rect.split(','))}
+
+
+def parse_grid(text):
+    cols, rows = text.lower().split('x')
+    return int(cols), int(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a grid of tiles or named regions as separate outputs")
+    parser.add_argument('source')
+    parser.add_argument('--grid', type=parse_grid, help="COLSxROWS")
+    parser.add_argument('--overlap', type=int, default=0, help="pixels shared by neighbouring grid tiles")
+    parser.add_argument('--roi', type=parse_roi, action='append', help="name:x1,y1,x2,y2, repeatable")
+    parser.add_argument('--begin', type=int, default=0)
+    parser.add_argument('--end', type=int)
+    parser.add_argument('--format', default='.mp4', help=".mp4, .avi, *.jpg or *.png")
+    parser.add_argument('-o', '--output', help="output directory")
+    args = parser.parse_args()
+
+    cap = cv2.VideoCapture(args.source)
+    if not cap.isOpened():
+        raise Exception("Failed to open video file")
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    end = args.end or int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    rois = args.roi or grid_rois(width, height, *(args.grid or (2, 2)), args.overlap)
+    pts_table = load_pts_table(args.source, build=False)
+    fps = pts_table.average_fps(args.begin, end) if pts_table is not None else cap.get(cv2.CAP_PROP_FPS)
+
+    def frames():
+        seek_frame(cap, args.begin, pts_table)
+        for frame_number in range(args.begin, end):
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield frame_number, frame
+
+    output = args.output or os.path.join(os.path.dirname(args.source),
+                                         os.path.splitext(os.path.basename(args.source))[0] + '_frames')
+    try:
+        paths = tile_export(frames(), rois, output, fps, args.begin, end, args.format,
+                            progress=lambda p: print(f"\rExporting tiles: {p:.1f}%", end=""))
+    finally:
+        cap.release()
+    print()
+    for name, path in paths.items():
+        print(f"{name}: {path}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,165 @@
+import os
+import json
+import array
+from bisect import bisect_right
+from file_cache import source_cache_path
+from lazy_import import lazy_module
+
+cv2 = lazy_module('cv2')
+
+
+class PtsTable:
+    """Presentation timestamps (ms) of every frame, for exact addressing of VFR sources"""
+    def __init__(self, pts_ms):
+        self.pts_ms = pts_ms
+
+    def __len__(self):
+        return len(self.pts_ms)
+
+    @property
+    def duration_ms(self):
+        if len(self.pts_ms) < 2:
+            return 0.0
+        # Extend the last frame by the previous frame interval
+        return self.pts_ms[-1] + (self.pts_ms[-1] - self.pts_ms[-2]) - self.pts_ms[0]
+
+    def time_ms(self, frame_number):
+        # Frame numbers past the end map to the end of the stream
+        if frame_number >= len(self.pts_ms):
+            return self.pts_ms[0] + self.duration_ms
+        return self.pts_ms[max(frame_number, 0)]
+
+    def time_of(self, frame_number):
+        """Seconds from stream start to the given frame"""
+        return (self.time_ms(frame_number) - self.pts_ms[0]) / 1000
+
+    def frame_at(self, time_ms):
+        """Index of the frame displayed at the given stream timestamp, O(log n)"""
+        # Tolerate sub-millisecond rounding of the reported position
+        index = bisect_right(self.pts_ms, time_ms + 0.5) - 1
+        return min(max(index, 0), len(self.pts_ms) - 1)
+
+    def frame_at_time(self, seconds):
+        return self.frame_at(self.pts_ms[0] + seconds * 1000)
+
+    def average_fps(self, begin, end):
+        span = self.time_ms(end) - self.time_ms(begin)
+        return (end - begin) * 1000 / span if span > 0 else 0.0
+
+    def is_variable(self, tolerance=0.05):
+        deltas = [b - a for a, b in zip(self.pts_ms, self.pts_ms[1:])]
+        if not deltas:
+            return False
+        mean = sum(deltas) / len(deltas)
+        return any(abs(d - mean) > mean * tolerance for d in deltas)
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            self.pts_ms.tofile(f)
+
+    @classmethod
+    def load(cls, path):
+        pts_ms = array.array('d')
+        with open(path, 'rb') as f:
+            pts_ms.frombytes(f.read())
+        return cls(pts_ms)
+
+
+def seek_frame(cap, position, pts_table=None):
+    """Position cap so that the next read() returns frame number position"""
+    if pts_table is None or position <= 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, position)
+        return
+    # Frame-number seeks are derived from the average fps and drift on VFR
+    # sources. Seek by timestamp a few frames early, then grab forward until
+    # the frame before the target is the last one decoded.
+    target_ms = pts_table.time_ms(position - 1)
+    back = 8
+    while True:
+        if back >= position:
+            # From the start frames are counted; the position reads the same
+            # before and after the first frame is decoded
+            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            for _ in range(position):
+                if not cap.grab():
+                    break
+            return
+        cap.set(cv2.CAP_PROP_POS_MSEC, pts_table.time_ms(position - back))
+        if cap.get(cv2.CAP_PROP_POS_MSEC) <= target_ms + 0.5:
+            break
+        back *= 4
+    while cap.get(cv2.CAP_PROP_POS_MSEC) < target_ms - 0.5:
+        if not cap.grab():
+            break
+
+
+def pts_table_path(source, cache_dir=None):
+    return source_cache_path('pts', source, suffix='.pts', cache_dir=cache_dir)
+
+
+def scan_pts(source):
+    """Collect frame timestamps in one streaming pass; grab() skips the colour conversion"""
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        raise Exception("Failed to open video file")
+    pts_ms = array.array('d')
+    try:
+        while cap.grab():
+            pts_ms.append(cap.get(cv2.CAP_PROP_POS_MSEC))
+    finally:
+        cap.release()
+    return pts_ms
+
+
+def load_pts_table(source, cache_dir=None, build=True):
+    """Return the cached PTS table of a file, scanning it once if needed.
+
+    Returns None when the backend does not report usable timestamps.
+    """
+    path = pts_table_path(source, cache_dir)
+    if os.path.exists(path):
+        table = PtsTable.load(path)
+        return table if len(table) else None
+    if not build:
+        return None
+    pts_ms = scan_pts(source)
+    # Timestamps must be strictly increasing to be addressable
+    if any(b <= a for a, b in zip(pts_ms, pts_ms[1:])):
+        pts_ms = array.array('d')
+    table = PtsTable(pts_ms)
+    # An empty table is cached too so unusable files are not rescanned
+    table.save(path)
+    return table if len(table) else None
+
+
+def scan_keyframes(source):
+    """Indices of keyframe packets, read in raw mode without decoding any frame.
+
+    Packets come in decode order, which matches display order up to B-frame
+    reordering inside a GOP. Returns None when the backend has no raw mode.
+    """
+    cap = cv2.VideoCapture(source, cv2.CAP_FFMPEG)
+    try:
+        if not cap.isOpened() or not cap.set(cv2.CAP_PROP_FORMAT, -1):
+            return None
+        keyframes = []
+        index = 0
+        while cap.grab():
+            if cap.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME):
+                keyframes.append(index)
+            index += 1
+        return keyframes or None
+    finally:
+        cap.release()
+
+
+def load_keyframes(source, cache_dir=None):
+    """Cached keyframe indices of a file, or None if they cannot be determined"""
+    path = source_cache_path('keyframes', source, suffix='.json', cache_dir=cache_dir)
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)['keyframes']
+    keyframes = scan_keyframes(source)
+    with open(path, 'w') as f:
+        json.dump({'keyframes': keyframes}, f)
+    return keyframes
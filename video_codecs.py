@@ -0,0 +1,18 @@
+import sys
+from lazy_import import lazy_module
+
+cv2 = lazy_module('cv2')
+
+
+def platform_fourcc():
+    # Codec used for video exports on this platform
+    if sys.platform == 'darwin':  # macOS
+        return cv2.VideoWriter_fourcc(*'avc1')  # H.264 codec
+    elif sys.platform == 'linux':  # Linux
+        return cv2.VideoWriter_fourcc(*'XVID')  # XVID codec
+    return cv2.VideoWriter_fourcc(*'mp4v')
+
+
+def fourcc_name(fourcc):
+    """Four-character code of an OpenCV fourcc integer"""
+    return ''.join(chr((fourcc >> 8 * i) & 0xFF) for i in range(4))
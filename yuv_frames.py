@@ -0,0 +1,239 @@
+'''
+python yuv_frames.py video.mp4 out.mp4 --begin 300 --end 900 --crop 0,0,1280,720 --size 640x360
+'''
+import sys
+import shutil
+import argparse
+import subprocess
+from contextlib import contextmanager
+from video_codecs import fourcc_name, platform_fourcc
+from lazy_import import lazy_module
+
+cv2 = lazy_module('cv2')
+np = lazy_module('numpy')
+
+# Containers the ffmpeg encoders below can write
+YUV_CONTAINERS = ('.mp4', '.avi', '.mov')
+
+# ffmpeg encoder arguments per OpenCV fourcc, so both export paths use the same codec
+YUV_ENCODERS = {
+    'avc1': ['-c:v', 'libx264', '-preset', 'veryfast', '-crf', '18'],
+    'XVID': ['-c:v', 'mpeg4', '-q:v', '3'],
+    'mp4v': ['-c:v', 'mpeg4', '-q:v', '3'],
+}
+
+
+def yuv_encoder_args(fourcc, suffix):
+    # Like OpenCV, only AVI carries the XVID tag; MP4/MOV store MPEG-4 Part 2 as mp4v
+    args = list(YUV_ENCODERS[fourcc_name(fourcc)])
+    if suffix == '.avi' and fourcc_name(fourcc) == 'XVID':
+        args += ['-vtag', 'XVID']
+    return args
+
+
+def ffmpeg_path():
+    return shutil.which('ffmpeg')
+
+
+def yuv_compatible(source_size, clip_rect, size, suffix, fourcc):
+    """Whether an export can stay in I420: chroma is subsampled 2x2, so frame
+    sizes and crop edges must be even"""
+    if ffmpeg_path() is None or suffix not in YUV_CONTAINERS or fourcc_name(fourcc) not in YUV_ENCODERS:
+        return False
+    return not any(v % 2 for v in (*source_size, *(clip_rect or ()), *(size or ())))
+
+
+def i420_planes(buffer, width, height):
+    """Y, U and V plane views of one packed I420 frame"""
+    y_size = width * height
+    c_size = y_size // 4
+    y = buffer[:y_size].reshape(height, width)
+    u = buffer[y_size:y_size + c_size].reshape(height // 2, width // 2)
+    v = buffer[y_size + c_size:y_size + 2 * c_size].reshape(height // 2, width // 2)
+    return y, u, v
+
+
+def transform_planes(planes, clip_rect=None, size=None, out=None):
+    """Crop (views only) and resize the planes of an I420 frame.
+
+    Writes the packed I420 result into out when given and returns it.
+    """
+    y, u, v = planes
+    if clip_rect:
+        x1, y1, x2, y2 = clip_rect
+        y = y[y1:y2, x1:x2]
+        u = u[y1 // 2:y2 // 2, x1 // 2:x2 // 2]
+        v = v[y1 // 2:y2 // 2, x1 // 2:x2 // 2]
+    width, height = size or (y.shape[1], y.shape[0])
+    if out is None:
+        out = np.empty(width * height * 3 // 2, dtype=np.uint8)
+    out_y, out_u, out_v = i420_planes(out, width, height)
+    for src, dst in ((y, out_y), (u, out_u), (v, out_v)):
+        if src.shape == dst.shape:
+            dst[...] = src
+        else:
+            cv2.resize(src, (dst.shape[1], dst.shape[0]), dst=dst, interpolation=cv2.INTER_AREA)
+    return out
+
+
+class YuvPipeReader:
+    """Raw I420 frames decoded by an ffmpeg child process.
+
+    Starts at begin_seconds (accurate seek) and yields count frames as views
+    into one reused buffer.
+    """
+    def __init__(self, source, width, height, begin_seconds=0.0, count=None):
+        self.width = width
+        self.height = height
+        self.frame_size = width * height * 3 // 2
+        command = [ffmpeg_path(), '-loglevel', 'error', '-ss', f"{begin_seconds:.6f}", '-i', source]
+        if count is not None:
+            command += ['-frames:v', str(count)]
+        command += ['-an', '-f', 'rawvideo', '-pix_fmt', 'yuv420p', '-']
+        self.process = subprocess.Popen(command, stdout=subprocess.PIPE, bufsize=self.frame_size)
+        self.buffer = np.empty(self.frame_size, dtype=np.uint8)
+
+    def __iter__(self):
+        view = memoryview(self.buffer)
+        while True:
+            filled = 0
+            while filled < self.frame_size:
+                n = self.process.stdout.readinto(view[filled:])
+                if not n:
+                    return
+                filled += n
+            yield i420_planes(self.buffer, self.width, self.height)
+
+    def close(self):
+        self.process.stdout.close()
+        self.process.kill()
+        self.process.wait()
+
+
+class YuvPipeWriter:
+    """Encode packed I420 frames with an ffmpeg child process"""
+    def __init__(self, path, size, fps, fourcc, suffix):
+        width, height = size
+        command = [ffmpeg_path(), '-y', '-loglevel', 'error', '-f', 'rawvideo', '-pix_fmt', 'yuv420p',
+                   '-s', f"{width}x{height}", '-r', f"{fps:.6f}", '-i', '-',
+                   *yuv_encoder_args(fourcc, suffix), '-pix_fmt', 'yuv420p', path]
+        self.path = path
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE)
+
+    def write(self, frame):
+        self.process.stdin.write(frame.data)
+
+    def release(self):
+        self.process.stdin.close()
+        if self.process.wait() != 0:
+            raise Exception(f"ffmpeg failed to encode {self.path}")
+
+
+def export_yuv_segment(source, path, begin_seconds, count, source_size, fps, fourcc, clip_rect=None, size=None,
+                       suffix='.mp4', progress=None):
+    """Decode, crop, resize and encode count frames without leaving I420.
+
+    Returns the number of frames written, which is less than count when the
+    decoder stopped early.
+    """
+    width, height = source_size
+    if clip_rect:
+        width, height = clip_rect[2] - clip_rect[0], clip_rect[3] - clip_rect[1]
+    out_size = size or (width, height)
+    out = np.empty(out_size[0] * out_size[1] * 3 // 2, dtype=np.uint8)
+    reader = YuvPipeReader(source, source_size[0], source_size[1], begin_seconds, count)
+    writer = YuvPipeWriter(path, out_size, fps, fourcc, suffix)
+    written = 0
+    try:
+        for planes in reader:
+            writer.write(transform_planes(planes, clip_rect, size, out))
+            written += 1
+            if progress:
+                progress(written / max(count, 1) * 100)
+    finally:
+        reader.close()
+        writer.release()
+    return written
+
+
+@contextmanager
+def quiet_decoder_log():
+    # The FFmpeg backend warns on every frame it hands out unconverted
+    level = cv2.utils.logging.getLogLevel()
+    cv2.utils.logging.setLogLevel(cv2.utils.logging.LOG_LEVEL_ERROR)
+    try:
+        yield
+    finally:
+        cv2.utils.logging.setLogLevel(level)
+
+
+def luma_to_grey():
+    """Lookup table from video-range luma (16-235) to full-range grey levels"""
+    levels = (np.arange(256, dtype=np.float32) - 16) * 255 / 219
+    return np.clip(np.round(levels), 0, 255).astype(np.uint8)
+
+
+def open_luma_capture(source, tolerance=4.0):
+    """(capture, levels) where the capture hands out the decoder's luma plane, or None.
+
+    With CAP_PROP_CONVERT_RGB off, 4:2:0 frames come out as a single-channel
+    image of the Y plane, skipping the conversion to BGR entirely. The first
+    frame is compared with its BGR-derived grey image to check the plane and
+    to tell video-range luma (levels is then a lookup table to full range)
+    from full-range luma (levels is None).
+    """
+    cap = cv2.VideoCapture(source, cv2.CAP_FFMPEG)
+    if not cap.isOpened() or not cap.set(cv2.CAP_PROP_CONVERT_RGB, 0):
+        cap.release()
+        return None
+    with quiet_decoder_log():
+        ret, luma = cap.read()
+    reference = cv2.VideoCapture(source, cv2.CAP_FFMPEG)
+    ret_bgr, frame = reference.read()
+    reference.release()
+    if not (ret and ret_bgr) or luma.ndim != 2 or luma.shape != frame.shape[:2]:
+        cap.release()
+        return None
+    grey = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    stretched = luma_to_grey()
+    errors = [cv2.absdiff(luma, grey).mean(), cv2.absdiff(cv2.LUT(luma, stretched), grey).mean()]
+    if min(errors) > tolerance:
+        cap.release()
+        return None
+    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+    return cap, stretched if errors[1] < errors[0] else None
+
+
+def main():
+    from extract import parse_rect
+    from timestamps import load_pts_table
+
+    parser = argparse.ArgumentParser(description="Export a segment without BGR conversions")
+    parser.add_argument('source')
+    parser.add_argument('output')
+    parser.add_argument('--begin', type=int, default=0)
+    parser.add_argument('--end', type=int)
+    parser.add_argument('--crop', type=parse_rect, help="x1,y1,x2,y2 (even)")
+    parser.add_argument('--size', type=lambda t: tuple(int(v) for v in t.lower().split('x')), help="WxH (even)")
+    args = parser.parse_args()
+
+    cap = cv2.VideoCapture(args.source)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    source_size = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    end = args.end or int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    suffix = '.' + args.output.rsplit('.', 1)[-1].lower()
+    fourcc = platform_fourcc()
+    if not yuv_compatible(source_size, args.crop, args.size, suffix, fourcc):
+        print("Needs ffmpeg on PATH, an .mp4/.avi/.mov output and even frame sizes and crop edges")
+        return 1
+    pts_table = load_pts_table(args.source, build=False)
+    begin_seconds = pts_table.time_of(args.begin) if pts_table is not None else args.begin / fps
+    written = export_yuv_segment(args.source, args.output, begin_seconds, end - args.begin, source_size, fps,
+                                 fourcc, args.crop, args.size, suffix,
+                                 progress=lambda p: print(f"\rExporting: {p:.1f}%", end=""))
+    print(f"\n{written} frames written to {args.output}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())